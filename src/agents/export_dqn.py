@@ -0,0 +1,73 @@
+"""
+Exports a trained DQN agent to a frozen TorchScript or ONNX model, which ExportedDQNAgent plays with.
+
+`export PYTHONPATH="${PYTHONPATH}:$(pwd)/src" && python3 src/agents/export_dqn.py 103`
+
+The model takes a batch of observations (B, players + 1, 5, 12) and action masks (B, 55) and returns the masked argmax
+action per observation. It only holds the linear layers of the agent's network, so neither tianshou nor the replay
+and optimizer state are needed to run it.
+"""
+import argparse
+import copy
+import os
+from typing import Optional
+
+import torch
+from torch import nn
+
+from manual_testing.utils import TRAINED_AGENTS_DIRECTORY, load_trained_agent
+
+EXPORT_FORMATS = ("torchscript", "onnx")
+
+
+class MaskedArgmaxNet(nn.Module):
+
+    def __init__(self, layers: nn.Module):
+        """
+        :param layers: maps the flattened observations to one q value per action
+        """
+        super().__init__()
+        self.layers = layers
+
+    def forward(self, observations: torch.Tensor, masks: torch.Tensor) -> torch.Tensor:
+        q_values = self.layers(observations.flatten(1).to(torch.float32))
+        q_values = torch.where(masks.to(torch.bool), q_values, torch.full_like(q_values, float("-inf")))
+        return q_values.argmax(dim=1)
+
+
+def create_masked_argmax_net(policy_number: int, observation_shape: tuple = (3, 5, 12)) -> MaskedArgmaxNet:
+    agent = load_trained_agent(policy_number, observation_shape)
+    # agent.model is tianshou's Net, whose MLP holds the plain torch layers
+    return MaskedArgmaxNet(copy.deepcopy(agent.model.model.model)).eval()
+
+
+def export_dqn(policy_number: int, export_format: str = "torchscript", path: Optional[str] = None,
+               observation_shape: tuple = (3, 5, 12)) -> str:
+    """
+    :param path: file to write, policy-<number>.pt or .onnx next to the checkpoint if None
+    :return: the path of the exported model
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise Exception("Unknown export format", export_format, EXPORT_FORMATS)
+    extension = ".pt" if export_format == "torchscript" else ".onnx"
+    path = path or os.path.join(TRAINED_AGENTS_DIRECTORY, f"policy-{policy_number}{extension}")
+
+    net = create_masked_argmax_net(policy_number, observation_shape)
+    example_observations = torch.zeros((1,) + tuple(observation_shape), dtype=torch.int8)
+    example_masks = torch.ones((1, net.layers[-1].out_features), dtype=torch.bool)
+    if export_format == "torchscript":
+        torch.jit.save(torch.jit.freeze(torch.jit.script(net)), path)
+    else:
+        torch.onnx.export(net, (example_observations, example_masks), path,
+                          input_names=["observations", "masks"], output_names=["actions"],
+                          dynamic_axes={"observations": {0: "batch"}, "masks": {0: "batch"}, "actions": {0: "batch"}})
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exports a trained DQN agent for inference without tianshou")
+    parser.add_argument("policy_number", type=int)
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="torchscript")
+    parser.add_argument("--output", help="file to write, next to the checkpoint by default")
+    args = parser.parse_args()
+    print(export_dqn(args.policy_number, args.format, args.output))
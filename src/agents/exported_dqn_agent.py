@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+from typing import Optional
+
+import numpy as np
+import torch
+
+
+class ExportedDQNAgent:
+    """
+    Plays with a DQN agent exported by agents/export_dqn.py, without tianshou.
+
+    TorchScript models (.pt) run with torch, ONNX models (.onnx) with onnxruntime, which is only imported for them.
+    Like a tianshou policy, the agent can be called with a batch which has obs.obs and obs.mask, and returns the
+    actions in .act, so it can replace a trained agent in the evaluation code.
+    """
+
+    def __init__(self, path: str, num_threads: Optional[int] = None):
+        """
+        :param num_threads: threads per forward pass, e.g. 1 if many agents run in parallel processes. The torch
+            thread count of the process is only changed during the forward passes of the agent.
+        """
+        self.path = path
+        self.num_threads = num_threads
+        self._session = None
+        self._module = None
+        if path.endswith(".onnx"):
+            import onnxruntime
+            options = onnxruntime.SessionOptions()
+            if num_threads is not None:
+                options.intra_op_num_threads = num_threads
+            self._session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        else:
+            self._module = torch.jit.load(path, map_location="cpu").eval()
+
+    def choose_actions(self, observations: np.ndarray, masks: np.ndarray) -> np.ndarray:
+        """
+        :param observations: (B, players + 1, 5, 12) observations
+        :param masks: (B, 55) action masks
+        :return: (B,) best allowed action per observation
+        """
+        observations = np.ascontiguousarray(observations, dtype=np.int8)
+        masks = np.ascontiguousarray(masks, dtype=bool)
+        if self._session is not None:
+            return self._session.run(None, {"observations": observations, "masks": masks})[0]
+        if self.num_threads is None:
+            return self._forward(observations, masks)
+        # torch.set_num_threads() applies to the whole process, so other models keep their thread count
+        previous_num_threads = torch.get_num_threads()
+        torch.set_num_threads(self.num_threads)
+        try:
+            return self._forward(observations, masks)
+        finally:
+            torch.set_num_threads(previous_num_threads)
+
+    def _forward(self, observations: np.ndarray, masks: np.ndarray) -> np.ndarray:
+        with torch.inference_mode():
+            return self._module(torch.from_numpy(observations), torch.from_numpy(masks)).numpy()
+
+    def choose_action(self, observation: np.ndarray, action_mask: np.ndarray) -> int:
+        return int(self.choose_actions(observation[None], action_mask[None])[0])
+
+    def __call__(self, batch, state=None, **kwargs) -> SimpleNamespace:
+        return SimpleNamespace(act=self.choose_actions(batch.obs.obs, batch.obs.mask))
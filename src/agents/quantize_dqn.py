@@ -0,0 +1,186 @@
+"""
+Quantizes a trained DQN agent to int8 and checks that it still plays as well as the float agent.
+
+`export PYTHONPATH="${PYTHONPATH}:$(pwd)/src" && python3 src/agents/quantize_dqn.py 103 --mode static`
+
+Dynamic quantization stores the weights of the linear layers as int8 and quantizes the activations on the fly. Static
+quantization also fixes the scales of the activations, which are calibrated on observations recorded from games of the
+agent. The quantized network is saved like the models of export_dqn.py, as a frozen TorchScript model which
+ExportedDQNAgent plays with. It is only saved if it chooses the same actions as the float agent on other recorded
+observations often enough and doesn't win less often against LowestValueTakerPolicy than the tolerance allows.
+"""
+import argparse
+import copy
+import os
+from typing import Optional
+
+import numpy as np
+import torch
+from tianshou.data import Batch
+from torch import nn
+from torch.ao import quantization
+
+from agents.export_dqn import MaskedArgmaxNet, create_masked_argmax_net
+from agents.tianshou.lowest_value_taker_policy import LowestValueTakerPolicy
+from env.vector_qwox_env import VectorQwoxEnv
+from evaluation.lock_step_evaluation import DO_NOTHING_ACTION, get_deciding_rows, play_lock_step
+from manual_testing.utils import TRAINED_AGENTS_DIRECTORY
+
+QUANTIZATION_MODES = ("dynamic", "static")
+QUANTIZATION_ENGINE = "x86" if "x86" in torch.backends.quantized.supported_engines else "qnnpack"
+
+
+class StaticQuantizedLayers(nn.Module):
+    """The layers of the network between the stubs which quantize their input and dequantize their output"""
+
+    def __init__(self, layers: nn.Sequential):
+        super().__init__()
+        self.quant = quantization.QuantStub()
+        self.layers = layers
+        self.dequant = quantization.DeQuantStub()
+
+    def forward(self, observations: torch.Tensor) -> torch.Tensor:
+        return self.dequant(self.layers(self.quant(observations)))
+
+
+def record_observations(net: MaskedArgmaxNet, count: int, num_envs: int = 64,
+                        seed: Optional[int] = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Lets the network play against itself and records the observations and masks of its decisions. Agents which only
+    wait for the tossing agent's coloured dice action have nothing to decide and aren't recorded.
+
+    :return: count observations and masks
+    """
+    env = VectorQwoxEnv(num_envs=num_envs, seed=seed)
+    observation = env.reset()
+    observations, masks = [], []
+    recorded = 0
+    with torch.no_grad():
+        while recorded < count:
+            is_deciding = get_deciding_rows(observation["obs"])
+            observations.append(observation["obs"][is_deciding])
+            masks.append(observation["mask"][is_deciding])
+            recorded += int(is_deciding.sum())
+            actions = net(torch.from_numpy(observation["obs"]), torch.from_numpy(observation["mask"])).numpy()
+            observation, _, _, _ = env.step(actions)
+    return np.concatenate(observations)[:count], np.concatenate(masks)[:count]
+
+
+def quantize_dynamic(net: MaskedArgmaxNet) -> MaskedArgmaxNet:
+    return quantization.quantize_dynamic(copy.deepcopy(net), {nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_static(net: MaskedArgmaxNet, calibration_observations: np.ndarray) -> MaskedArgmaxNet:
+    """
+    :param calibration_observations: observations to record the ranges of the activations on
+    """
+    torch.backends.quantized.engine = QUANTIZATION_ENGINE
+    layers = copy.deepcopy(net.layers)
+    # each linear layer and its ReLU become one quantized layer, so the activations between them stay unquantized
+    linear_and_relu = [[str(index), str(index + 1)] for index, layer in enumerate(layers)
+                       if isinstance(layer, nn.Linear) and index + 1 < len(layers)
+                       and isinstance(layers[index + 1], nn.ReLU)]
+    layers = quantization.fuse_modules(layers.eval(), linear_and_relu)
+
+    quantized_layers = StaticQuantizedLayers(layers).eval()
+    quantized_layers.qconfig = quantization.get_default_qconfig(QUANTIZATION_ENGINE)
+    quantization.prepare(quantized_layers, inplace=True)
+    with torch.no_grad():
+        quantized_layers(torch.from_numpy(calibration_observations).flatten(1).to(torch.float32))
+    quantization.convert(quantized_layers, inplace=True)
+    return MaskedArgmaxNet(quantized_layers).eval()
+
+
+class NetPolicy:
+    """Lets play_lock_step() call a MaskedArgmaxNet like a tianshou policy"""
+
+    def __init__(self, net: MaskedArgmaxNet):
+        self.net = net
+
+    def __call__(self, batch: Batch, state=None, **kwargs) -> Batch:
+        with torch.no_grad():
+            return Batch(act=self.net(torch.from_numpy(batch.obs.obs), torch.from_numpy(batch.obs.mask)).numpy())
+
+
+def get_agreement_rate(net: MaskedArgmaxNet, other_net: MaskedArgmaxNet, observations: np.ndarray,
+                       masks: np.ndarray) -> float:
+    """
+    :return: share of the observations where both networks choose the same action. All actions which do nothing count
+        as the same action, as the network has no reason to prefer one of them.
+    """
+    observations, masks = torch.from_numpy(observations), torch.from_numpy(masks)
+    with torch.no_grad():
+        actions = np.minimum(net(observations, masks).numpy(), DO_NOTHING_ACTION)
+        other_actions = np.minimum(other_net(observations, masks).numpy(), DO_NOTHING_ACTION)
+    return float(np.mean(actions == other_actions))
+
+
+def get_win_rate(policy, num_games: int, seed: Optional[int] = None) -> float:
+    """:return: share of the games the policy wins against LowestValueTakerPolicy, draws count half"""
+    results = play_lock_step([policy, LowestValueTakerPolicy()], num_games, seed=seed)
+    score = 0.0
+    for result in results:
+        own_points, opponent_points = (result["points"][result["seats"].index(index)] for index in range(2))
+        score += 1.0 if own_points > opponent_points else 0.5 if own_points == opponent_points else 0.0
+    return score / len(results)
+
+
+def check_quantized_net(net: MaskedArgmaxNet, quantized_net: MaskedArgmaxNet, observations: np.ndarray,
+                        masks: np.ndarray, num_games: int = 1000, min_agreement_rate: float = 0.9,
+                        max_win_rate_drop: float = 0.05, seed: Optional[int] = None) -> dict:
+    """
+    :param observations: held-out observations, which were not used for the calibration
+    :param max_win_rate_drop: how much less often the quantized network may win against LowestValueTakerPolicy
+    :return: agreement rate and both win rates
+    """
+    report = {"agreement_rate": get_agreement_rate(net, quantized_net, observations, masks),
+              "win_rate": get_win_rate(NetPolicy(net), num_games, seed),
+              "quantized_win_rate": get_win_rate(NetPolicy(quantized_net), num_games, seed)}
+    if report["agreement_rate"] < min_agreement_rate:
+        raise Exception("Quantized network chooses other actions too often", report)
+    if report["win_rate"] - report["quantized_win_rate"] > max_win_rate_drop:
+        raise Exception("Quantized network wins too rarely against LowestValueTakerPolicy", report)
+    return report
+
+
+def quantize_dqn(policy_number: int, mode: str = "dynamic", path: Optional[str] = None,
+                 calibration_observations: int = 4096, test_observations: int = 4096, num_games: int = 1000,
+                 min_agreement_rate: float = 0.9, max_win_rate_drop: float = 0.05, seed: int = 0,
+                 observation_shape: tuple = (3, 5, 12)) -> dict:
+    """
+    Quantizes the agent, checks it with check_quantized_net() and saves it, see the module documentation.
+
+    :param path: file to write, policy-<number>-int8-<mode>.pt next to the checkpoint if None
+    :return: the report of check_quantized_net() and the path of the saved model
+    """
+    if mode not in QUANTIZATION_MODES:
+        raise Exception("Unknown quantization mode", mode, QUANTIZATION_MODES)
+    path = path or os.path.join(TRAINED_AGENTS_DIRECTORY, f"policy-{policy_number}-int8-{mode}.pt")
+
+    net = create_masked_argmax_net(policy_number, observation_shape)
+    observations, masks = record_observations(net, calibration_observations + test_observations, seed=seed)
+    if mode == "dynamic":
+        quantized_net = quantize_dynamic(net)
+    else:
+        quantized_net = quantize_static(net, observations[:calibration_observations])
+    report = check_quantized_net(net, quantized_net, observations[calibration_observations:],
+                                 masks[calibration_observations:], num_games, min_agreement_rate, max_win_rate_drop,
+                                 seed)
+
+    torch.jit.save(torch.jit.freeze(torch.jit.script(quantized_net)), path)
+    report["path"] = path
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quantizes a trained DQN agent to int8")
+    parser.add_argument("policy_number", type=int)
+    parser.add_argument("--mode", choices=QUANTIZATION_MODES, default="dynamic")
+    parser.add_argument("--output", help="file to write, next to the checkpoint by default")
+    parser.add_argument("--games", type=int, default=1000, help="games against LowestValueTakerPolicy to compare the "
+                                                                "win rates on")
+    parser.add_argument("--min-agreement", type=float, default=0.9)
+    parser.add_argument("--max-win-rate-drop", type=float, default=0.05)
+    args = parser.parse_args()
+    print(quantize_dqn(args.policy_number, args.mode, args.output, num_games=args.games,
+                       min_agreement_rate=args.min_agreement, max_win_rate_drop=args.max_win_rate_drop))
@@ -0,0 +1,207 @@
+import functools
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+from tianshou.data import Batch
+from tianshou.policy import BasePolicy
+
+from game_models import action_mask_tables, dice_probabilities
+from game_models.action_mask_tables import get_candidate_actions
+from game_models.board import Board
+
+_ROW_COUNT = action_mask_tables.COLORED_ROW_COUNT
+_COLUMNS = action_mask_tables.MASK_COLUMNS
+_CLOSED_PROGRESS = action_mask_tables.PROGRESS_VALUES - 1
+_CLOSED_COLUMN = action_mask_tables.OBSERVATION_COLUMNS - 1
+_LAST_COLUMN = _COLUMNS - 1
+_MIN_CROSSED_FOR_CLOSING = 5
+_FIRST_PASS_ACTION = action_mask_tables.FIRST_PASS_ACTION
+_PASS_POINTS = -5
+_POINTS_FOR_COUNT = np.array([sum(range(1, count + 1)) for count in range(action_mask_tables.PROGRESS_VALUES + 1)])
+
+
+@functools.lru_cache(maxsize=None)
+def _get_value_tables(remaining_rolls: int, num_players: int, future_weight: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    :return: the value of every row state and the value gain of crossing every dice sum in every row state, both
+        indexed by (row, progress, crossed count) and the gains additionally by the white dice sum
+    """
+    progress = np.arange(action_mask_tables.PROGRESS_VALUES)
+    counts = np.arange(action_mask_tables.PROGRESS_VALUES)
+    reach = dice_probabilities.get_reach_probabilities(np.broadcast_to(progress[:, None], (len(progress), _ROW_COUNT)),
+                                                       remaining_rolls, num_players)
+    # (row, progress) sum of the reach probabilities of all columns which can still be crossed
+    future_reach = reach.sum(axis=-1).T
+
+    # a row state is worth its points and the expected points of the crosses which are still reachable
+    row_values = (_POINTS_FOR_COUNT[counts][None, None, :]
+                  + future_weight * (counts[None, None, :] + 1) * future_reach[:, :, None])
+
+    gains = np.zeros(shape=row_values.shape + (action_mask_tables.DICE_SUM_VALUES,))
+    for row in range(_ROW_COUNT):
+        for dice_sum in range(2, action_mask_tables.DICE_SUM_VALUES):
+            column = dice_probabilities.COLUMN_FOR_SUM[row, dice_sum]
+            for row_progress in range(column + 1):
+                for count in range(len(counts) - 2):
+                    new_progress, new_count = _cross(column, count)
+                    gains[row, row_progress, count, dice_sum] = (row_values[row, new_progress, new_count]
+                                                                 - row_values[row, row_progress, count])
+    row_values.flags.writeable = False
+    gains.flags.writeable = False
+    return row_values, gains
+
+
+def _cross(column: int, count: int) -> tuple[int, int]:
+    """:return: progress and crossed count of a row after crossing the column"""
+    if column == _LAST_COLUMN and count + 1 >= _MIN_CROSSED_FOR_CLOSING:
+        return _CLOSED_PROGRESS, count + 2
+    return column + 1, count + 1
+
+
+class ExpectimaxPolicy(BasePolicy):
+    """An agent that scores every action by the points it brings and the expected future points it costs
+
+    A row is worth its points plus the expected points of its columns which can still be reached within the
+    remaining rolls (see dice_probabilities). Crossing a column far to the right loses the columns it skips.
+    The tossing agent plans its white and coloured dice action together. Every action is then valued by an
+    expectimax search over the white dice sums of the next depth rolls: each roll is a chance node weighted with
+    the probabilities of the sums, after which the agent either crosses one of the sums' fields or does nothing.
+    The card values above are only used at the leaves.
+    """
+
+    def __init__(self, horizon: float = 12.0, future_weight: float = 0.5, depth: int = 1, **kwargs: Any):
+        """
+        :param horizon: expected number of remaining rolls at the beginning of a game. It shrinks with the used
+            passes and closed rows, as those end the game.
+        :param future_weight: how much the expected points of still reachable columns count
+        :param depth: rolls searched ahead. 1 decides in about 0.1ms, every further roll makes a decision about 20
+            times slower.
+        """
+        super().__init__(**kwargs)
+        if depth < 1:
+            raise Exception("ExpectimaxPolicy needs to search at least one roll", depth)
+        self.horizon = horizon
+        self.future_weight = future_weight
+        self.depth = depth
+
+    def forward(
+            self,
+            batch: Batch,
+            state: Optional[Union[dict, Batch, np.ndarray]] = None,
+            **kwargs: Any,
+    ) -> Batch:
+        """Choose the action with the highest expected value for every observation in the batch.
+
+        batch.obs needs "obs" and "mask" like the observations of TianshouQwoxEnv.
+
+        :return: A :class:`~tianshou.data.Batch` with "act" key, containing the chosen actions.
+        """
+        observations = np.asarray(batch.obs.obs)
+        masks = np.asarray(batch.obs.mask)
+        return Batch(act=np.array([self.choose_action(observation, action_mask)
+                                   for observation, action_mask in zip(observations, masks)], dtype=np.int64))
+
+    def choose_action(self, observation: np.ndarray, action_mask: np.ndarray) -> int:
+        candidate_actions = get_candidate_actions(action_mask)
+        if len(candidate_actions) == 1:
+            return candidate_actions[0]
+
+        num_players = observation.shape[0] - 1
+        additional_information = observation[-1][0]
+        is_tossing_agent = additional_information[Board.TOSSING_PLAYER_OBS_INDEX] == 1
+        is_second_part_of_round = additional_information[Board.PART_OF_ROUND_OBS_INDEX] == 2
+
+        own_card = observation[0]
+        progress = action_mask_tables.get_row_progress(own_card[:_ROW_COUNT])
+        counts = np.count_nonzero(own_card[:_ROW_COUNT], axis=-1)
+        is_closed = observation[:num_players, :_ROW_COUNT, _CLOSED_COLUMN].any(axis=0)
+        progress[is_closed] = _CLOSED_PROGRESS
+
+        passes = max(np.count_nonzero(card[4][:4]) for card in observation[:num_players])
+        remaining_rolls = max(1, round(self.horizon * (1 - passes / 4) * (1 - np.count_nonzero(is_closed) / 2)))
+        # the leaves are depth - 1 rolls after the next roll
+        row_values, gains = _get_value_tables(max(1, remaining_rolls - self.depth + 1), num_players,
+                                              self.future_weight)
+        tables = (row_values, gains, {})
+
+        color_sums = None
+        if is_tossing_agent and not is_second_part_of_round:
+            # the coloured dice action of this round follows with the same dices
+            dices = additional_information[:6].astype(np.intp)
+            color_sums = [(dices[row] + dices[4], dices[row] + dices[5]) for row in range(_ROW_COUNT)]
+
+        best_action, best_value = candidate_actions[0], -np.inf
+        for action in candidate_actions:
+            action_progress, action_counts, points = self._apply(action, progress, counts)
+            if color_sums is None:
+                value = points + self._expected_value(action_progress, action_counts, self.depth, tables)
+            else:
+                value = self._best_color_value(action_progress, action_counts, points, action < _FIRST_PASS_ACTION,
+                                               color_sums, tables)
+            if value > best_value:
+                best_action, best_value = action, value
+        return best_action
+
+    @staticmethod
+    def _apply(action: int, progress: np.ndarray, counts: np.ndarray) -> tuple[np.ndarray, np.ndarray, int]:
+        """:return: row progress, crossed counts and pass points after the action"""
+        if action >= _FIRST_PASS_ACTION:
+            return progress, counts, _PASS_POINTS if action < _FIRST_PASS_ACTION + 4 else 0
+        row, column = divmod(action, _COLUMNS)
+        progress, counts = progress.copy(), counts.copy()
+        progress[row], counts[row] = _cross(column, counts[row])
+        return progress, counts, 0
+
+    def _best_color_value(self, progress, counts, points, crossed_something, color_sums, tables):
+        # not crossing anything in the whole round costs a pass
+        best_value = (points + (0 if crossed_something else _PASS_POINTS)
+                      + self._expected_value(progress, counts, self.depth, tables))
+        for row, sums in enumerate(color_sums):
+            for dice_sum in sums:
+                column = dice_probabilities.COLUMN_FOR_SUM[row, dice_sum]
+                if column < progress[row]:
+                    continue
+                color_progress, color_counts = progress.copy(), counts.copy()
+                color_progress[row], color_counts[row] = _cross(column, counts[row])
+                best_value = max(best_value,
+                                 points + self._expected_value(color_progress, color_counts, self.depth, tables))
+        return best_value
+
+    @staticmethod
+    def _expected_value(progress, counts, depth: int, tables) -> float:
+        """
+        Expected value of the card when the best white dice action is taken in each of the next depth rolls
+
+        :param tables: row values and gains of the leaves and the values already computed for this decision
+        """
+        row_values, gains, values = tables
+        key = (progress.tobytes(), counts.tobytes(), depth)
+        if key in values:
+            return values[key]
+
+        rows = np.arange(_ROW_COUNT)
+        if depth == 1:
+            # the gains table holds the last roll before the leaves for all sums at once
+            best_gains = np.maximum(gains[rows, progress, counts].max(axis=0), 0)
+            value = row_values[rows, progress, counts].sum() + best_gains @ dice_probabilities.WHITE_SUM_PROBABILITIES
+        else:
+            nothing_value = ExpectimaxPolicy._expected_value(progress, counts, depth - 1, tables)
+            value = 0.0
+            for dice_sum in range(2, action_mask_tables.DICE_SUM_VALUES):
+                best_value = nothing_value
+                for row in rows:
+                    column = dice_probabilities.COLUMN_FOR_SUM[row, dice_sum]
+                    if column < progress[row]:
+                        continue
+                    crossed_progress, crossed_counts = progress.copy(), counts.copy()
+                    crossed_progress[row], crossed_counts[row] = _cross(column, counts[row])
+                    best_value = max(best_value,
+                                     ExpectimaxPolicy._expected_value(crossed_progress, crossed_counts, depth - 1,
+                                                                      tables))
+                value += dice_probabilities.WHITE_SUM_PROBABILITIES[dice_sum] * best_value
+        values[key] = value
+        return value
+
+    def learn(self, batch: Batch, **kwargs: Any) -> Dict[str, float]:
+        """Since an algorithmic agent learns nothing, it returns an empty dict."""
+        return {}
@@ -4,6 +4,9 @@ import numpy as np
 from tianshou.data import Batch
 from tianshou.policy import BasePolicy
 
+FIRST_PASS_ACTION = 44
+LAST_PASS_ACTION = 47
+
 
 class LongPlayingPolicy(BasePolicy):
     """An agent that takes the lowest possible index as an action but also tries to avoid crossing a pass. As passing
@@ -19,7 +22,7 @@ class LongPlayingPolicy(BasePolicy):
             state: Optional[Union[dict, Batch, np.ndarray]] = None,
             **kwargs: Any,
     ) -> Batch:
-        """Compute the random action over the given batch data.
+        """Compute the lowest allowed action for the whole batch, or the highest one if the lowest is a pass.
 
         The input should contain a mask in batch.obs, with "True" to be
         available and "False" to be unavailable. For example,
@@ -34,16 +37,11 @@ class LongPlayingPolicy(BasePolicy):
             Please refer to :meth:`~tianshou.policy.BasePolicy.forward` for
             more detailed explanation.
         """
-        mask = np.array(batch.obs.mask, dtype=bool)
-        logits = np.ones(mask.shape)
-        logits[~mask] = 0
-        array_of_chosen_indexes = np.argmax(logits > 0, axis=-1)
-        for idx, chosen_index in enumerate(array_of_chosen_indexes):
-            if 44 <= chosen_index <= 47:
-                reversed_logits = logits[idx][::-1]
-                i = len(reversed_logits) - np.argmax(reversed_logits > 0) - 1
-                array_of_chosen_indexes[idx] = i
-        return Batch(act=array_of_chosen_indexes)
+        mask = np.asarray(batch.obs.mask, dtype=bool)
+        first_allowed_actions = mask.argmax(axis=-1)
+        last_allowed_actions = mask.shape[-1] - 1 - mask[..., ::-1].argmax(axis=-1)
+        is_pass = (first_allowed_actions >= FIRST_PASS_ACTION) & (first_allowed_actions <= LAST_PASS_ACTION)
+        return Batch(act=np.where(is_pass, last_allowed_actions, first_allowed_actions))
 
     def learn(self, batch: Batch, **kwargs: Any) -> Dict[str, float]:
         """Since a random agent learns nothing, it returns an empty dict."""
@@ -0,0 +1,384 @@
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+from tianshou.data import Batch
+from tianshou.policy import BasePolicy
+
+from env.qwox_env import QwoxEnv, get_snapshot_dtype
+from env.results_sink import NullResultsSink
+from game_models import action_mask_tables
+from game_models.action_mask_tables import get_candidate_actions
+from game_models.bitboard_game_card import BitboardGameCard
+from game_models.board import Board
+from game_models.transposition_table import TranspositionTable
+
+_ROW_BIT_WEIGHTS = 1 << np.arange(12)
+_FIRST_PASS_ACTION = action_mask_tables.FIRST_PASS_ACTION
+_FIRST_NONE_ACTION = action_mask_tables.FIRST_NONE_ACTION
+
+
+class _Node:
+    """
+    Game state in the search tree. visit_count and value_sum are the statistics of the edge leading here, seen
+    from the agent which chose that edge.
+    """
+    __slots__ = ("snapshot", "state_hash", "agent_index", "untried_actions", "children", "visit_count", "value_sum",
+                 "points")
+
+    def __init__(self, snapshot: np.ndarray, state_hash: int, agent_index: int, untried_actions: list[int],
+                 points: Optional[list[int]]):
+        self.snapshot = snapshot
+        self.state_hash = state_hash
+        self.agent_index = agent_index
+        self.untried_actions = untried_actions
+        self.children: dict[int, Union[_Node, _ChanceNode]] = {}
+        self.visit_count = 0
+        self.value_sum = 0.0
+        # final points of all agents if the game is finished in this state
+        self.points = points
+
+
+class _ChanceNode:
+    """
+    Action which ends a round, after which the dices are rolled. Every sampled roll leads to its own child state.
+    """
+    __slots__ = ("outcomes", "visit_count", "value_sum")
+
+    def __init__(self):
+        self.outcomes: dict[tuple, _Node] = {}
+        self.visit_count = 0
+        self.value_sum = 0.0
+
+
+def snapshot_from_observation(observation: np.ndarray, action_mask: np.ndarray, agent_index: int) -> np.ndarray:
+    """
+    Rebuilds a QwoxEnv state snapshot from what an agent observes. Some state is not part of the observation:
+    - whether other players crossed something in the current round is assumed to be False
+    - with more than two players a non-tossing agent does not know who tosses, the next player is assumed
+    - the round number is only known modulo the number of players, which is all the rules need
+    """
+    num_players = observation.shape[0] - 1
+    additional_information = observation[-1][0]
+    is_tossing_agent = additional_information[Board.TOSSING_PLAYER_OBS_INDEX] == 1
+    is_second_part_of_round = additional_information[Board.PART_OF_ROUND_OBS_INDEX] == 2
+
+    snapshot = np.zeros((), dtype=get_snapshot_dtype(num_players))
+    seats = (agent_index + np.arange(num_players)) % num_players
+    snapshot["row_bits"][seats] = observation[:num_players] @ _ROW_BIT_WEIGHTS
+    if is_tossing_agent and is_second_part_of_round:
+        # the tossing agent may only do nothing if it crossed something with the white dices
+        snapshot["crossed_something_in_current_round"][agent_index] = action_mask[_FIRST_NONE_ACTION:].any()
+    snapshot["dices"] = additional_information[:6]
+
+    if is_tossing_agent:
+        tossing_agent_index = agent_index
+    else:
+        tossing_agent_index = (agent_index + 1) % num_players
+    steps_in_one_round = num_players * 2
+    snapshot["total_started_step_count"] = (tossing_agent_index * steps_in_one_round
+                                            + (num_players if is_second_part_of_round else 0) + agent_index + 1)
+    snapshot["agent_selection"] = agent_index
+    return snapshot
+
+
+class TreeSearch:
+    """
+    UCT search over QwoxEnv states with chance nodes for the dice rolls. The tree nodes keep state snapshots, so
+    walking down the tree only restores the deepest known state, and only the new edge and the rollout are played.
+
+    Nodes are kept in a transposition table by the zobrist hash of their state. A state which is reached again,
+    through another move order or on the next move, continues with the existing node and its statistics.
+    """
+
+    def __init__(self, num_players: int, exploration: float = 1.0, value_scale: float = 20.0,
+                 rollout_epsilon: float = 0.1, max_nodes: int = 200_000, seed: Optional[int] = None):
+        """
+        :param exploration: UCT exploration constant
+        :param value_scale: point difference which counts as a value of 1
+        :param rollout_epsilon: probability of a random action in a rollout, the default policy is taken otherwise
+        :param max_nodes: size of the transposition table, the least recently used nodes are dropped first
+        """
+        self.env = QwoxEnv(game_card_class=BitboardGameCard, results_sink=NullResultsSink(), render_mode=None,
+                           num_players=num_players)
+        self.env.reset(seed=seed)
+        self.exploration = exploration
+        self.value_scale = value_scale
+        self.rollout_epsilon = rollout_epsilon
+        self.random = random.Random(seed)
+        self.nodes = TranspositionTable(max_nodes, replacement="lru")
+
+    def create_root(self, snapshot: np.ndarray) -> _Node:
+        self.env.restore_state_snapshot(snapshot)
+        return self._create_node()
+
+    def run(self, root: _Node, num_simulations: Optional[int], time_limit: Optional[float]) -> dict[int, int]:
+        """
+        Runs simulations until one of the budgets is used up.
+        :return: visit count per action of the root
+        """
+        deadline = None if time_limit is None else time.monotonic() + time_limit
+        simulations = 0
+        while ((num_simulations is None or simulations < num_simulations)
+               and (deadline is None or time.monotonic() < deadline)):
+            self._simulate(root)
+            simulations += 1
+        return {action: child.visit_count for action, child in root.children.items()}
+
+    def _simulate(self, root: _Node):
+        node = root
+        # statistics to update with the index of the agent they are seen from, -1 to only count the visit
+        path: list[tuple[Union[_Node, _ChanceNode], int]] = [(root, -1)]
+        env_is_at_node = False
+        visited = {id(root)}
+        while node.points is None:
+            if node.untried_actions:
+                action = node.untried_actions.pop()
+                agent_index = node.agent_index
+                edge, node = self._expand(node, action)
+                path.append((edge, agent_index))
+                if edge is not node:
+                    path.append((node, -1))
+                env_is_at_node = True
+                break
+
+            action = self._select_action(node)
+            edge = node.children[action]
+            path.append((edge, node.agent_index))
+            if isinstance(edge, _ChanceNode):
+                node = self._sample_outcome(node, action, edge)
+                path.append((node, -1))
+                env_is_at_node = True
+            else:
+                node = edge
+                env_is_at_node = False
+            if id(node) in visited:
+                # the same state came up again in this simulation, which can only happen through a transposition
+                break
+            visited.add(id(node))
+
+        if node.points is not None:
+            points = node.points
+        else:
+            if not env_is_at_node:
+                self.env.restore_state_snapshot(node.snapshot)
+            points = self._rollout()
+
+        values = self._get_values(points)
+        for statistics, agent_index in path:
+            statistics.visit_count += 1
+            if agent_index >= 0:
+                statistics.value_sum += values[agent_index]
+
+    def _expand(self, node: _Node, action: int) -> tuple[Union[_Node, _ChanceNode], _Node]:
+        self.env.restore_state_snapshot(node.snapshot)
+        rolls_dices = self.env.total_started_step_count % (self.env.num_agents * 2) == 0
+        self.env.step(action)
+        child = self._create_node()
+        if not rolls_dices or child.points is not None:
+            node.children[action] = child
+            return child, child
+
+        chance_node = _ChanceNode()
+        chance_node.outcomes[self._get_dices()] = child
+        node.children[action] = chance_node
+        return chance_node, child
+
+    def _sample_outcome(self, node: _Node, action: int, chance_node: _ChanceNode) -> _Node:
+        self.env.restore_state_snapshot(node.snapshot)
+        self.env.step(action)
+        dices = self._get_dices()
+        child = chance_node.outcomes.get(dices)
+        if child is None:
+            child = self._create_node()
+            chance_node.outcomes[dices] = child
+        return child
+
+    def _select_action(self, node: _Node) -> int:
+        log_visits = math.log(node.visit_count)
+        best_action, best_score = None, -math.inf
+        for action, child in node.children.items():
+            score = (child.value_sum / child.visit_count
+                     + self.exploration * math.sqrt(log_visits / child.visit_count))
+            if score > best_score:
+                best_action, best_score = action, score
+        return best_action
+
+    def _create_node(self) -> _Node:
+        """:return: the node of the env's current state, which is only created if it isn't known yet"""
+        env = self.env
+        state_hash = env.get_zobrist_hash()
+        node = self.nodes.get(state_hash)
+        if node is not None:
+            return node
+
+        agent = env.agent_selection
+        snapshot = env.get_state_snapshot()
+        if env.dones[agent]:
+            node = _Node(snapshot, state_hash, env.agent_name_mapping[agent], [], self._get_points())
+        else:
+            actions = get_candidate_actions(env.observe(agent)["action_mask"])
+            self.random.shuffle(actions)
+            node = _Node(snapshot, state_hash, env.agent_name_mapping[agent], actions, None)
+        self.nodes.store(state_hash, node)
+        return node
+
+    def _rollout(self) -> list[int]:
+        env = self.env
+        while not env.dones[env.agent_selection]:
+            env.step(self._default_policy_action(env.observe(env.agent_selection)["action_mask"]))
+        return self._get_points()
+
+    def _default_policy_action(self, action_mask: np.ndarray) -> int:
+        """Plays like LongPlayingPolicy, with a random action from time to time"""
+        allowed_actions = np.flatnonzero(action_mask)
+        if self.random.random() < self.rollout_epsilon:
+            return int(allowed_actions[self.random.randrange(len(allowed_actions))])
+        action = int(allowed_actions[0])
+        if _FIRST_PASS_ACTION <= action < _FIRST_NONE_ACTION:
+            return int(allowed_actions[-1])
+        return action
+
+    def _get_dices(self) -> tuple:
+        return tuple(dice.current_value for dice in self.env.board.dices)
+
+    def _get_points(self) -> list[int]:
+        return [self.env.board.game_cards[agent].get_points() for agent in self.env.agents]
+
+    def _get_values(self, points: list[int]) -> list[float]:
+        """Point difference of every agent to its best opponent"""
+        values = []
+        for index, agent_points in enumerate(points):
+            best_opponent_points = max(points[:index] + points[index + 1:])
+            values.append((agent_points - best_opponent_points) / self.value_scale)
+        return values
+
+
+_worker_searches: dict[int, TreeSearch] = {}
+
+
+def _search_in_worker(snapshot: np.ndarray, num_simulations: Optional[int], time_limit: Optional[float],
+                      exploration: float, value_scale: float, rollout_epsilon: float, seed: int) -> dict[int, int]:
+    num_players = snapshot["row_bits"].shape[0]
+    search = _worker_searches.get(num_players)
+    if search is None:
+        search = TreeSearch(num_players, seed=seed)
+        _worker_searches[num_players] = search
+    search.exploration, search.value_scale, search.rollout_epsilon = exploration, value_scale, rollout_epsilon
+    # a reused worker starts like a new one, so the result only depends on the snapshot and the seed
+    search.nodes.clear()
+    search.random.seed(seed)
+    search.env.seed(seed)
+    return search.run(search.create_root(snapshot), num_simulations, time_limit)
+
+
+class MCTSPolicy(BasePolicy):
+    """An agent that plans every move with Monte Carlo Tree Search over the Qwox rules
+
+    The game state is rebuilt from the observation (see snapshot_from_observation) and searched with UCT. Dice rolls
+    are chance nodes and leaves are evaluated by rollouts with a LongPlayingPolicy-like default policy. More
+    simulations or time per move make the agent stronger.
+
+    With num_workers > 0 every move is searched by that many processes on independent trees, whose root visit
+    counts are summed up (root parallelization). Without workers the tree of the last move is kept, and its
+    subtree is reused if the new state was already part of it.
+    """
+
+    def __init__(self, num_simulations: Optional[int] = 200, time_limit: Optional[float] = None,
+                 exploration: float = 1.0, value_scale: float = 20.0, rollout_epsilon: float = 0.1,
+                 num_workers: int = 0, seed: Optional[int] = None, **kwargs: Any):
+        """
+        :param num_simulations: simulations per move, None for no limit
+        :param time_limit: seconds per move, None for no limit
+        :param num_workers: processes searching in parallel, 0 to search in this process
+        """
+        super().__init__(**kwargs)
+        if num_simulations is None and time_limit is None:
+            raise Exception("MCTSPolicy needs a simulation or time budget")
+        self.num_simulations = num_simulations
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.value_scale = value_scale
+        self.rollout_epsilon = rollout_epsilon
+        self.num_workers = num_workers
+        self.random = random.Random(seed)
+        self._searches: dict[int, TreeSearch] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def forward(
+            self,
+            batch: Batch,
+            state: Optional[Union[dict, Batch, np.ndarray]] = None,
+            **kwargs: Any,
+    ) -> Batch:
+        """Search an action for every observation in the batch.
+
+        batch.obs needs "obs", "mask" and "agent_id" like the observations of TianshouQwoxEnv.
+
+        :return: A :class:`~tianshou.data.Batch` with "act" key, containing the chosen actions.
+        """
+        observations = np.asarray(batch.obs.obs)
+        masks = np.asarray(batch.obs.mask)
+        actions = np.zeros(len(masks), dtype=np.int64)
+        for index, (observation, action_mask) in enumerate(zip(observations, masks)):
+            actions[index] = self.search_action(observation, action_mask, self._get_agent_index(batch, index))
+        return Batch(act=actions)
+
+    def search_action(self, observation: np.ndarray, action_mask: np.ndarray, agent_index: int) -> int:
+        candidate_actions = get_candidate_actions(action_mask)
+        if len(candidate_actions) == 1:
+            return candidate_actions[0]
+
+        snapshot = snapshot_from_observation(observation, action_mask, agent_index)
+        if self.num_workers > 0:
+            visit_counts = self._search_in_workers(snapshot)
+        else:
+            search = self._get_search(observation.shape[0] - 1)
+            visit_counts = search.run(search.create_root(snapshot), self.num_simulations, self.time_limit)
+        return max(visit_counts, key=visit_counts.get)
+
+    def _search_in_workers(self, snapshot: np.ndarray) -> dict[int, int]:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.num_workers)
+        simulations_per_worker = None if self.num_simulations is None else math.ceil(
+            self.num_simulations / self.num_workers)
+        futures = [self._executor.submit(_search_in_worker, snapshot, simulations_per_worker, self.time_limit,
+                                         self.exploration, self.value_scale, self.rollout_epsilon,
+                                         self.random.getrandbits(32))
+                   for _ in range(self.num_workers)]
+        visit_counts: dict[int, int] = {}
+        for future in futures:
+            for action, count in future.result().items():
+                visit_counts[action] = visit_counts.get(action, 0) + count
+        return visit_counts
+
+    def _get_search(self, num_players: int) -> TreeSearch:
+        search = self._searches.get(num_players)
+        if search is None:
+            search = TreeSearch(num_players, self.exploration, self.value_scale, self.rollout_epsilon,
+                                seed=self.random.getrandbits(32))
+            self._searches[num_players] = search
+        return search
+
+    @staticmethod
+    def _get_agent_index(batch: Batch, index: int) -> int:
+        if "agent_id" not in batch.obs:
+            raise Exception("MCTSPolicy needs the agent_id of every observation")
+        agent_id = str(batch.obs.agent_id[index])
+        prefix, _, number = agent_id.rpartition("_")
+        if prefix != "player" or not number.isdigit():
+            raise Exception("MCTSPolicy needs agent ids like player_1", agent_id)
+        return int(number) - 1
+
+    def close(self):
+        """Stops the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def learn(self, batch: Batch, **kwargs: Any) -> Dict[str, float]:
+        """Since a search agent learns nothing, it returns an empty dict."""
+        return {}
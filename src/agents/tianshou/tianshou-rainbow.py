@@ -6,8 +6,6 @@ import numpy as np
 import wandb
 import torch
 from tianshou.data import Collector, VectorReplayBuffer, PrioritizedVectorReplayBuffer
-from tianshou.env import DummyVectorEnv
-from tianshou.env.pettingzoo_env import PettingZooEnv
 from tianshou.policy import BasePolicy, DQNPolicy, MultiAgentPolicyManager, RandomPolicy, RainbowPolicy
 from tianshou.trainer import offpolicy_trainer
 from tianshou.utils import WandbLogger
@@ -16,7 +14,9 @@ from torch.utils.tensorboard import SummaryWriter
 
 from agents.tianshou.long_playing_policy import LongPlayingPolicy
 from agents.tianshou.lowest_value_taker_policy import LowestValueTakerPolicy
-from env.wrapped_quox_env import wrapped_quox_env
+from env.results_sink import BufferedResultsSink, WandbResultsSink
+from env.shared_memory_vector_env import SharedMemoryVectorEnv
+from env.wrapped_quox_env import headless_quox_env
 
 
 def _get_agents(
@@ -27,7 +27,7 @@ def _get_agents(
         opponent_path: str = None
 ) -> Tuple[BasePolicy, torch.optim.Optimizer, list]:
 
-    env = _get_env(wandb)
+    env = headless_quox_env()
     observation_space = (
         env.observation_space["observation"]
     )
@@ -64,12 +64,6 @@ def _get_agents(
     policy = MultiAgentPolicyManager(agents, env)
     return policy, optim, env.agents
 
-def _get_env(wandb):
-    """This function is needed to provide callables for DummyVectorEnv."""
-    env = wrapped_quox_env()
-    env.unwrapped.wandb = wandb
-    return PettingZooEnv(env)
-
 
 if __name__ == "__main__":
 
@@ -78,9 +72,10 @@ if __name__ == "__main__":
     logger.load(SummaryWriter(log_path))
 
     # ======== Step 1: Environment setup =========
-    _get_env_with_wandb = lambda: _get_env(logger.wandb_run)
-    train_envs = DummyVectorEnv([_get_env_with_wandb for _ in range(10)])
-    test_envs = DummyVectorEnv([_get_env_with_wandb for _ in range(10)])
+    # the workers send the game results back, as only this process owns the wandb run
+    results_sink = BufferedResultsSink(WandbResultsSink(logger.wandb_run))
+    train_envs = SharedMemoryVectorEnv([headless_quox_env for _ in range(10)], results_sink=results_sink)
+    test_envs = SharedMemoryVectorEnv([headless_quox_env for _ in range(10)], results_sink=results_sink)
 
     # seed
     seed = 1
@@ -154,4 +149,7 @@ if __name__ == "__main__":
     # return result, policy.policies[agents[1]]
     print(f"\n==========Result==========\n{result}")
     print("\n(the trained policy can be accessed via policy.policies[agents[1]])")
+    train_envs.close()
+    test_envs.close()
+    results_sink.close()
     logger.wandb_run.finish()
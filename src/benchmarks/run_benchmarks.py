@@ -0,0 +1,307 @@
+"""
+Throughput benchmarks for the env and the policies.
+
+`export PYTHONPATH="${PYTHONPATH}:$(pwd)/src" && python3 src/benchmarks/run_benchmarks.py`
+
+Every benchmark plays seeded games and reports steps (or observations) per second as the best of several repeats.
+The results are printed as JSON and compared against src/benchmarks/baseline.json. The exit code is 1 if a benchmark
+is slower than its baseline by more than the tolerance. The baseline is only meaningful on the machine it was recorded
+on, so it isn't committed: the first run records it, and a baseline from another machine or software stack is not
+compared with but reported with a warning. Use --update-baseline after an intended change.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, Optional
+
+import numpy as np
+import torch
+from tianshou.data import Batch
+from tianshou.policy import BasePolicy
+
+from agents.export_dqn import export_dqn
+from agents.exported_dqn_agent import ExportedDQNAgent
+from agents.tianshou.long_playing_policy import LongPlayingPolicy
+from agents.tianshou.lowest_value_taker_policy import LowestValueTakerPolicy
+from env.qwox_env import QwoxEnv
+from env.results_sink import NullResultsSink
+from env.tianshou_qwox_env import TianshouQwoxEnv
+from env.wrapped_quox_env import wrapped_quox_env
+from manual_testing.utils import load_trained_agent
+
+SEED = 0
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DQN_POLICY_NUMBER = 103
+OBSERVE_REPEATS = 20
+
+
+def _create_env() -> QwoxEnv:
+    return QwoxEnv(results_sink=NullResultsSink(), render_mode=None)
+
+
+def benchmark_raw_env(steps: int) -> tuple[int, float]:
+    """Random legal actions on QwoxEnv, including the observe() of the next agent"""
+    rng = random.Random(SEED)
+    env = _create_env()
+    env.reset(seed=SEED)
+    start = time.perf_counter()
+    for _ in range(steps):
+        if env.board.is_game_finished():
+            env.reset()
+        observation = env.observe(env.agent_selection)
+        env.step(rng.choice(np.flatnonzero(observation["action_mask"])))
+    return steps, time.perf_counter() - start
+
+
+def benchmark_wrapped_env(steps: int) -> tuple[int, float]:
+    """Random legal actions through the wrapper chain of wrapped_quox_env()"""
+    rng = random.Random(SEED)
+    env = wrapped_quox_env(render_mode=None)
+    env.unwrapped.results_sink = NullResultsSink()
+    env.reset(seed=SEED)
+    start = time.perf_counter()
+    for _ in range(steps):
+        observation, _, done, _ = env.last()
+        if done:
+            env.reset()
+            observation, _, _, _ = env.last()
+        env.step(rng.choice(np.flatnonzero(observation["action_mask"])))
+    return steps, time.perf_counter() - start
+
+
+def benchmark_headless_env(steps: int) -> tuple[int, float]:
+    """Random legal actions through TianshouQwoxEnv, the env of the training scripts"""
+    rng = random.Random(SEED)
+    env = TianshouQwoxEnv(_create_env())
+    observation = env.reset(seed=SEED)
+    start = time.perf_counter()
+    for _ in range(steps):
+        observation, _, done, _ = env.step(rng.choice(np.flatnonzero(observation["mask"])))
+        if done:
+            observation = env.reset()
+    return steps, time.perf_counter() - start
+
+
+def _measure_in_random_positions(observations: int, measure: Callable[[QwoxEnv], None]) -> tuple[int, float]:
+    """Plays random games and measures OBSERVE_REPEATS calls of measure in every position"""
+    rng = random.Random(SEED)
+    env = _create_env()
+    env.reset(seed=SEED)
+    seconds = 0.0
+    for _ in range(observations // OBSERVE_REPEATS):
+        if env.board.is_game_finished():
+            env.reset()
+        start = time.perf_counter()
+        for _ in range(OBSERVE_REPEATS):
+            measure(env)
+        seconds += time.perf_counter() - start
+        env.step(rng.choice(np.flatnonzero(env.observe(env.agent_selection)["action_mask"])))
+    return observations // OBSERVE_REPEATS * OBSERVE_REPEATS, seconds
+
+
+def benchmark_observe(observations: int) -> tuple[int, float]:
+    """QwoxEnv.observe() without its cache, so every call builds the observation and the action mask"""
+    def observe(env: QwoxEnv):
+        env.invalidate_observation_cache()
+        env.observe(env.agent_selection)
+
+    return _measure_in_random_positions(observations, observe)
+
+
+def benchmark_action_mask(observations: int) -> tuple[int, float]:
+    """Board.get_allowed_actions_mask() on its own"""
+    def get_action_mask(env: QwoxEnv):
+        agent = env.agent_selection
+        env.board.get_allowed_actions_mask(
+            agent,
+            is_tossing_player=env.get_tossing_agent_index(env.current_round) == env.agent_name_mapping[agent],
+            is_second_part_of_round=QwoxEnv.is_second_part_of_round(env.total_started_step_count, env.num_agents))
+
+    return _measure_in_random_positions(observations, get_action_mask)
+
+
+def _play_games(policy: BasePolicy, steps: int) -> tuple[int, float]:
+    """Lets the policy play both seats on TianshouQwoxEnv, one Batch per decision like in play_without_training"""
+    env = TianshouQwoxEnv(_create_env())
+    observation = env.reset(seed=SEED)
+    start = time.perf_counter()
+    for _ in range(steps):
+        batch = Batch(obs=Batch(obs=observation["obs"][None], mask=observation["mask"][None]), info={})
+        observation, _, done, _ = env.step(policy(batch).act[0])
+        if done:
+            observation = env.reset()
+    return steps, time.perf_counter() - start
+
+
+def benchmark_lowest_value_taker_games(steps: int) -> tuple[int, float]:
+    return _play_games(LowestValueTakerPolicy(), steps)
+
+
+def benchmark_long_playing_games(steps: int) -> tuple[int, float]:
+    return _play_games(LongPlayingPolicy(), steps)
+
+
+def _collect_observations(count: int) -> tuple[np.ndarray, np.ndarray]:
+    """:return: observations and masks of seeded games between LongPlayingPolicy agents"""
+    policy = LongPlayingPolicy()
+    env = TianshouQwoxEnv(_create_env())
+    observation = env.reset(seed=SEED)
+    observations, masks = [], []
+    while len(observations) < count:
+        observations.append(observation["obs"])
+        masks.append(observation["mask"])
+        batch = Batch(obs=Batch(obs=observation["obs"][None], mask=observation["mask"][None]), info={})
+        observation, _, done, _ = env.step(policy(batch).act[0])
+        if done:
+            observation = env.reset()
+    return np.array(observations), np.array(masks)
+
+
+def _benchmark_dqn(observation_count: int, batch_size: int) -> tuple[int, float]:
+    policy = load_trained_agent(DQN_POLICY_NUMBER)
+    observations, masks = _collect_observations(observation_count)
+    with torch.no_grad():
+        start = time.perf_counter()
+        for index in range(0, observation_count, batch_size):
+            policy(Batch(obs=Batch(obs=observations[index:index + batch_size], mask=masks[index:index + batch_size]),
+                         info={}))
+        return observation_count, time.perf_counter() - start
+
+
+def benchmark_dqn_inference(observations: int) -> tuple[int, float]:
+    """policy-103 deciding one observation at a time, like an agent in a game"""
+    return _benchmark_dqn(observations, 1)
+
+
+def benchmark_dqn_batch_inference(observations: int) -> tuple[int, float]:
+    """policy-103 deciding batches of 64 observations, like a Collector over many envs"""
+    return _benchmark_dqn(observations, 64)
+
+
+def benchmark_exported_dqn_inference(observation_count: int) -> tuple[int, float]:
+    """policy-103 exported to TorchScript, deciding one observation at a time without tianshou"""
+    with tempfile.TemporaryDirectory() as directory:
+        agent = ExportedDQNAgent(export_dqn(DQN_POLICY_NUMBER, path=os.path.join(directory, "policy.pt")))
+    observations, masks = _collect_observations(observation_count)
+    start = time.perf_counter()
+    for observation, mask in zip(observations, masks):
+        agent.choose_action(observation, mask)
+    return observation_count, time.perf_counter() - start
+
+
+# name: (benchmark, steps or observations per repeat)
+BENCHMARKS: dict[str, tuple[Callable[[int], tuple[int, float]], int]] = {
+    "raw_env": (benchmark_raw_env, 5_000),
+    "wrapped_env": (benchmark_wrapped_env, 5_000),
+    "headless_env": (benchmark_headless_env, 5_000),
+    "observe": (benchmark_observe, 20_000),
+    "action_mask": (benchmark_action_mask, 20_000),
+    "lowest_value_taker_games": (benchmark_lowest_value_taker_games, 5_000),
+    "long_playing_games": (benchmark_long_playing_games, 5_000),
+    "dqn_inference": (benchmark_dqn_inference, 2_000),
+    "dqn_batch_inference": (benchmark_dqn_batch_inference, 6_400),
+    "exported_dqn_inference": (benchmark_exported_dqn_inference, 2_000),
+}
+
+
+def run_benchmarks(names: Optional[list[str]] = None, repeats: int = 5, scale: float = 1.0) -> dict:
+    """
+    :param names: benchmarks to run, all if None
+    :param scale: factor for the steps per repeat, e.g. 0.1 for a quick check
+    :return: steps per second of every benchmark as the best of the repeats. A benchmark that fails reports the error
+        instead, so one broken part doesn't hide the numbers of the others.
+    """
+    torch.manual_seed(SEED)
+    results = {}
+    for name in names or BENCHMARKS:
+        benchmark, steps = BENCHMARKS[name]
+        steps = max(1, int(steps * scale))
+        try:
+            timings = [benchmark(steps) for _ in range(repeats)]
+        except Exception as exception:
+            results[name] = {"error": repr(exception)}
+            continue
+        measured_steps = timings[0][0]
+        seconds = min(seconds for _, seconds in timings)
+        results[name] = {"steps": measured_steps, "seconds": seconds, "steps_per_second": measured_steps / seconds}
+    return results
+
+
+def get_environment_info() -> dict:
+    return {"python": platform.python_version(), "numpy": np.__version__, "torch": torch.__version__,
+            "platform": platform.platform(), "processor": platform.processor(), "cpu_count": os.cpu_count()}
+
+
+def get_environment_differences(baseline_environment: dict) -> list[str]:
+    """:return: the entries of get_environment_info() which differ from the environment the baseline was recorded in"""
+    environment = get_environment_info()
+    return [key for key in sorted(set(environment) | set(baseline_environment))
+            if environment.get(key) != baseline_environment.get(key)]
+
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float) -> dict:
+    """
+    :param baseline: benchmarks of an earlier run, as in the "benchmarks" entry of the JSON output
+    :param tolerance: allowed slowdown, 0.2 allows 20% fewer steps per second than the baseline
+    :return: per benchmark the baseline steps per second, the ratio to it and whether it regressed. Benchmarks
+        without a baseline are left out, failed benchmarks count as regressions.
+    """
+    comparison = {}
+    for name, result in results.items():
+        if "steps_per_second" not in baseline.get(name, {}):
+            continue
+        baseline_steps_per_second = baseline[name]["steps_per_second"]
+        if "error" in result:
+            comparison[name] = {"baseline": baseline_steps_per_second, "ratio": 0.0, "regression": True}
+            continue
+        ratio = result["steps_per_second"] / baseline_steps_per_second
+        comparison[name] = {"baseline": baseline_steps_per_second, "ratio": ratio, "regression": ratio < 1 - tolerance}
+    return comparison
+
+
+def main(arguments: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measures the throughput of the Qwox env and policies")
+    parser.add_argument("benchmarks", nargs="*", help=f"benchmarks to run, default all of {', '.join(BENCHMARKS)}")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="factor for the steps per repeat")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="store the results as new baseline")
+    parser.add_argument("--output", help="additionally write the JSON results to this file")
+    args = parser.parse_args(arguments)
+    unknown_benchmarks = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown_benchmarks:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown_benchmarks))}")
+
+    results = run_benchmarks(args.benchmarks or None, repeats=args.repeats, scale=args.scale)
+    report = {"environment": get_environment_info(), "seed": SEED, "benchmarks": results}
+
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Recorded the baseline in {args.baseline}", file=sys.stderr)
+    else:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        differences = get_environment_differences(baseline["environment"])
+        if differences:
+            print(f"Not comparing with {args.baseline}, it was recorded with another {', '.join(differences)}. "
+                  f"Use --update-baseline to record a baseline here.", file=sys.stderr)
+        else:
+            report["comparison"] = compare_with_baseline(results, baseline["benchmarks"], args.tolerance)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    return int(any(entry["regression"] for entry in report.get("comparison", {}).values()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
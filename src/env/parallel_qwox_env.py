@@ -0,0 +1,144 @@
+import functools
+from typing import Optional
+
+import numpy as np
+from gym import spaces
+from gym.spaces import Box, Discrete
+from pettingzoo import ParallelEnv
+from pettingzoo.utils.env import AgentID
+
+from game_models.board import Board
+from game_models.dice_stream import DiceStream
+from game_models.game_card import GameCard
+
+
+class ParallelQwoxEnv(ParallelEnv):
+    """
+    Parallel variant of QwoxEnv, which needs two steps per round instead of two steps per agent.
+
+    In the first step of a round every agent submits its choice for the white dices and all choices are resolved
+    together, so the action masks of this step are based on the board before anyone crossed something. In the second
+    step only the action of the tossing agent for the coloured dices is used; the other agents can only choose one of
+    the "do nothing" actions, which are ignored.
+    """
+
+    ACTION_SPACE_SIZE = 55
+
+    metadata = {
+        "render_modes": ["human"],
+        "name": "qwoxxv1_parallel",
+        "is_parallelizable": True,
+        "render_fps": 1,
+    }
+
+    def __init__(self, game_card_class: type = GameCard, num_players: int = 2):
+        if not 2 <= num_players <= 5:
+            raise Exception("Qwox is played by 2 to 5 players", num_players)
+        self.game_card_class = game_card_class
+        self.possible_agents: list[AgentID] = [AgentID(f"player_{index + 1}") for index in range(num_players)]
+        self.agents = self.possible_agents[:]
+        self.seed()
+        self.board: Board = Board(self.possible_agents, game_card_class=self.game_card_class,
+                                  dice_stream=self.dice_stream)
+        self.current_round = 1
+        self.is_second_part_of_round = False
+
+    @functools.lru_cache(maxsize=None)
+    def observation_space(self, agent):
+        return spaces.Dict(
+            {
+                "observation": Box(low=0, high=6, shape=(
+                    len(self.possible_agents) + 1, GameCard.OBSERVATION_SHAPE_ROWS,
+                    GameCard.OBSERVATION_SHAPE_COLUMNS), dtype=np.int8),
+                "action_mask": Box(low=0, high=1, shape=(self.ACTION_SPACE_SIZE,), dtype=np.int8)
+            })
+
+    @functools.lru_cache(maxsize=None)
+    def action_space(self, agent):
+        return Discrete(self.ACTION_SPACE_SIZE)
+
+    def get_tossing_agent(self) -> AgentID:
+        return self.possible_agents[(self.current_round - 1) % len(self.possible_agents)]
+
+    def seed(self, seed: Optional[int] = None) -> Optional[int]:
+        self.np_random = np.random.default_rng(seed)
+        self.dice_stream = DiceStream(self.np_random)
+        return seed
+
+    def observe(self, agent: AgentID):
+        is_tossing_agent = self.get_tossing_agent() == agent
+        return {"observation": self.board.get_observation(player_id=agent,
+                                                          is_tossing_player=is_tossing_agent,
+                                                          is_second_part_of_round=self.is_second_part_of_round),
+                "action_mask": self.board.get_allowed_actions_mask(agent,
+                                                                   is_tossing_player=is_tossing_agent,
+                                                                   is_second_part_of_round=self.is_second_part_of_round).flatten()}
+
+    def reset(self, seed: Optional[int] = None, return_info=False, options=None):
+        self.agents = self.possible_agents[:]
+        if seed is not None:
+            self.seed(seed)
+        self.board = Board(player_ids=self.possible_agents, game_card_class=self.game_card_class,
+                           dice_stream=self.dice_stream)
+        self.board.roll_dices()
+        self.current_round = 1
+        self.is_second_part_of_round = False
+
+        observations = {agent: self.observe(agent) for agent in self.agents}
+        if return_info:
+            return observations, {agent: {} for agent in self.agents}
+        return observations
+
+    def step(self, actions: dict):
+        """
+        :param actions: action per agent. In the second part of a round only the tossing agent's action is used.
+        :return: observations, rewards, dones and infos per agent
+        """
+        acting_agents = [self.get_tossing_agent()] if self.is_second_part_of_round else self.agents
+        observations = {agent: self.observe(agent) for agent in acting_agents}
+        for agent in acting_agents:
+            if actions[agent] not in np.flatnonzero(observations[agent]["action_mask"]):
+                raise Exception("Wrong action", agent, actions[agent],
+                                observations[agent]["action_mask"].reshape(5, 11))
+
+        starting_points = {agent: self.board.game_cards[agent].get_points() for agent in self.agents}
+        for agent in acting_agents:
+            self.board.game_cards[agent].cross_value_with_flattened_action(actions[agent])
+        rewards = {agent: self.board.game_cards[agent].get_points() - starting_points[agent]
+                   for agent in self.agents}
+
+        is_game_finished = self.board.is_game_finished()
+        self.set_state_for_next_step()
+
+        observations = {agent: self.observe(agent) for agent in self.agents}
+        dones = {agent: is_game_finished for agent in self.agents}
+        infos = {agent: {} for agent in self.agents}
+        if is_game_finished:
+            self.agents = []
+
+        return observations, rewards, dones, infos
+
+    def set_state_for_next_step(self):
+        if self.is_second_part_of_round:
+            for card in self.board.game_cards.values():
+                card.crossed_something_in_current_round = False
+            self.board.roll_dices()
+            self.current_round += 1
+
+        self.is_second_part_of_round = not self.is_second_part_of_round
+
+    def render(self, mode="human"):
+        print("Dices", self.board.dices)
+        print("Round", self.current_round,
+              "part", 2 if self.is_second_part_of_round else 1,
+              "| Tossing Agent: ", self.get_tossing_agent(),
+              "| Closed Rows", self.board.get_closed_row_indexes())
+        for agent in self.possible_agents:
+            print(agent, "| Passes used", self.board.game_cards[agent].get_pass_count(), "| Current Points:",
+                  self.board.game_cards[agent].get_points())
+
+    def state(self) -> np.ndarray:
+        return np.array([])
+
+    def close(self):
+        pass
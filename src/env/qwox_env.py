@@ -1,6 +1,7 @@
 import datetime
 import functools
 import logging
+import os
 from typing import Optional
 
 import numpy as np
@@ -10,21 +11,52 @@ from pettingzoo import AECEnv
 from pettingzoo.utils import agent_selector
 from pettingzoo.utils.env import AgentID
 
+from env.results_sink import ResultsSink, WandbResultsSink, CsvResultsSink, get_shared_results_sink
+from env.step_profiler import StepProfiler
 from game_models.board import Board
+from game_models.dice_stream import DiceStream
 from game_models.game_card import GameCard
+from game_models import zobrist
+
+
+@functools.lru_cache(maxsize=None)
+def get_snapshot_dtype(num_players: int) -> np.dtype:
+    """
+    Fixed-size packed layout of a whole game state, see QwoxEnv.get_state_snapshot(). Every card row is packed
+    into an integer, where bit n is column n of the row.
+    """
+    return np.dtype([
+        ("row_bits", np.uint16, (num_players, GameCard.OBSERVATION_SHAPE_ROWS)),
+        ("crossed_something_in_current_round", np.bool_, (num_players,)),
+        ("dices", np.int8, (6,)),
+        ("total_started_step_count", np.int32),
+        ("agent_selection", np.int8),
+        ("dones", np.bool_, (num_players,)),
+        ("rewards", np.int16, (num_players,)),
+        ("cumulative_rewards", np.int16, (num_players,)),
+    ])
 
 
 class QwoxEnv(AECEnv):
     WHITE_DICE_ACTION = "white_dice_action"
     COLOR_DICE_ACTION = "color_dice_action"
     ACTION_SPACE_SIZE = 55
+    MIN_PLAYERS = 2
+    MAX_PLAYERS = 5
 
     def state(self) -> np.ndarray:
         # Not needed as long as I don't use training methods as described in super
         return np.array([])
 
-    def seed(self, seed: Optional[int] = None) -> int:
-        return 42
+    def seed(self, seed: Optional[int] = None) -> Optional[int]:
+        """
+        Creates a new random generator for the dices, which is used from the next roll on
+        """
+        self.np_random = np.random.default_rng(seed)
+        self.dice_stream = DiceStream(self.np_random)
+        if hasattr(self, "board"):
+            self.board.dice_stream = self.dice_stream
+        return seed
 
     metadata = {
         "render_modes": ["human"],
@@ -33,10 +65,28 @@ class QwoxEnv(AECEnv):
         "render_fps": 1,
     }
 
-    def __init__(self):
+    def __init__(self, game_card_class: type = GameCard, copy_observations: bool = True,
+                 results_sink: Optional[ResultsSink] = None, render_mode: Optional[str] = "human",
+                 num_players: int = 2, profile: bool = False):
+        """
+        :param game_card_class: card implementation used by the board, e.g. BitboardGameCard for faster rollouts
+        :param copy_observations: if False, observe() hands out read-only views of the board's observation buffers,
+            which are overwritten once the state changed. Only for consumers that copy observations anyway, like
+            replay buffers.
+        :param results_sink: receives one record per finished game, see get_results_sink() for the default
+        :param render_mode: "human" prints the board at the end of each game, None never formats or prints anything
+        :param num_players: players at the table, named player_1 to player_<num_players>
+        :param profile: measure the time of every phase of step() and observe(), see get_profile_stats()
+        """
+        if not self.MIN_PLAYERS <= num_players <= self.MAX_PLAYERS:
+            raise Exception("Qwox is played by 2 to 5 players", num_players)
+
         super().__init__()
+        self.render_mode = render_mode
+        self.game_card_class = game_card_class
+        self.copy_observations = copy_observations
         self.current_round = 1
-        self.possible_agents: list[AgentID] = [AgentID("player_1"), AgentID("player_2")]
+        self.possible_agents: list[AgentID] = [AgentID(f"player_{index + 1}") for index in range(num_players)]
         self.agents = self.possible_agents[:]
 
         self._action_spaces = {agent: self.action_space(agent) for agent in self.agents}
@@ -49,10 +99,17 @@ class QwoxEnv(AECEnv):
         self.agent_name_mapping = dict(
             zip(self.possible_agents, list(range(len(self.possible_agents))))
         )
-        self.board: Board = Board(self.possible_agents)
+        self.seed()
+        self.board: Board = Board(self.possible_agents, game_card_class=self.game_card_class,
+                                  dice_stream=self.dice_stream)
         self.dones: {AgentID: bool} = {agent_id: False for agent_id in self.agents}
         self.total_started_step_count = 1
         self.wandb = None
+        self.results_sink = results_sink
+        self._has_shared_results_sink = False
+        self.profiler: Optional[StepProfiler] = StepProfiler() if profile else None
+        self._state_version = 0
+        self._observation_cache: dict[AgentID, tuple[int, dict]] = {}
 
     # this cache ensures that same space object is returned for the same agent
     # allows action space seeding to work as expected
@@ -72,6 +129,9 @@ class QwoxEnv(AECEnv):
         return Discrete(self.ACTION_SPACE_SIZE)
 
     def render(self, mode: str = "human"):
+        if self.render_mode is None:
+            return
+
         print("")
         print("")
         print("Dices", self.board.dices)
@@ -119,7 +179,7 @@ class QwoxEnv(AECEnv):
             print("#################################################")
             print("started steps", self.total_started_step_count)
             print("Dices", self.board.dices)
-            is_tossing_agent = self.get_tossing_agent_index(self.current_round) == self.agents.index(agent_id)
+            is_tossing_agent = self.get_tossing_agent_index(self.current_round) == self.agent_name_mapping[agent_id]
             print("---------------------------------------")
             part_of_round = 2 if self.is_second_part_of_round(self.total_started_step_count, self.num_agents) else 1
             print(agent_id, "| Round", self.current_round,
@@ -148,15 +208,99 @@ class QwoxEnv(AECEnv):
         Observe should return the observation of the specified agent. This function
         should return a sane observation (though not necessarily the most up to date possible)
         at any time after reset() is called.
+
+        Observations are cached per agent until the state changes through step() or reset(). Code that changes the
+        board directly has to call invalidate_observation_cache() afterwards. With profiling, only the observations
+        which are built count for the "observe" and "action_mask" phases, not the ones from the cache.
         """
-        is_tossing_agent = self.get_tossing_agent_index(self.current_round) == self.agents.index(agent)
+        cached_observation = self._observation_cache.get(agent)
+        if cached_observation is not None and cached_observation[0] == self._state_version:
+            return cached_observation[1]
+
+        profiler = self.profiler
+        if profiler is not None:
+            start = profiler.now()
+        is_tossing_agent = self.get_tossing_agent_index(self.current_round) == self.agent_name_mapping[agent]
         is_second_part_of_round = QwoxEnv.is_second_part_of_round(self.total_started_step_count, self.num_agents)
-        return {"observation": self.board.get_observation(player_id=agent,
+        board_observation = self.board.get_observation(player_id=agent,
+                                                       is_tossing_player=is_tossing_agent,
+                                                       is_second_part_of_round=is_second_part_of_round,
+                                                       copy=self.copy_observations)
+        if profiler is not None:
+            start = profiler.add_since("observe", start)
+        action_mask = self.board.get_allowed_actions_mask(agent,
                                                           is_tossing_player=is_tossing_agent,
-                                                          is_second_part_of_round=is_second_part_of_round),
-                "action_mask": self.board.get_allowed_actions_mask(agent,
-                                                                   is_tossing_player=is_tossing_agent,
-                                                                   is_second_part_of_round=is_second_part_of_round).flatten()}
+                                                          is_second_part_of_round=is_second_part_of_round).flatten()
+        if profiler is not None:
+            profiler.add_since("action_mask", start)
+        observation = {"observation": board_observation, "action_mask": action_mask}
+        self._observation_cache[agent] = (self._state_version, observation)
+        return observation
+
+    def get_zobrist_hash(self) -> int:
+        """
+        Hash of the game state: cards, dices, part of the round, tossing agent, agent to move and which agents
+        crossed something in the current round. The round number and rewards are not part of it.
+        """
+        state_hash = self.board.get_zobrist_hash()
+        state_hash ^= zobrist.PHASE_KEYS[QwoxEnv.is_second_part_of_round(self.total_started_step_count,
+                                                                         self.num_agents)]
+        state_hash ^= zobrist.TOSSING_SEAT_KEYS[self.get_tossing_agent_index(self.current_round)]
+        state_hash ^= zobrist.SEAT_TO_MOVE_KEYS[self.agent_name_mapping[self.agent_selection]]
+        for seat, agent in enumerate(self.agents):
+            if self.board.game_cards[agent].crossed_something_in_current_round:
+                state_hash ^= zobrist.CROSSED_IN_CURRENT_ROUND_KEYS[seat]
+        return state_hash
+
+    def invalidate_observation_cache(self):
+        self._state_version += 1
+
+    def get_state_snapshot(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Packs the whole game state (cards, passes, dices, step counter, agent selection and rewards) into a structure
+        of get_snapshot_dtype(num_agents), which is a few dozen bytes. The random generator of the dices is not part
+        of the snapshot, so after restoring, the following rolls come from this env's generator.
+        :param out: existing snapshot to overwrite, e.g. an element of a preallocated array of snapshots
+        """
+        snapshot = np.zeros((), dtype=get_snapshot_dtype(self.num_agents)) if out is None else out
+        row_bits = snapshot["row_bits"]
+        crossed_something_in_current_round = snapshot["crossed_something_in_current_round"]
+        for index, agent in enumerate(self.agents):
+            card = self.board.game_cards[agent]
+            card.write_row_bits(row_bits[index])
+            crossed_something_in_current_round[index] = card.crossed_something_in_current_round
+        snapshot["dones"] = [self.dones[agent] for agent in self.agents]
+        snapshot["rewards"] = [self.rewards[agent] for agent in self.agents]
+        snapshot["cumulative_rewards"] = [self._cumulative_rewards[agent] for agent in self.agents]
+        snapshot["dices"] = [dice.current_value for dice in self.board.dices]
+        snapshot["total_started_step_count"] = self.total_started_step_count
+        snapshot["agent_selection"] = self.agent_name_mapping[self.agent_selection]
+        return snapshot
+
+    def restore_state_snapshot(self, snapshot: np.ndarray):
+        """
+        Sets the game to the state of a snapshot from get_state_snapshot() of an env with the same number of agents.
+        The existing board, cards and dices are updated in place.
+        """
+        row_bits = snapshot["row_bits"]
+        crossed_something_in_current_round = snapshot["crossed_something_in_current_round"].tolist()
+        for index, agent in enumerate(self.agents):
+            card = self.board.game_cards[agent]
+            card.set_row_bits(row_bits[index])
+            card.crossed_something_in_current_round = crossed_something_in_current_round[index]
+        self.board.restore_tracking()
+        self.board.set_dice_values(snapshot["dices"].tolist())
+
+        self.total_started_step_count = int(snapshot["total_started_step_count"])
+        self.current_round = QwoxEnv.get_round(self.total_started_step_count, self.num_agents)
+        agent_index = int(snapshot["agent_selection"])
+        self.agent_selection = self.agents[agent_index]
+        self._agent_selector._current_agent = (agent_index + 1) % self.num_agents
+        self._agent_selector.selected_agent = self.agent_selection
+        self.dones = dict(zip(self.agents, snapshot["dones"].tolist()))
+        self.rewards = dict(zip(self.agents, snapshot["rewards"].tolist()))
+        self._cumulative_rewards = dict(zip(self.agents, snapshot["cumulative_rewards"].tolist()))
+        self.invalidate_observation_cache()
 
     def close(self):
         """
@@ -164,7 +308,10 @@ class QwoxEnv(AECEnv):
         or any other environment data which should not be kept around after the
         user is no longer using the environment.
         """
-        pass
+        if self.results_sink is not None and not self._has_shared_results_sink:
+            self.results_sink.close()
+        self.results_sink = None
+        self._has_shared_results_sink = False
 
     def reset(self, seed=None, return_info=False, options=None):
         """
@@ -180,7 +327,10 @@ class QwoxEnv(AECEnv):
         Here it sets up the state dictionary which is used by step() and the observations dictionary which is used by step() and observe()
         """
         self.agents: list[AgentID] = self.possible_agents[:]
-        self.board = Board(player_ids=self.possible_agents)
+        if seed is not None:
+            self.seed(seed)
+        self.board = Board(player_ids=self.possible_agents, game_card_class=self.game_card_class,
+                           dice_stream=self.dice_stream)
         self.board.roll_dices()
         self.rewards: {AgentID: int} = {agent: 0 for agent in self.agents}
         self._cumulative_rewards: {AgentID: int} = {agent: 0 for agent in self.agents}
@@ -189,6 +339,7 @@ class QwoxEnv(AECEnv):
         self.total_started_step_count = 1
         self.agent_selection = self.agents[0]
         self._agent_selector.reset()
+        self.invalidate_observation_cache()
 
     def step(self, action):
         """
@@ -208,69 +359,121 @@ class QwoxEnv(AECEnv):
             # the next done agent,  or if there are no more done agents, to the next live agent
             return self._was_done_step(None)
 
+        profiler = self.profiler
+        if profiler is not None:
+            step_start = start = profiler.now()
+
         current_agent_id: AgentID = self.agent_selection
-        is_tossing_agent = self.get_tossing_agent_index(self.current_round) == self.agents.index(current_agent_id)
+        is_tossing_agent = self.get_tossing_agent_index(self.current_round) == self.agent_name_mapping[current_agent_id]
         is_second_part_of_round = QwoxEnv.is_second_part_of_round(self.total_started_step_count, self.num_agents)
         current_game_card: GameCard = self.board.game_cards[current_agent_id]
-        starting_points = current_game_card.get_points()
 
-        if action is None:
+        if action is None and self.render_mode == "human":
             print("Agent chose no action ", current_agent_id)
 
         if is_second_part_of_round and not is_tossing_agent:
-            logging.debug("skip agent ", current_agent_id, "with action", action)
+            logging.debug("skip agent %s with action %s", current_agent_id, action)
             self.rewards = {agent: 0 for agent in self.agents}
         else:
-            if action not in np.flatnonzero(self.observe(current_agent_id)["action_mask"]):
-                raise Exception("Wrong action", action, self.observe(current_agent_id)["action_mask"].reshape(5, 11))
+            action_mask = self.observe(current_agent_id)["action_mask"]
+            if profiler is not None:
+                start = profiler.now()
+            if action is None or not 0 <= action < len(action_mask) or not action_mask[action]:
+                raise Exception("Wrong action", action, action_mask.reshape(5, 11))
+            if profiler is not None:
+                start = profiler.add_since("action_validation", start)
+
+            starting_points = current_game_card.get_points()
+            if profiler is not None:
+                now = profiler.now()
+                reward_seconds = now - start
+                start = now
 
             # DO ACTION
             current_game_card.cross_value_with_flattened_action(action)
+            self.invalidate_observation_cache()
+            if profiler is not None:
+                start = profiler.add_since("cross_value", start)
 
             for agent in self.agents:
                 if agent == current_agent_id:
                     self.rewards[current_agent_id] = current_game_card.get_points() - starting_points
                 else:
                     self.rewards[agent] = 0
+            if profiler is not None:
+                now = profiler.now()
+                profiler.add("reward", reward_seconds + now - start)
+                start = now
+
+            is_game_finished = self.board.is_game_finished()
+            self.dones = {agent: is_game_finished for agent in self.agents}
+            if profiler is not None:
+                start = profiler.add_since("finish_check", start)
+            if is_game_finished:
+                points = [self.board.game_cards[agent].get_points() for agent in self.agents]
+                if self.render_mode == "human":
+                    print("----------------------- > Total Rewards: Random Player:",
+                          points[0],
+                          "Learned Player: ", points[1])
+                    self.render()
+
+                self.log_game_result(points)
+                if profiler is not None:
+                    profiler.add_since("logging", start)
 
-            self.dones = {agent: self.board.is_game_finished() for agent in self.agents}
-            if self.board.is_game_finished():
-                learned_player_points = self.board.game_cards[self.agents[1]].get_points()
-                opponent_player_points = self.board.game_cards[self.agents[0]].get_points()
-                print("----------------------- > Total Rewards: Random Player:",
-                      opponent_player_points,
-                      "Learned Player: ", learned_player_points)
+        self.set_state_for_next_step(current_game_card, is_second_part_of_round)
+        if profiler is not None:
+            profiler.add_since("step", step_start)
 
-                self.render()
-                self.log_to_wandb_if_possible_or_file(learned_player_points, opponent_player_points)
+    def get_profile_stats(self) -> dict[str, dict]:
+        """
+        :return: calls, seconds and mean microseconds per phase of step() and observe() since the last reset of the
+            counters, see StepProfiler. Empty if the env was created without profile=True.
+        """
+        if self.profiler is None:
+            return {}
+        return self.profiler.get_stats()
 
-        self.set_state_for_next_step(current_game_card, is_second_part_of_round)
+    def reset_profile_stats(self):
+        if self.profiler is not None:
+            self.profiler.reset()
 
-    def log_to_wandb_if_possible_or_file(self, learned_player_points, opponent_player_points):
-        are_closed_rows_reason_for_finish = len(self.board.get_closed_row_indexes()) >= 2
-        finish_reason = 1 if are_closed_rows_reason_for_finish else 0
-        if self.wandb:
-
-            self.wandb.log({"player_1_points": opponent_player_points,
-                            "player_2_points": learned_player_points,
-                            "player_1_passes": self.board.game_cards[self.agents[0]].get_pass_count(),
-                            "player_2_passes": self.board.game_cards[self.agents[1]].get_pass_count(),
-                            "closed_rows": len(self.board.get_closed_row_indexes()),
-                            "point_difference": learned_player_points - opponent_player_points,
-                            "finish_reason": finish_reason,
-                            "agent1_winning": (1 if learned_player_points > opponent_player_points else 0)})
-        else:
-            with open('test-log.csv', 'a') as f:
-
-                f.write(
-                    "\n"
-                    f"{datetime.datetime.now().now().strftime('%Y-%m-%d %H:%M:%S')},"
-                    f"{opponent_player_points}, "
-                    f"{learned_player_points}, "
-                    f"{self.board.game_cards[self.agents[0]].get_pass_count()}, "
-                    f"{self.board.game_cards[self.agents[1]].get_pass_count()}, "
-                    f"{len(self.board.get_closed_row_indexes())}, "
-                    f"{finish_reason}")
+    def get_results_sink(self) -> ResultsSink:
+        """
+        Sink for the game results. If none was given, the results go to wandb if the env has a wandb run, otherwise
+        to test-log.csv. Either way they are written on a background thread, which all envs of the process logging
+        to the same target share.
+        """
+        if self.results_sink is None:
+            if self.wandb:
+                self.results_sink = get_shared_results_sink(("wandb", id(self.wandb)),
+                                                            lambda: WandbResultsSink(self.wandb))
+            else:
+                self.results_sink = get_shared_results_sink(("csv", os.path.abspath('test-log.csv')),
+                                                            lambda: CsvResultsSink('test-log.csv'))
+            self._has_shared_results_sink = True
+        return self.results_sink
+
+    def log_game_result(self, points: list[int]):
+        """
+        :param points: final points per agent in the order of agents. The learned player is player_2, so the point
+            difference and winning flag compare it against the best other player.
+        """
+        closed_rows = len(self.board.get_closed_row_indexes())
+        finish_reason = 1 if closed_rows >= 2 else 0
+        learned_player_points = points[1]
+        best_opponent_points = max(points[:1] + points[2:])
+        record = {"timestamp": datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        for agent, agent_points in zip(self.agents, points):
+            record[f"{agent}_points"] = agent_points
+        for agent in self.agents:
+            record[f"{agent}_passes"] = self.board.game_cards[agent].get_pass_count()
+        record.update({
+            "closed_rows": closed_rows,
+            "point_difference": learned_player_points - best_opponent_points,
+            "finish_reason": finish_reason,
+            "agent1_winning": (1 if learned_player_points > best_opponent_points else 0)})
+        self.get_results_sink().write(record)
 
     def set_state_for_next_step(self, current_game_card, is_second_part_of_round):
         # Reset for next round
@@ -282,9 +485,15 @@ class QwoxEnv(AECEnv):
         # Adds .rewards to ._cumulative_rewards
         self._accumulate_rewards()
         if self.total_started_step_count % (self.num_agents * 2) == 0:
+            profiler = self.profiler
+            if profiler is not None:
+                start = profiler.now()
             self.board.roll_dices()
+            if profiler is not None:
+                profiler.add_since("dice_roll", start)
         self.total_started_step_count += 1
         self.current_round = QwoxEnv.get_round(self.total_started_step_count, self.num_agents)
+        self.invalidate_observation_cache()
 
     def get_tossing_agent_index(self, current_round):
         return (current_round - 1) % self.num_agents
@@ -295,10 +504,7 @@ class QwoxEnv(AECEnv):
         steps_in_one_round = agent_count * 2
         # We want to start with round 1 not 0
         initial_offset = 1
-        if total_started_step_count <= steps_in_one_round:
-            return initial_offset
-        else:
-            return (total_started_step_count - 1) // steps_in_one_round + initial_offset
+        return (total_started_step_count - 1) // steps_in_one_round + initial_offset
 
     @staticmethod
     def is_second_part_of_round(total_started_step_count, num_agents):
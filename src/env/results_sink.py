@@ -0,0 +1,213 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Hashable, Optional
+
+
+class ResultsSink(ABC):
+    """
+    Receives one record (dict) per finished game. Implementations decide where the records go.
+    """
+
+    def write(self, record: dict):
+        self.write_batch([record])
+
+    @abstractmethod
+    def write_batch(self, records: list[dict]):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class NullResultsSink(ResultsSink):
+    """Discards all records, e.g. for simulations in search agents"""
+
+    def write_batch(self, records: list[dict]):
+        pass
+
+
+class CsvResultsSink(ResultsSink):
+    """
+    Appends the records to a csv file in the format of the existing test-log.csv files. The columns are taken from the
+    first record, so there are points and passes for every player of the game. A new file starts with a header.
+    """
+
+    def __init__(self, path: str = "test-log.csv"):
+        self.path = path
+        self.columns: Optional[list[str]] = None
+
+    @staticmethod
+    def get_columns(record: dict) -> list[str]:
+        """:return: points and passes of all players, closed rows and finish reason"""
+        return ([key for key in record if key.endswith("_points")] + [key for key in record if key.endswith("_passes")]
+                + ["closed_rows", "finish_reason"])
+
+    def write_batch(self, records: list[dict]):
+        if not records:
+            return
+        if self.columns is None:
+            self.columns = self.get_columns(records[0])
+        is_new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, 'a') as f:
+            if is_new_file:
+                f.write("timestamp," + ", ".join(self.columns))
+            for record in records:
+                f.write("\n"
+                        f"{record['timestamp']},"
+                        + ", ".join(str(record[column]) for column in self.columns))
+
+
+class JsonLinesResultsSink(ResultsSink):
+    """Offline local logger, which appends every record as one json line. Useful when wandb is not reachable."""
+
+    def __init__(self, path: str = "game-results.jsonl"):
+        self.path = path
+
+    def write_batch(self, records: list[dict]):
+        with open(self.path, 'a') as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+
+class ParquetResultsSink(ResultsSink):
+    """Writes every batch as a new parquet file into a directory. Needs pandas and pyarrow."""
+
+    def __init__(self, directory: str = "game-results"):
+        self.directory = directory
+        self._file_index = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def write_batch(self, records: list[dict]):
+        import pandas as pd
+
+        path = os.path.join(self.directory, f"part-{os.getpid()}-{self._file_index:05d}.parquet")
+        pd.DataFrame.from_records(records).to_parquet(path, index=False)
+        self._file_index += 1
+
+
+class WandbResultsSink(ResultsSink):
+    """Logs every record to a wandb run"""
+
+    def __init__(self, wandb):
+        self.wandb = wandb
+
+    def write_batch(self, records: list[dict]):
+        for record in records:
+            self.wandb.log({key: value for key, value in record.items() if key != "timestamp"})
+
+
+class BufferedResultsSink(ResultsSink):
+    """
+    Collects records in memory and hands them to the wrapped sink on a background thread, so writing a record never
+    blocks on file or network I/O. Records are passed on when max_batch_size records are waiting, when the oldest
+    waiting record is older than flush_interval seconds, on flush() and on close().
+    """
+
+    _CLOSE = object()
+
+    def __init__(self, sink: ResultsSink, max_batch_size: int = 100, flush_interval: float = 5.0):
+        self.sink = sink
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="results-sink", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write_batch(self, records: list[dict]):
+        if self._closed:
+            raise Exception("BufferedResultsSink is already closed", len(records))
+        for record in records:
+            self._queue.put(record)
+
+    def flush(self, timeout: float = 30.0):
+        """
+        Blocks until all records written so far are handed to the wrapped sink
+
+        :param timeout: seconds after which the records are given up on, e.g. when the wrapped sink hangs
+        """
+        if self._closed:
+            return
+        if not self._thread.is_alive():
+            raise Exception("Writer thread of BufferedResultsSink is not running", self._queue.qsize())
+        flushed = threading.Event()
+        self._queue.put(flushed)
+        deadline = time.monotonic() + timeout
+        # waits in short steps to notice a writer thread which died in the meantime
+        while not flushed.wait(timeout=min(0.1, max(deadline - time.monotonic(), 0))):
+            if not self._thread.is_alive() or time.monotonic() >= deadline:
+                raise Exception("Game results were not written in time", timeout, self._queue.qsize())
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self._queue.put(self._CLOSE)
+        self._thread.join()
+        self.sink.close()
+
+    def _run(self):
+        batch: list[dict] = []
+        deadline: Optional[float] = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, dict):
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            is_flush_or_close = item is self._CLOSE or isinstance(item, threading.Event)
+            is_due = deadline is not None and time.monotonic() >= deadline
+            if batch and (is_flush_or_close or is_due or len(batch) >= self.max_batch_size):
+                self._write_to_sink(batch)
+                batch = []
+                deadline = None
+
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is self._CLOSE:
+                return
+
+    def _write_to_sink(self, batch: list[dict]):
+        try:
+            self.sink.write_batch(batch)
+        except Exception:
+            logging.exception("Could not write %d game results", len(batch))
+
+
+_shared_sinks: dict[Hashable, BufferedResultsSink] = {}
+_shared_sinks_lock = threading.Lock()
+
+
+def get_shared_results_sink(key: Hashable, create_sink: Callable[[], ResultsSink]) -> BufferedResultsSink:
+    """
+    One BufferedResultsSink per key and process, so all envs which log to the same target share one writer thread.
+    Shared sinks are closed at exit and must not be closed by the envs using them.
+
+    :param key: identifies the target, e.g. the path of the csv file
+    :param create_sink: creates the wrapped sink if there is no open shared sink for the key yet
+    """
+    # a forked process doesn't inherit the writer thread, so it gets its own sinks
+    key = (os.getpid(), key)
+    with _shared_sinks_lock:
+        sink = _shared_sinks.get(key)
+        if sink is None or sink._closed:
+            sink = BufferedResultsSink(create_sink())
+            _shared_sinks[key] = sink
+        return sink
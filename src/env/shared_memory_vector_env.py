@@ -0,0 +1,265 @@
+import multiprocessing
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Optional, Union
+
+import numpy as np
+
+from env.results_sink import ResultsSink
+from env.tianshou_qwox_env import TianshouQwoxEnv
+
+
+class _CollectingResultsSink(ResultsSink):
+    """Keeps the game results of a worker's envs until they are sent to the main process with the step answer"""
+
+    def __init__(self):
+        self.records: list[dict] = []
+
+    def write_batch(self, records: list[dict]):
+        self.records.extend(records)
+
+    def pop_records(self) -> list[dict]:
+        records, self.records = self.records, []
+        return records
+
+
+def _get_array_specs(num_envs: int, num_players: int, observation_shape: tuple, action_count: int) -> dict:
+    """:return: shape and dtype of every array the workers share with the main process"""
+    return {
+        "obs": ((num_envs,) + observation_shape, np.int8),
+        "mask": ((num_envs, action_count), np.bool_),
+        "agent_index": ((num_envs,), np.int8),
+        "rewards": ((num_envs, num_players), np.int64),
+        "dones": ((num_envs,), np.bool_),
+        "actions": ((num_envs,), np.int64),
+    }
+
+
+def _attach_arrays(array_specs: dict, memory_names: dict) -> tuple[dict, list[SharedMemory]]:
+    memories = [SharedMemory(name=memory_names[key]) for key in array_specs]
+    arrays = {key: np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+              for (key, (shape, dtype)), memory in zip(array_specs.items(), memories)}
+    return arrays, memories
+
+
+def _write_observation(arrays: dict, env_id: int, env: TianshouQwoxEnv, observation: dict):
+    arrays["obs"][env_id] = observation["obs"]
+    arrays["mask"][env_id] = observation["mask"]
+    arrays["agent_index"][env_id] = env.agent_idx[observation["agent_id"]]
+
+
+def _run_worker(connection: Connection, env_fns: dict[int, Callable[[], TianshouQwoxEnv]], array_specs: dict,
+                memory_names: dict, forward_results: bool):
+    """
+    Hosts the envs of one worker. Commands arrive as (command, env_ids or seeds) on the connection, results are written
+    into the shared arrays at the global env id. Only infos which are not empty, the records of finished games if
+    forward_results is set, and exceptions go back over the connection.
+    """
+    arrays, memories = _attach_arrays(array_specs, memory_names)
+    envs = {env_id: env_fn() for env_id, env_fn in env_fns.items()}
+    results_sink = _CollectingResultsSink()
+    if forward_results:
+        for env in envs.values():
+            env.unwrapped.results_sink = results_sink
+    try:
+        while True:
+            command, data = connection.recv()
+            try:
+                if command == "step":
+                    infos = {}
+                    for env_id in data:
+                        env = envs[env_id]
+                        observation, rewards, done, info = env.step(int(arrays["actions"][env_id]))
+                        _write_observation(arrays, env_id, env, observation)
+                        arrays["rewards"][env_id] = rewards
+                        arrays["dones"][env_id] = done
+                        if info:
+                            infos[env_id] = info
+                    connection.send((infos, results_sink.pop_records()))
+                elif command == "reset":
+                    for env_id in data:
+                        _write_observation(arrays, env_id, envs[env_id], envs[env_id].reset())
+                        arrays["rewards"][env_id] = 0
+                        arrays["dones"][env_id] = False
+                    connection.send(None)
+                elif command == "seed":
+                    connection.send({env_id: envs[env_id].seed(seed) for env_id, seed in data.items()})
+                elif command == "close":
+                    for env in envs.values():
+                        env.close()
+                    connection.send(None)
+                    return
+                else:
+                    raise Exception("Unknown command", command)
+            except Exception as exception:
+                connection.send(exception)
+    finally:
+        del arrays
+        for memory in memories:
+            memory.close()
+        connection.close()
+
+
+class SharedMemoryVectorEnv:
+    """
+    Steps TianshouQwoxEnvs in worker processes, which write observations, masks, rewards and dones straight into
+    shared memory arrays.
+
+    Every worker hosts a contiguous slice of the envs. A step writes the actions into a shared array and sends each
+    involved worker only the ids of its envs to step, so neither actions nor observation dicts are pickled. Like
+    VectorQwoxEnv, the interface follows the tianshou vector envs: observations are dicts with "agent_id", "obs" and
+    "mask" batches and rewards have the shape (num_envs, players). Finished games are reset by the Collector via
+    reset(env_ids).
+
+    Use num_workers around the number of cores; more envs than workers only adds envs per worker. With the "spawn"
+    start method, the default on macOS, or with "forkserver" the env_fns have to be picklable, e.g. module level
+    functions like headless_quox_env and no lambdas.
+
+    With a results_sink, the game results of the envs are sent to the main process and written there, so sinks like
+    WandbResultsSink only run in the process which owns the wandb run.
+    """
+
+    def __init__(self, env_fns: list[Callable[[], TianshouQwoxEnv]], num_workers: Optional[int] = None,
+                 context: Optional[str] = None, results_sink: Optional[ResultsSink] = None):
+        """
+        :param env_fns: one function per env which creates it, e.g. headless_quox_env
+        :param num_workers: processes to step the envs in, defaults to the number of cores but at most one per env
+        :param context: multiprocessing start method, the platform default if None
+        :param results_sink: receives the game results of all envs in this process. If None, every env writes them to
+            its own sink in its worker.
+        """
+        self.env_num = len(env_fns)
+        self.num_workers = min(num_workers or multiprocessing.cpu_count(), self.env_num)
+        self.is_async = False
+        self.is_closed = False
+        self.results_sink = results_sink
+
+        env = env_fns[0]()
+        self.agents = env.agents
+        self.agent_idx = env.agent_idx
+        self.observation_space = env.observation_space
+        self.action_space = [env.action_space for _ in range(self.env_num)]
+        observation_shape = env.observation_space["observation"].shape
+        action_count = env.action_space.n
+        env.close()
+        self._agent_names = np.array(self.agents, dtype=object)
+
+        array_specs = _get_array_specs(self.env_num, len(self.agents), observation_shape, action_count)
+        self._memories = [SharedMemory(create=True, size=max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize))
+                          for shape, dtype in array_specs.values()]
+        self._arrays = {key: np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+                        for (key, (shape, dtype)), memory in zip(array_specs.items(), self._memories)}
+        memory_names = {key: memory.name for key, memory in zip(array_specs, self._memories)}
+
+        self._worker_of_env = np.zeros(self.env_num, dtype=np.intp)
+        mp_context = multiprocessing.get_context(context)
+        self._connections: list[Connection] = []
+        self._processes = []
+        for worker_index, env_ids in enumerate(np.array_split(np.arange(self.env_num), self.num_workers)):
+            self._worker_of_env[env_ids] = worker_index
+            parent_connection, child_connection = mp_context.Pipe()
+            process = mp_context.Process(target=_run_worker, daemon=True,
+                                         args=(child_connection,
+                                               {int(env_id): env_fns[env_id] for env_id in env_ids},
+                                               array_specs, memory_names, results_sink is not None))
+            process.start()
+            child_connection.close()
+            self._connections.append(parent_connection)
+            self._processes.append(process)
+
+    def __len__(self) -> int:
+        return self.env_num
+
+    def _get_env_ids(self, env_ids) -> np.ndarray:
+        if env_ids is None:
+            return np.arange(self.env_num)
+        return np.atleast_1d(np.asarray(env_ids, dtype=np.intp))
+
+    def _send_to_workers(self, command: str, env_ids: np.ndarray) -> list:
+        """
+        Sends the command with their env ids to all workers which host one of the envs and waits until every one
+        answered, so the workers run the command in parallel.
+
+        :return: the answers of the workers
+        """
+        if self.is_closed:
+            raise Exception("SharedMemoryVectorEnv is already closed")
+        workers = self._worker_of_env[env_ids]
+        involved_workers = np.unique(workers)
+        for worker_index in involved_workers:
+            self._connections[worker_index].send((command, env_ids[workers == worker_index].tolist()))
+        answers = [self._connections[worker_index].recv() for worker_index in involved_workers]
+        for answer in answers:
+            if isinstance(answer, Exception):
+                raise answer
+        return answers
+
+    def _get_observations(self, env_ids: np.ndarray) -> dict:
+        return {"agent_id": self._agent_names[self._arrays["agent_index"][env_ids]],
+                "obs": self._arrays["obs"][env_ids],
+                "mask": self._arrays["mask"][env_ids]}
+
+    def reset(self, env_ids: Optional[Union[int, list[int], np.ndarray]] = None) -> dict:
+        env_ids = self._get_env_ids(env_ids)
+        self._send_to_workers("reset", env_ids)
+        return self._get_observations(env_ids)
+
+    def step(self, actions, env_ids: Optional[Union[int, list[int], np.ndarray]] = None):
+        """
+        Does one action in every selected env.
+
+        :return: observations, rewards (len(env_ids), players), dones (len(env_ids),) and infos
+        """
+        env_ids = self._get_env_ids(env_ids)
+        self._arrays["actions"][env_ids] = np.asarray(actions, dtype=np.int64).reshape(len(env_ids))
+        infos_per_env = {}
+        for worker_infos, records in self._send_to_workers("step", env_ids):
+            infos_per_env.update(worker_infos)
+            if records:
+                self.results_sink.write_batch(records)
+
+        infos = np.array([infos_per_env.get(env_id, {}) for env_id in env_ids.tolist()], dtype=object)
+        return (self._get_observations(env_ids), self._arrays["rewards"][env_ids], self._arrays["dones"][env_ids],
+                infos)
+
+    def seed(self, seed: Optional[Union[int, list[Optional[int]]]] = None) -> list[Any]:
+        """
+        :param seed: one seed per env, or a single seed from which env i gets seed + i
+        """
+        if seed is None or np.isscalar(seed):
+            seed = [None if seed is None else seed + env_id for env_id in range(self.env_num)]
+        if self.is_closed:
+            raise Exception("SharedMemoryVectorEnv is already closed")
+        for worker_index, connection in enumerate(self._connections):
+            connection.send(("seed", {env_id: seed[env_id] for env_id in np.flatnonzero(
+                self._worker_of_env == worker_index).tolist()}))
+        seeds = {}
+        for connection in self._connections:
+            answer = connection.recv()
+            if isinstance(answer, Exception):
+                raise answer
+            seeds.update(answer)
+        return [seeds[env_id] for env_id in range(self.env_num)]
+
+    def close(self):
+        if self.is_closed:
+            return
+        self.is_closed = True
+        for connection in self._connections:
+            try:
+                connection.send(("close", None))
+                connection.recv()
+            except (BrokenPipeError, EOFError):
+                pass
+        for process in self._processes:
+            process.join()
+        for connection in self._connections:
+            connection.close()
+        self._arrays = {}
+        for memory in self._memories:
+            memory.close()
+            memory.unlink()
+
+    def __del__(self):
+        if hasattr(self, "_memories"):
+            self.close()
@@ -0,0 +1,46 @@
+from time import perf_counter
+
+
+class StepProfiler:
+    """
+    Cumulative time and call count per phase of QwoxEnv.step and QwoxEnv.observe. "step" is the whole QwoxEnv.step,
+    so comparing it with the time spent outside of the env shows whether the env, the wrappers or the policy is slow.
+    """
+
+    PHASES = ("step", "action_validation", "cross_value", "reward", "finish_check", "dice_roll", "observe",
+              "action_mask", "logging")
+
+    def __init__(self):
+        self.seconds: dict[str, float] = {}
+        self.calls: dict[str, int] = {}
+        self.reset()
+
+    def reset(self):
+        self.seconds = dict.fromkeys(self.PHASES, 0.0)
+        self.calls = dict.fromkeys(self.PHASES, 0)
+
+    @staticmethod
+    def now() -> float:
+        return perf_counter()
+
+    def add(self, phase: str, seconds: float):
+        self.seconds[phase] += seconds
+        self.calls[phase] += 1
+
+    def add_since(self, phase: str, start: float) -> float:
+        """
+        :return: the current time, which is the start of the next phase
+        """
+        now = perf_counter()
+        self.seconds[phase] += now - start
+        self.calls[phase] += 1
+        return now
+
+    def get_stats(self) -> dict[str, dict]:
+        """
+        :return: per phase the calls, the total seconds and the mean microseconds per call
+        """
+        return {phase: {"calls": self.calls[phase],
+                        "seconds": self.seconds[phase],
+                        "mean_us": self.seconds[phase] / self.calls[phase] * 1e6 if self.calls[phase] else 0.0}
+                for phase in self.PHASES}
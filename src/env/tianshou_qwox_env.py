@@ -0,0 +1,83 @@
+from typing import Optional
+
+import numpy as np
+from pettingzoo.utils.env import AgentID
+
+from env.qwox_env import QwoxEnv
+
+
+class TianshouQwoxEnv:
+    """
+    Single wrapper around QwoxEnv for tianshou, which replaces the chain of CaptureStdoutWrapper,
+    TerminateIllegalWrapper, OrderEnforcingWrapper and tianshou's PettingZooEnv.
+
+    It has the same interface as PettingZooEnv: reset() and step() return observations as dict with "agent_id",
+    "obs" and "mask". An illegal action ends the game with illegal_reward for the acting agent, like the
+    TerminateIllegalWrapper does, but the check is a single lookup in the cached action mask of QwoxEnv.
+    """
+
+    def __init__(self, env: QwoxEnv, illegal_reward: int = -1):
+        self.env = env
+        self.illegal_reward = illegal_reward
+        self.agents: list[AgentID] = self.env.possible_agents
+        self.agent_idx = {agent_id: i for i, agent_id in enumerate(self.agents)}
+        self.observation_space = self.env.observation_space(self.agents[0])
+        self.action_space = self.env.action_space(self.agents[0])
+        self._has_reset = False
+        self._is_terminated = False
+
+    @property
+    def unwrapped(self) -> QwoxEnv:
+        return self.env
+
+    def reset(self, seed: Optional[int] = None, return_info=False, options=None):
+        self.env.reset(seed=seed, options=options)
+        self._has_reset = True
+        self._is_terminated = False
+        agent = self.env.agent_selection
+        observation = self._to_tianshou_observation(agent, self.env.observe(agent))
+        if return_info:
+            return observation, self.env.infos[agent]
+        return observation
+
+    def step(self, action):
+        """
+        :return: observation of the next agent, rewards of all agents in the order of agents, done and info
+        """
+        if not self._has_reset:
+            raise Exception("reset() has to be called before step()")
+        if self._is_terminated:
+            raise Exception("step() called after the game was terminated, call reset() first")
+
+        env = self.env
+        agent = env.agent_selection
+        action_mask = env.observe(agent)["action_mask"]
+        if action is None or not 0 <= action < len(action_mask) or not action_mask[action]:
+            return self._terminate_illegal(agent, action_mask)
+
+        env.step(action)
+        agent = env.agent_selection
+        rewards = [env.rewards[agent_id] for agent_id in self.agents]
+        return self._to_tianshou_observation(agent, env.observe(agent)), rewards, env.dones[agent], env.infos[agent]
+
+    def _terminate_illegal(self, agent: AgentID, action_mask: np.ndarray):
+        env = self.env
+        self._is_terminated = True
+        env.dones = {agent_id: True for agent_id in env.agents}
+        env.rewards = {agent_id: self.illegal_reward if agent_id == agent else 0 for agent_id in env.agents}
+        env.infos[agent]["legal_moves"] = np.flatnonzero(action_mask)
+        rewards = [env.rewards[agent_id] for agent_id in self.agents]
+        return self._to_tianshou_observation(agent, env.observe(agent)), rewards, True, env.infos[agent]
+
+    @staticmethod
+    def _to_tianshou_observation(agent: AgentID, observation: dict) -> dict:
+        return {"agent_id": agent, "obs": observation["observation"], "mask": observation["action_mask"] == 1}
+
+    def seed(self, seed: Optional[int] = None) -> Optional[int]:
+        return self.env.seed(seed)
+
+    def render(self, mode: str = "human"):
+        return self.env.render(mode)
+
+    def close(self):
+        self.env.close()
@@ -0,0 +1,214 @@
+from typing import Optional, Union
+
+import numpy as np
+from gym.spaces import Discrete
+from numpy import int8
+
+from game_models import action_mask_tables
+from game_models.board import Board
+from game_models.game_card import GameCard
+
+DICE_COUNT = 6
+WHITE_DICE_INDEXES = [4, 5]
+COLORED_DICE_INDEXES = [0, 1, 2, 3]
+PASS_ROW_INDEX = 4
+CLOSED_ROW_COLUMN = 11
+LAST_CROSSABLE_COLUMN = 10
+MIN_CROSSED_FOR_CLOSING = 5
+POINTS_FOR_COUNT = np.array([sum(range(1, count + 1)) for count in range(GameCard.OBSERVATION_SHAPE_COLUMNS + 1)])
+
+
+class VectorQwoxEnv:
+    """
+    Simulates many Qwox games at once with the same rules as QwoxEnv, but without Board, GameCard or Dice objects.
+
+    All games are stored in struct-of-arrays form: the cards of every game in one (num_envs, players, 5, 12) array,
+    the dices in one (num_envs, 6) array and the step counters in one (num_envs,) array. Every call to step() advances
+    each selected game by one agent action (like one QwoxEnv.step) and computes masks, rewards and finished games for
+    all of them with array operations. Finished games are reset automatically.
+
+    The interface follows the tianshou vector envs, so a tianshou Collector can use it directly:
+    observations are dicts with "agent_id", "obs" and "mask" batches, rewards have the shape (num_envs, players).
+    """
+
+    ACTION_SPACE_SIZE = 55
+
+    def __init__(self, num_envs: int, num_players: int = 2, seed: Optional[int] = None, auto_reset: bool = True):
+        self.num_envs = num_envs
+        self.num_players = num_players
+        self.auto_reset = auto_reset
+        self.is_async = False
+        self.possible_agents = [f"player_{index + 1}" for index in range(num_players)]
+        self.agents = self.possible_agents[:]
+        self.agent_idx = {agent: index for index, agent in enumerate(self.agents)}
+        self._agent_names = np.array(self.agents, dtype=object)
+        self.action_space = [Discrete(self.ACTION_SPACE_SIZE) for _ in range(num_envs)]
+
+        self.cards = np.zeros(shape=(num_envs, num_players) + GameCard.OBSERVATION_SHAPE, dtype=int8)
+        self.crossed_something_in_current_round = np.zeros(shape=(num_envs, num_players), dtype=bool)
+        self.dices = np.zeros(shape=(num_envs, DICE_COUNT), dtype=int8)
+        self.total_started_step_count = np.ones(shape=num_envs, dtype=np.int64)
+        self._seat_offsets = np.arange(num_players)
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self) -> int:
+        return self.num_envs
+
+    def seed(self, seed: Optional[int] = None) -> list[Optional[int]]:
+        self._rng = np.random.default_rng(seed)
+        return [seed] * self.num_envs
+
+    def _get_env_ids(self, env_ids) -> np.ndarray:
+        if env_ids is None:
+            return np.arange(self.num_envs)
+        return np.atleast_1d(np.asarray(env_ids, dtype=np.intp))
+
+    def reset(self, env_ids: Optional[Union[int, list[int], np.ndarray]] = None) -> dict:
+        env_ids = self._get_env_ids(env_ids)
+        self._reset_games(env_ids)
+        return self.observe(env_ids)
+
+    def _reset_games(self, env_ids: np.ndarray):
+        self.cards[env_ids] = 0
+        self.crossed_something_in_current_round[env_ids] = False
+        self.total_started_step_count[env_ids] = 1
+        self._roll_dices(env_ids)
+
+    def _roll_dices(self, env_ids: np.ndarray):
+        if len(env_ids):
+            self.dices[env_ids] = self._rng.integers(1, 7, size=(len(env_ids), DICE_COUNT), dtype=int8)
+
+    def get_current_agent_index(self, env_ids: np.ndarray) -> np.ndarray:
+        return (self.total_started_step_count[env_ids] - 1) % self.num_players
+
+    def get_tossing_agent_index(self, env_ids: np.ndarray) -> np.ndarray:
+        steps_in_one_round = self.num_players * 2
+        current_round = (self.total_started_step_count[env_ids] - 1) // steps_in_one_round + 1
+        return (current_round - 1) % self.num_players
+
+    def is_second_part_of_round(self, env_ids: np.ndarray) -> np.ndarray:
+        steps_in_one_round = self.num_players * 2
+        steps_in_this_round = self.total_started_step_count[env_ids] % steps_in_one_round
+        return (steps_in_this_round > self.num_players) | (steps_in_this_round == 0)
+
+    def observe(self, env_ids: Optional[Union[int, list[int], np.ndarray]] = None) -> dict:
+        """
+        :return: observation batch for the current agent of every game, with the same layout as QwoxEnv.observe
+        """
+        env_ids = self._get_env_ids(env_ids)
+        current_agents = self.get_current_agent_index(env_ids)
+        is_tossing_agent = self.get_tossing_agent_index(env_ids) == current_agents
+        is_second_part_of_round = self.is_second_part_of_round(env_ids)
+
+        observation = np.zeros(shape=(len(env_ids), self.num_players + 1) + GameCard.OBSERVATION_SHAPE, dtype=int8)
+        seats = (current_agents[:, None] + self._seat_offsets) % self.num_players
+        observation[:, :self.num_players] = self.cards[env_ids[:, None], seats]
+        observation[:, -1, 0, :DICE_COUNT] = self.dices[env_ids]
+        observation[:, -1, 0, Board.TOSSING_PLAYER_OBS_INDEX] = is_tossing_agent
+        observation[:, -1, 0, Board.PART_OF_ROUND_OBS_INDEX] = np.where(is_second_part_of_round, 2, 1)
+
+        return {"agent_id": self._agent_names[current_agents],
+                "obs": observation,
+                "mask": self.get_action_masks(env_ids, current_agents, is_tossing_agent,
+                                              is_second_part_of_round).astype(bool)}
+
+    def get_action_masks(self, env_ids, current_agents, is_tossing_agent, is_second_part_of_round) -> np.ndarray:
+        cards = self.cards[env_ids, current_agents]
+        progress = action_mask_tables.get_row_progress(cards[:, :4])
+        dices = self.dices[env_ids].astype(np.intp)
+        white_sum = dices[:, WHITE_DICE_INDEXES].sum(axis=1)
+        colored = dices[:, COLORED_DICE_INDEXES]
+
+        row_keys = np.where(is_second_part_of_round[:, None],
+                            action_mask_tables.get_color_dice_row_keys(progress,
+                                                                       colored + dices[:, [WHITE_DICE_INDEXES[0]]],
+                                                                       colored + dices[:, [WHITE_DICE_INDEXES[1]]]),
+                            action_mask_tables.get_white_dice_row_keys(progress, white_sum))
+        row_keys[is_second_part_of_round & ~is_tossing_agent] = action_mask_tables.EMPTY_ROW_KEY
+        row_keys[self._get_closed_rows(env_ids)] = action_mask_tables.EMPTY_ROW_KEY
+
+        allowed_to_skip_without_passing = (~is_tossing_agent | ~is_second_part_of_round
+                                           | self.crossed_something_in_current_round[env_ids, current_agents])
+        pass_row_keys = action_mask_tables.get_pass_row_key(action_mask_tables.get_pass_bits(cards[:, PASS_ROW_INDEX]),
+                                                            allowed_to_skip_without_passing.astype(np.intp))
+
+        masks = action_mask_tables.ROW_MASKS[np.concatenate([row_keys, pass_row_keys[:, None]], axis=1)]
+        return masks.reshape(len(env_ids), self.ACTION_SPACE_SIZE)
+
+    def _get_closed_rows(self, env_ids: np.ndarray) -> np.ndarray:
+        return self.cards[env_ids, :, :4, CLOSED_ROW_COLUMN].any(axis=1)
+
+    def get_points(self, env_ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        :return: points of every player with shape (len(env_ids), players)
+        """
+        cards = self.cards[self._get_env_ids(env_ids)]
+        crossed_counts = np.count_nonzero(cards[:, :, :4], axis=-1)
+        pass_counts = np.count_nonzero(cards[:, :, PASS_ROW_INDEX, :4], axis=-1)
+        return POINTS_FOR_COUNT[crossed_counts].sum(axis=-1) - 5 * pass_counts
+
+    def is_game_finished(self, env_ids: Optional[np.ndarray] = None) -> np.ndarray:
+        env_ids = self._get_env_ids(env_ids)
+        pass_counts = np.count_nonzero(self.cards[env_ids, :, PASS_ROW_INDEX, :4], axis=-1)
+        closed_row_counts = np.count_nonzero(self._get_closed_rows(env_ids), axis=-1)
+        return (pass_counts == 4).any(axis=-1) | (closed_row_counts >= 2)
+
+    def step(self, actions, env_ids: Optional[Union[int, list[int], np.ndarray]] = None):
+        """
+        Does one action for the current agent of every selected game.
+
+        :param actions: one action per selected game, same action space as QwoxEnv
+        :param env_ids: games to step, all games if None
+        :return: observations, rewards (len(env_ids), players), dones (len(env_ids),) and infos. The infos hold the
+            points of all players at the end of the step, which are the final points for finished games.
+        """
+        env_ids = self._get_env_ids(env_ids)
+        actions = np.asarray(actions, dtype=np.intp).reshape(len(env_ids))
+        current_agents = self.get_current_agent_index(env_ids)
+        is_tossing_agent = self.get_tossing_agent_index(env_ids) == current_agents
+        is_second_part_of_round = self.is_second_part_of_round(env_ids)
+
+        is_acting = ~is_second_part_of_round | is_tossing_agent
+        masks = self.get_action_masks(env_ids, current_agents, is_tossing_agent, is_second_part_of_round)
+        is_illegal = is_acting & (masks[np.arange(len(env_ids)), actions] == 0)
+        if is_illegal.any():
+            raise Exception("Wrong action", actions[is_illegal], env_ids[is_illegal])
+
+        starting_points = self.get_points(env_ids)
+        self._cross_values(env_ids[is_acting], current_agents[is_acting], actions[is_acting])
+        points = self.get_points(env_ids)
+
+        rewards = np.zeros(shape=(len(env_ids), self.num_players), dtype=np.int64)
+        rows = np.arange(len(env_ids))[is_acting]
+        rewards[rows, current_agents[is_acting]] = (points - starting_points)[rows, current_agents[is_acting]]
+        dones = is_acting & self.is_game_finished(env_ids)
+
+        self._set_state_for_next_step(env_ids, current_agents, is_second_part_of_round)
+
+        infos = np.array([{"points": game_points} for game_points in points], dtype=object)
+        if self.auto_reset and dones.any():
+            self._reset_games(env_ids[dones])
+
+        return self.observe(env_ids), rewards, dones, infos
+
+    def _cross_values(self, env_ids: np.ndarray, agents: np.ndarray, actions: np.ndarray):
+        self.crossed_something_in_current_round[env_ids[actions <= 43], agents[actions <= 43]] = True
+
+        is_crossing = actions <= 47
+        env_ids, agents, actions = env_ids[is_crossing], agents[is_crossing], actions[is_crossing]
+        row_indexes, column_indexes = np.divmod(actions, GameCard.ACTION_MASK_SHAPE[1])
+        self.cards[env_ids, agents, row_indexes, column_indexes] = 1
+
+        is_closing = ((column_indexes == LAST_CROSSABLE_COLUMN)
+                      & (np.count_nonzero(self.cards[env_ids, agents, row_indexes], axis=-1) >= MIN_CROSSED_FOR_CLOSING))
+        self.cards[env_ids[is_closing], agents[is_closing], row_indexes[is_closing], CLOSED_ROW_COLUMN] = 1
+
+    def _set_state_for_next_step(self, env_ids, current_agents, is_second_part_of_round):
+        self.crossed_something_in_current_round[env_ids[is_second_part_of_round],
+                                                current_agents[is_second_part_of_round]] = False
+        is_end_of_round = self.total_started_step_count[env_ids] % (self.num_players * 2) == 0
+        self._roll_dices(env_ids[is_end_of_round])
+        self.total_started_step_count[env_ids] += 1
+
+    def close(self):
+        pass
@@ -1,17 +1,29 @@
+from typing import Optional
+
 from pettingzoo.utils.conversions import turn_based_aec_to_parallel_wrapper
 
 from env.qwox_env import QwoxEnv
+from env.tianshou_qwox_env import TianshouQwoxEnv
 from pettingzoo.utils import wrappers
-from env.qwox_env import QwoxEnv
 
 
-def wrapped_quox_env():
-    env = QwoxEnv()
-    env = wrappers.CaptureStdoutWrapper(env)
+def wrapped_quox_env(render_mode: Optional[str] = "human"):
+    env = QwoxEnv(render_mode=render_mode)
+    if render_mode == "human":
+        env = wrappers.CaptureStdoutWrapper(env)
     env = wrappers.TerminateIllegalWrapper(env, illegal_reward=-1)
     env = wrappers.OrderEnforcingWrapper(env)
     return env
 
+
+def headless_quox_env(illegal_reward: int = -1) -> TianshouQwoxEnv:
+    """
+    Env for training with tianshou. Instead of the wrapper chain above plus tianshou's PettingZooEnv, a single wrapper
+    enforces the order, terminates on illegal actions and returns tianshou observations. The env never prints.
+    Observations are read-only views instead of copies, as the vector envs and replay buffers copy them anyway.
+    """
+    return TianshouQwoxEnv(QwoxEnv(render_mode=None, copy_observations=False), illegal_reward=illegal_reward)
+
 # def ss_wrapped_quox_env():
 #     env_ = QwoxEnv()
 #     #env_ = wrappers.CaptureStdoutWrapper(env_)
@@ -0,0 +1,83 @@
+"""
+Evaluation of agents on many games at once.
+
+All games run in one VectorQwoxEnv and advance in lock-step: in every step, the pending decisions of all games which
+belong to the same policy are gathered into one batch, so every policy runs one forward pass per step instead of one
+per decision. Agents which only wait for the tossing agent's coloured dice action don't need to decide; they do
+nothing without asking their policy.
+"""
+from typing import Optional
+
+import numpy as np
+import torch
+from tianshou.data import Batch
+from tianshou.policy import BasePolicy
+
+from env.vector_qwox_env import VectorQwoxEnv
+from game_models.board import Board
+
+DO_NOTHING_ACTION = 48
+
+
+def get_seat_policies(num_envs: int, num_players: int) -> np.ndarray:
+    """
+    :return: (num_envs, num_players) index of the policy on every seat. The seatings rotate over the envs, so with a
+        multiple of num_players envs every policy plays every seat equally often.
+    """
+    return (np.arange(num_players)[None, :] + np.arange(num_envs)[:, None]) % num_players
+
+
+def get_deciding_rows(observations: np.ndarray) -> np.ndarray:
+    """
+    :param observations: (B, players + 1, 5, 12) observations
+    :return: (B,) True where the agent has to decide, False where it only waits for the tossing agent's coloured dice
+        action
+    """
+    additional_information = observations[:, -1, 0]
+    return ((additional_information[:, Board.PART_OF_ROUND_OBS_INDEX] == 1)
+            | (additional_information[:, Board.TOSSING_PLAYER_OBS_INDEX] == 1))
+
+
+def play_lock_step(policies: list[BasePolicy], num_games: int, num_envs: int = 256,
+                   seed: Optional[int] = None) -> list[dict]:
+    """
+    :param policies: one policy per player
+    :param num_games: games to play in total, spread evenly over the envs so that short games aren't favoured
+    :return: one record per finished game with the policy indexes and the final points, both in the order of the seats
+    """
+    num_players = len(policies)
+    num_envs = min(num_envs, num_games)
+    env = VectorQwoxEnv(num_envs=num_envs, num_players=num_players, seed=seed)
+    seat_policies = get_seat_policies(num_envs, num_players)
+    remaining_games = np.full(num_envs, num_games // num_envs)
+    remaining_games[:num_games % num_envs] += 1
+
+    active_env_ids = np.arange(num_envs)
+    observation = env.reset()
+    results = []
+    with torch.no_grad():
+        while len(active_env_ids):
+            deciding_policies = np.where(get_deciding_rows(observation["obs"]),
+                                         seat_policies[active_env_ids, env.get_current_agent_index(active_env_ids)],
+                                         -1)
+
+            actions = np.full(len(active_env_ids), DO_NOTHING_ACTION)
+            for policy_index, policy in enumerate(policies):
+                rows = np.flatnonzero(deciding_policies == policy_index)
+                if len(rows):
+                    batch = Batch(obs=Batch(agent_id=observation["agent_id"][rows], obs=observation["obs"][rows],
+                                            mask=observation["mask"][rows]), info={})
+                    actions[rows] = policy(batch).act
+
+            observation, _, dones, infos = env.step(actions, active_env_ids)
+
+            for row in np.flatnonzero(dones):
+                env_id = active_env_ids[row]
+                results.append({"seats": seat_policies[env_id].tolist(), "points": infos[row]["points"].tolist()})
+                remaining_games[env_id] -= 1
+
+            is_still_active = remaining_games[active_env_ids] > 0
+            if not is_still_active.all():
+                active_env_ids = active_env_ids[is_still_active]
+                observation = {key: value[is_still_active] for key, value in observation.items()}
+    return results
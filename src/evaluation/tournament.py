@@ -0,0 +1,251 @@
+"""
+Tournaments between trained and algorithmic agents.
+
+`export PYTHONPATH="${PYTHONPATH}:$(pwd)/src" && python3 src/evaluation/tournament.py 103 106 107 random long_playing`
+
+Agents are named by their checkpoint number in manual_testing/trained_agents, by the path of a model exported with
+agents/export_dqn.py or by one of ALGORITHMIC_AGENTS. Every match plays pairs of games with the same seed, one game per
+seating, so neither agent profits from the dices or from being the first to toss. Matches are split into jobs which run
+on a process pool. With --lock-step every match is played at once with batched decisions instead. The results are
+turned into Elo ratings with a Bradley-Terry fit and bootstrapped confidence intervals.
+"""
+import argparse
+import functools
+import itertools
+import json
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+import torch
+from tianshou.data import Batch
+from tianshou.policy import BasePolicy, RandomPolicy
+
+from agents.exported_dqn_agent import ExportedDQNAgent
+from agents.tianshou.expectimax_policy import ExpectimaxPolicy
+from agents.tianshou.long_playing_policy import LongPlayingPolicy
+from agents.tianshou.lowest_value_taker_policy import LowestValueTakerPolicy
+from env.qwox_env import QwoxEnv
+from env.results_sink import NullResultsSink
+from env.tianshou_qwox_env import TianshouQwoxEnv
+from evaluation.lock_step_evaluation import play_lock_step
+from manual_testing.utils import trained_agents
+
+ALGORITHMIC_AGENTS = {
+    "random": RandomPolicy,
+    "lowest_value_taker": LowestValueTakerPolicy,
+    "long_playing": LongPlayingPolicy,
+    "expectimax": ExpectimaxPolicy,
+}
+EXPORTED_AGENT_EXTENSIONS = (".pt", ".onnx")
+INITIAL_RATING = 1500.0
+ELO_SCALE = 400.0
+
+
+def create_agent(name: str) -> BasePolicy:
+    if name.isdigit():
+        return trained_agents.get(int(name))
+    if name.endswith(EXPORTED_AGENT_EXTENSIONS):
+        return ExportedDQNAgent(name)
+    if name not in ALGORITHMIC_AGENTS:
+        raise Exception("Unknown agent, use a checkpoint number, an exported model or one of", name,
+                        list(ALGORITHMIC_AGENTS))
+    return ALGORITHMIC_AGENTS[name]()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_agent(name: str) -> BasePolicy:
+    """Every process loads each agent only once"""
+    return create_agent(name)
+
+
+def _init_worker():
+    # the workers already run in parallel, more threads per network only compete for the same cores
+    torch.set_num_threads(1)
+
+
+def play_game(env: TianshouQwoxEnv, agents: list[BasePolicy], seed: int) -> list[int]:
+    """
+    :param agents: agent per seat in the order of env.agents
+    :return: final points per seat
+    """
+    np.random.seed(seed)
+    observation = env.reset(seed=seed)
+    done = False
+    with torch.no_grad():
+        while not done:
+            agent = agents[env.agent_idx[observation["agent_id"]]]
+            batch = Batch(obs=Batch(agent_id=np.array([observation["agent_id"]]), obs=observation["obs"][None],
+                                    mask=observation["mask"][None]), info={})
+            observation, _, done, _ = env.step(agent(batch).act[0])
+    return [env.unwrapped.board.game_cards[agent_id].get_points() for agent_id in env.agents]
+
+
+def play_match_games(first_agent: str, second_agent: str, seeds: list[int]) -> list[dict]:
+    """
+    Plays two games per seed, one with each seating.
+
+    :return: one record per game with the agents and their points in the order of the seats
+    """
+    env = TianshouQwoxEnv(QwoxEnv(results_sink=NullResultsSink(), render_mode=None))
+    results = []
+    for seed in seeds:
+        for seating in [(first_agent, second_agent), (second_agent, first_agent)]:
+            points = play_game(env, [_get_agent(name) for name in seating], seed)
+            results.append({"agents": list(seating), "seed": seed, "points": points})
+    env.close()
+    return results
+
+
+def play_match_lock_step(first_agent: str, second_agent: str, num_games: int, seed: int) -> list[dict]:
+    """
+    Plays all games of a match at once with batched decisions, see play_lock_step(). Half of the games are played
+    with each seating.
+
+    :return: one record per game like play_match_games(), but without seed
+    """
+    names = [first_agent, second_agent]
+    results = play_lock_step([_get_agent(name) for name in names], num_games, seed=seed)
+    return [{"agents": [names[index] for index in result["seats"]], "points": result["points"]} for result in results]
+
+
+def get_round_robin_pairings(roster: list[str]) -> list[tuple[str, str]]:
+    return list(itertools.combinations(roster, 2))
+
+
+def get_gauntlet_pairings(challenger: str, roster: list[str]) -> list[tuple[str, str]]:
+    return [(challenger, opponent) for opponent in roster if opponent != challenger]
+
+
+def run_tournament(pairings: list[tuple[str, str]], seed_pairs_per_match: int = 50, num_workers: int = 0,
+                   seeds_per_job: int = 10, seed: int = 0, lock_step: bool = False) -> list[dict]:
+    """
+    :param seed_pairs_per_match: every match has twice as many games, as each seed is played with both seatings
+    :param num_workers: processes to play the jobs in, 0 plays them in this process
+    :param seeds_per_job: how many seeds one job of a match plays, smaller jobs spread better over the workers
+    :param lock_step: play every match as one job with batched decisions, which is much faster for trained agents.
+        The games don't have their own seeds then, so the seatings aren't paired by dices.
+    :return: the records of all games, see play_match_games()
+    """
+    if lock_step:
+        play_job = play_match_lock_step
+        jobs = [(first_agent, second_agent, 2 * seed_pairs_per_match, seed + index)
+                for index, (first_agent, second_agent) in enumerate(pairings)]
+    else:
+        play_job = play_match_games
+        seeds = list(range(seed, seed + seed_pairs_per_match))
+        jobs = [(first_agent, second_agent, seeds[start:start + seeds_per_job])
+                for first_agent, second_agent in pairings
+                for start in range(0, len(seeds), seeds_per_job)]
+    if num_workers == 0:
+        job_results = [play_job(*job) for job in jobs]
+    else:
+        # forked workers use these weights instead of loading every checkpoint themselves
+        trained_agents.share_memory({int(name) for pairing in pairings for name in pairing if name.isdigit()})
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker) as executor:
+            job_results = list(executor.map(play_job, *zip(*jobs)))
+    return [result for results in job_results for result in results]
+
+
+def get_score_matrix(results: list[dict], names: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    :return: scores[i, j] of agent i against agent j with 1 per win and 0.5 per draw, and games[i, j] between them
+    """
+    index = {name: position for position, name in enumerate(names)}
+    scores = np.zeros((len(names), len(names)))
+    games = np.zeros((len(names), len(names)))
+    for result in results:
+        first, second = (index[name] for name in result["agents"])
+        first_points, second_points = result["points"]
+        first_score = 1.0 if first_points > second_points else 0.5 if first_points == second_points else 0.0
+        scores[first, second] += first_score
+        scores[second, first] += 1 - first_score
+        games[first, second] += 1
+        games[second, first] += 1
+    return scores, games
+
+
+def fit_elo_ratings(scores: np.ndarray, games: np.ndarray, iterations: int = 1000) -> np.ndarray:
+    """
+    Fits Bradley-Terry strengths with the minorization-maximization algorithm and converts them to the Elo scale with
+    a mean of INITIAL_RATING. A virtual draw is added to every pairing, so agents which won or lost every game get a
+    finite rating.
+    """
+    played = games > 0
+    scores = scores + 0.5 * played
+    games = games + played
+    wins = scores.sum(axis=1)
+    strengths = np.ones(len(scores))
+    for _ in range(iterations):
+        new_strengths = wins / (games / (strengths[:, None] + strengths[None, :])).sum(axis=1)
+        new_strengths /= np.exp(np.log(new_strengths).mean())
+        if np.allclose(new_strengths, strengths, rtol=1e-9, atol=0):
+            strengths = new_strengths
+            break
+        strengths = new_strengths
+    return INITIAL_RATING + ELO_SCALE * np.log10(strengths)
+
+
+def compute_ratings(results: list[dict], bootstrap_samples: int = 200, confidence: float = 0.95,
+                    seed: int = 0) -> dict[str, dict]:
+    """
+    :return: per agent its Elo rating, the confidence interval from resampling the games of every match, its games
+        and its score (share of won games with draws counting half), sorted from the best to the worst rating
+    """
+    names = sorted({name for result in results for name in result["agents"]})
+    scores, games = get_score_matrix(results, names)
+    ratings = fit_elo_ratings(scores, games)
+
+    matches: dict[frozenset, list[dict]] = {}
+    for result in results:
+        matches.setdefault(frozenset(result["agents"]), []).append(result)
+    rng = np.random.default_rng(seed)
+    bootstrap_ratings = np.empty((bootstrap_samples, len(names)))
+    for sample in range(bootstrap_samples):
+        resampled_results = [match_results[index] for match_results in matches.values()
+                             for index in rng.integers(0, len(match_results), size=len(match_results))]
+        bootstrap_ratings[sample] = fit_elo_ratings(*get_score_matrix(resampled_results, names))
+    lower, upper = np.quantile(bootstrap_ratings, [(1 - confidence) / 2, (1 + confidence) / 2], axis=0)
+
+    return {names[position]: {"rating": float(ratings[position]),
+                              "lower": float(lower[position]),
+                              "upper": float(upper[position]),
+                              "games": int(games[position].sum()),
+                              "score": float(scores[position].sum() / games[position].sum())}
+            for position in np.argsort(-ratings)}
+
+
+def main(arguments: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Plays a tournament and rates the agents")
+    parser.add_argument("roster", nargs="+", help=f"checkpoint numbers, exported .pt or .onnx models or "
+                                                       f"{', '.join(ALGORITHMIC_AGENTS)}")
+    parser.add_argument("--challenger", help="play a gauntlet of the challenger against the roster instead of a "
+                                             "round robin")
+    parser.add_argument("--seed-pairs", type=int, default=50, help="seeds per match, each played with both seatings")
+    parser.add_argument("--workers", type=int, default=0, help="processes, 0 plays in this process")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lock-step", action="store_true", help="play all games of a match at once with batched "
+                                                                 "decisions")
+    parser.add_argument("--output", help="write the ratings and all game results as JSON to this file")
+    args = parser.parse_args(arguments)
+
+    if args.challenger:
+        pairings = get_gauntlet_pairings(args.challenger, args.roster)
+    else:
+        pairings = get_round_robin_pairings(args.roster)
+    results = run_tournament(pairings, seed_pairs_per_match=args.seed_pairs, num_workers=args.workers,
+                             seed=args.seed, lock_step=args.lock_step)
+    ratings = compute_ratings(results, seed=args.seed)
+
+    print(f"{'agent':<20}{'rating':>8}{'95% interval':>20}{'games':>8}{'score':>8}")
+    for name, rating in ratings.items():
+        interval = f"{rating['lower']:.0f} - {rating['upper']:.0f}"
+        print(f"{name:<20}{rating['rating']:>8.0f}{interval:>20}{rating['games']:>8}{rating['score']:>8.2f}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"ratings": ratings, "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Precomputed per-row action masks.
+
+The legal fields of a coloured row only depend on the row, how far the row already progressed (index after the last
+crossed field) and the dice sum(s) usable for that row. The pass row only depends on the crossed passes and whether
+the player is allowed to skip. All of these per-row masks are built once at import into ROW_MASKS, so a full (5,11)
+action mask is a single lookup ``ROW_MASKS[row_keys]`` with one key per row.
+
+All key functions work element-wise on numpy arrays as well, so batches of masks are built the same way.
+get_candidate_actions() reduces a flattened mask to the actions which search agents have to compare.
+"""
+import numpy as np
+from numpy import int8
+
+COLORED_ROW_COUNT = 4
+MASK_COLUMNS = 11
+OBSERVATION_COLUMNS = 12
+# progress 0 means nothing crossed, 12 means the row is closed and no field is left
+PROGRESS_VALUES = OBSERVATION_COLUMNS + 1
+DICE_SUM_VALUES = 13
+PASS_FIELDS = 4
+# flattened action indexes: the fields of the coloured rows, then the passes and then the actions which do nothing
+FIRST_PASS_ACTION = COLORED_ROW_COUNT * MASK_COLUMNS
+FIRST_NONE_ACTION = FIRST_PASS_ACTION + PASS_FIELDS
+
+ROW_BIT_WEIGHTS = 1 << np.arange(OBSERVATION_COLUMNS)
+PASS_BIT_WEIGHTS = 1 << np.arange(PASS_FIELDS)
+# index after the last crossed field, indexed by the row bits (see ROW_BIT_WEIGHTS)
+PROGRESS_FOR_ROW_BITS = np.array([bits.bit_length() for bits in range(1 << OBSERVATION_COLUMNS)], dtype=np.intp)
+
+EMPTY_ROW_KEY = 0
+WHITE_DICE_KEY_OFFSET = 1
+COLOR_DICE_KEY_OFFSET = WHITE_DICE_KEY_OFFSET + COLORED_ROW_COUNT * PROGRESS_VALUES * DICE_SUM_VALUES
+PASS_ROW_KEY_OFFSET = COLOR_DICE_KEY_OFFSET + COLORED_ROW_COUNT * PROGRESS_VALUES * DICE_SUM_VALUES ** 2
+_ROW_INDEXES = np.arange(COLORED_ROW_COUNT)
+
+
+def _build_column_for_sum() -> np.ndarray:
+    sums = np.arange(DICE_SUM_VALUES)
+    # red and yellow count upwards from 2, green and blue downwards from 12
+    column_for_sum = np.array([sums - 2, sums - 2, 12 - sums, 12 - sums])
+    column_for_sum[:, :2] = -1
+    return column_for_sum
+
+
+def _build_pass_masks() -> np.ndarray:
+    pass_masks = np.zeros(shape=(1 << PASS_FIELDS, 2, MASK_COLUMNS), dtype=bool)
+    for pass_bits in range(1 << PASS_FIELDS):
+        pass_masks[pass_bits, 0, :PASS_FIELDS] = (pass_bits & PASS_BIT_WEIGHTS) == 0
+        # We don't want to give the option that the player crosses the pass as not learning players can't learn this
+        pass_masks[pass_bits, 1, PASS_FIELDS:] = True
+    return pass_masks
+
+
+# (row, sum) column of the field for a dice sum, -1 for sums which can't be crossed
+COLUMN_FOR_SUM: np.ndarray = _build_column_for_sum()
+# (row, sum, column) fields a dice sum allows
+SUM_MASKS: np.ndarray = COLUMN_FOR_SUM[:, :, None] == np.arange(MASK_COLUMNS)
+# (progress, column) fields which are still free after the last crossed field
+FREE_AFTER_PROGRESS: np.ndarray = np.arange(MASK_COLUMNS)[None, :] >= np.arange(PROGRESS_VALUES)[:, None]
+# (pass bits, allowed to skip without passing, column) mask of the pass row
+PASS_MASKS: np.ndarray = _build_pass_masks()
+
+
+def _build_row_masks() -> np.ndarray:
+    white_masks = SUM_MASKS[:, None, :, :] & FREE_AFTER_PROGRESS[None, :, None, :]
+    color_masks = ((SUM_MASKS[:, :, None, :] | SUM_MASKS[:, None, :, :])[:, None, :, :, :]
+                   & FREE_AFTER_PROGRESS[None, :, None, None, :])
+
+    return np.concatenate([np.zeros(shape=(1, MASK_COLUMNS), dtype=bool),
+                           white_masks.reshape(-1, MASK_COLUMNS),
+                           color_masks.reshape(-1, MASK_COLUMNS),
+                           PASS_MASKS.reshape(-1, MASK_COLUMNS)]).astype(int8)
+
+
+ROW_MASKS: np.ndarray = _build_row_masks()
+ROW_MASKS.flags.writeable = False
+for _table in [COLUMN_FOR_SUM, SUM_MASKS, FREE_AFTER_PROGRESS, PASS_MASKS]:
+    _table.flags.writeable = False
+
+
+def get_row_progress(colored_rows: np.ndarray) -> np.ndarray:
+    """
+    :param colored_rows: array with shape (..., 4, 12) holding the coloured rows of one or more cards
+    :return: index after the last crossed field for every row, shape (..., 4)
+    """
+    return PROGRESS_FOR_ROW_BITS[colored_rows.dot(ROW_BIT_WEIGHTS)]
+
+
+def get_pass_bits(pass_row: np.ndarray):
+    return pass_row[..., :PASS_FIELDS].dot(PASS_BIT_WEIGHTS)
+
+
+def get_white_dice_row_keys(progress, white_sum):
+    """
+    :param progress: (..., 4) progress of the coloured rows
+    :param white_sum: (...) sum of the two white dices
+    """
+    white_sum = np.asarray(white_sum)[..., None]
+    return WHITE_DICE_KEY_OFFSET + (_ROW_INDEXES * PROGRESS_VALUES + progress) * DICE_SUM_VALUES + white_sum
+
+
+def get_color_dice_row_keys(progress, sums1, sums2):
+    """
+    :param progress: (..., 4) progress of the coloured rows
+    :param sums1: (..., 4) first white dice plus the dice with the row's colour
+    :param sums2: (..., 4) second white dice plus the dice with the row's colour
+    """
+    return (COLOR_DICE_KEY_OFFSET
+            + ((_ROW_INDEXES * PROGRESS_VALUES + progress) * DICE_SUM_VALUES + sums1) * DICE_SUM_VALUES + sums2)
+
+
+def get_pass_row_key(pass_bits, allowed_to_skip_without_passing):
+    return PASS_ROW_KEY_OFFSET + pass_bits * 2 + allowed_to_skip_without_passing
+
+
+def get_candidate_actions(action_mask: np.ndarray) -> list[int]:
+    """
+    All allowed fields of the card plus one "do nothing" action, as all of them are equal. Passing is only
+    considered if doing nothing is not allowed, then one pass is enough, as all of them are equal as well.
+
+    :param action_mask: flattened action mask with 55 entries
+    """
+    actions = np.flatnonzero(action_mask[:FIRST_PASS_ACTION]).tolist()
+    none_actions = np.flatnonzero(action_mask[FIRST_NONE_ACTION:])
+    if len(none_actions) > 0:
+        actions.append(int(none_actions[0]) + FIRST_NONE_ACTION)
+    else:
+        pass_actions = np.flatnonzero(action_mask[FIRST_PASS_ACTION:FIRST_NONE_ACTION])
+        if len(pass_actions) > 0:
+            actions.append(int(pass_actions[0]) + FIRST_PASS_ACTION)
+    return actions
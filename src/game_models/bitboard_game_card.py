@@ -0,0 +1,195 @@
+from typing import Callable, Optional
+
+import numpy as np
+from numpy import int8
+
+from game_models import action_mask_tables, zobrist
+from game_models.color import Color
+from game_models.dice import Dice
+from game_models.game_card import GameCard
+
+# Every row of the card is kept as one integer, where bit n represents column n of the observation row.
+# Bit 11 of a coloured row is the "row closed" field, bits 0 - 3 of the pass row are the passes.
+_CELL_COUNT = GameCard.OBSERVATION_SHAPE_COLUMNS
+_CLOSED_COLUMN = 11
+_CLOSED_ROW_BIT = 1 << _CLOSED_COLUMN
+_PASS_BITS = 0b1111
+_PASS_ROW_INDEX = 4
+_MIN_CROSSED_FOR_CLOSING = 5
+
+_BIT_COUNT = [bin(bits).count("1") for bits in range(1 << _CELL_COUNT)]
+_POINTS_FOR_COUNT = [sum(range(1, count + 1)) for count in range(_CELL_COUNT + 1)]
+
+# The per-row masks of action_mask_tables packed into integers
+_MASK_BIT_WEIGHTS = action_mask_tables.ROW_BIT_WEIGHTS[:action_mask_tables.MASK_COLUMNS]
+# Bits which are still allowed after the last crossed field, indexed by int.bit_length() of the row
+_FREE_BITS_AFTER_LAST_CROSSED = action_mask_tables.FREE_AFTER_PROGRESS.dot(_MASK_BIT_WEIGHTS).tolist()
+# Bit of the field for a dice sum, indexed by [row][sum]
+_BITS_FOR_SUM = action_mask_tables.SUM_MASKS.dot(_MASK_BIT_WEIGHTS).tolist()
+# Pass row mask, indexed by [pass bits][allowed to skip without passing]
+_PASS_ROW_MASK_BITS = action_mask_tables.PASS_MASKS.dot(_MASK_BIT_WEIGHTS).tolist()
+_COLUMN_FOR_SUM = action_mask_tables.COLUMN_FOR_SUM.tolist()
+
+_BITS_TO_STATE_ROW = ((np.arange(1 << _CELL_COUNT)[:, None] >> np.arange(_CELL_COUNT)) & 1).astype(int8)
+_BITS_TO_MASK_ROW = np.ascontiguousarray(_BITS_TO_STATE_ROW[:1 << GameCard.ACTION_MASK_SHAPE[1], :11])
+
+
+class BitboardGameCard:
+    """
+    Drop-in alternative for GameCard, which stores every row as an integer bitmask instead of a (5,12) array.
+
+    Crossing, closing rows, counting points and building the action mask are bit operations and small lookup tables.
+    The (5,12) array layout of GameCard is only unpacked when get_state() is asked for an observation.
+    """
+
+    ACTION_MASK_SHAPE = GameCard.ACTION_MASK_SHAPE
+    OBSERVATION_SHAPE = GameCard.OBSERVATION_SHAPE
+    OBSERVATION_SHAPE_ROWS = GameCard.OBSERVATION_SHAPE_ROWS
+    OBSERVATION_SHAPE_COLUMNS = GameCard.OBSERVATION_SHAPE_COLUMNS
+
+    def __init__(self, player_id: str, on_row_closed: Optional[Callable[[int], None]] = None,
+                 on_pass_crossed: Optional[Callable[[int], None]] = None, seat: int = 0):
+        self._row_bits: list[int] = [0] * self.OBSERVATION_SHAPE_ROWS
+        self.crossed_something_in_current_round = False
+        self._player_id: str = player_id
+        self._on_row_closed = on_row_closed
+        self._on_pass_crossed = on_pass_crossed
+        self.seat = seat
+        self._cell_keys = zobrist.CELL_KEYS[seat]
+        self.zobrist_hash = 0
+
+    def get_points(self):
+        total_points = 0
+        for row_bits in self._row_bits[:4]:
+            total_points += _POINTS_FOR_COUNT[_BIT_COUNT[row_bits]]
+
+        total_points += self.get_pass_count() * -5
+
+        return total_points
+
+    def get_pass_count(self):
+        return _BIT_COUNT[self._row_bits[_PASS_ROW_INDEX] & _PASS_BITS]
+
+    @staticmethod
+    def _calculate_points_for_row(checked_count: int) -> int:
+        return _POINTS_FOR_COUNT[checked_count]
+
+    def get_allowed_actions_mask(self, dices: list[Dice], is_tossing_player: bool, is_second_part_of_round: int):
+        """
+        Same contract as GameCard.get_allowed_actions_mask
+
+        :return: np.array with shape (5,11) and 1 everywhere an action is allowed and 0 where its not allowed
+        """
+        crossed_number_bits = self._get_mask_bits_based_on_crossed_numbers()
+        dice_bits = self._get_mask_bits_based_on_dices(dices, is_tossing_player, is_second_part_of_round)
+
+        mask_bits = [crossed_number_bits[index] & dice_bits[index] for index in range(4)]
+        mask_bits.append(self._get_pass_row_mask_bits(is_second_part_of_round, is_tossing_player))
+
+        return _BITS_TO_MASK_ROW[mask_bits]
+
+    def _get_pass_row_mask_bits(self, is_second_part_of_round, is_tossing_player) -> int:
+        allowed_to_skip_without_passing = not is_tossing_player or not is_second_part_of_round or self.crossed_something_in_current_round
+
+        return _PASS_ROW_MASK_BITS[self._row_bits[_PASS_ROW_INDEX] & _PASS_BITS][allowed_to_skip_without_passing]
+
+    def _get_mask_bits_based_on_crossed_numbers(self) -> list[int]:
+        return [_FREE_BITS_AFTER_LAST_CROSSED[row_bits.bit_length()] for row_bits in self._row_bits[:4]]
+
+    def _get_mask_based_on_crossed_numbers(self):
+        return _BITS_TO_MASK_ROW[self._get_mask_bits_based_on_crossed_numbers() + [0]]
+
+    @staticmethod
+    def _get_mask_bits_based_on_dices(dices, is_tossing_player, is_second_part_of_round) -> list[int]:
+        white_values = []
+        colored_values = [0] * 4
+        for dice in dices:
+            if dice.color.value == Color.WHITE.value:
+                white_values.append(dice.current_value)
+            else:
+                colored_values[dice.color.value] = dice.current_value
+
+        if is_second_part_of_round:
+            if not is_tossing_player:
+                return [0, 0, 0, 0]
+
+            mask_bits = []
+            for row_index, colored_value in enumerate(colored_values):
+                sum1 = white_values[0] + colored_value
+                sum2 = white_values[1] + colored_value
+                mask_bits.append(_BITS_FOR_SUM[row_index][sum1] | _BITS_FOR_SUM[row_index][sum2])
+            return mask_bits
+
+        value = white_values[0] + white_values[1]
+        return [_BITS_FOR_SUM[row_index][value] for row_index in range(4)]
+
+    @staticmethod
+    def _get_mask_based_on_dices(dices, is_tossing_player, is_second_part_of_round):
+        mask_bits = BitboardGameCard._get_mask_bits_based_on_dices(dices, is_tossing_player, is_second_part_of_round)
+        return _BITS_TO_MASK_ROW[mask_bits + [0]]
+
+    def _cross_value_in_line(self, line_color: Color, value: int):
+        row_index = line_color.value
+        self._cross_cell(row_index, _COLUMN_FOR_SUM[row_index][value])
+        self.crossed_something_in_current_round = True
+
+    def cross_value_with_flattened_action(self, action):
+        """
+        Same flat indexes as GameCard.cross_value_with_flattened_action
+        :param action:
+        """
+        if action <= 43:
+            self.crossed_something_in_current_round = True
+
+        if action <= 47:
+            row_index, column_index = divmod(int(action), self.ACTION_MASK_SHAPE[1])
+            self._cross_cell(row_index, column_index)
+            self._close_row_if_possible(row_index, column_index)
+
+            if action >= 44 and self._on_pass_crossed is not None:
+                self._on_pass_crossed(self.get_pass_count())
+
+    def _cross_cell(self, row_index, column_index):
+        bit = 1 << column_index
+        if not self._row_bits[row_index] & bit:
+            self._row_bits[row_index] |= bit
+            self.zobrist_hash ^= self._cell_keys[row_index][column_index]
+
+    def _close_row_if_possible(self, row_index, column_index):
+        last_crossable_index_in_row = 10
+        row_bits = self._row_bits[row_index]
+        if column_index == last_crossable_index_in_row and _BIT_COUNT[row_bits] >= _MIN_CROSSED_FOR_CLOSING:
+            self._cross_cell(row_index, _CLOSED_COLUMN)
+            if self._on_row_closed is not None:
+                self._on_row_closed(row_index)
+
+    def _is_row_closed(self, row_index) -> bool:
+        return bool(self._row_bits[row_index] & _CLOSED_ROW_BIT)
+
+    def get_closed_row_indexes(self):
+        return [index for index, row_bits in enumerate(self._row_bits) if row_bits & _CLOSED_ROW_BIT]
+
+    def get_state(self):
+        return _BITS_TO_STATE_ROW[self._row_bits]
+
+    def write_state(self, out: np.ndarray):
+        np.take(_BITS_TO_STATE_ROW, self._row_bits, axis=0, out=out)
+
+    def write_row_bits(self, out: np.ndarray):
+        out[...] = self._row_bits
+
+    def set_row_bits(self, row_bits: np.ndarray):
+        self._row_bits[:] = row_bits.tolist()
+        self.zobrist_hash = zobrist.hash_row_bits(self.seat, self._row_bits)
+
+    @staticmethod
+    def is_reversed_line(color: Color) -> bool:
+        return GameCard.is_reversed_line(color)
+
+    @staticmethod
+    def get_white_dices_sum(dices):
+        return GameCard.get_white_dices_sum(dices)
+
+    @staticmethod
+    def get_sums_for_color(dices, color: Color) -> tuple[int, int]:
+        return GameCard.get_sums_for_color(dices, color)
@@ -1,77 +1,138 @@
+from typing import Optional
+
 import numpy as np
 from numpy import int8
 from pettingzoo.utils.env import AgentID
 
 from src.game_models.color import Color
 from src.game_models.dice import Dice
+from src.game_models.dice_stream import DiceStream
 from src.game_models.game_card import GameCard
+from src.game_models import zobrist
+
+# closed row indexes and their count for every closed rows bitmask
+_CLOSED_ROW_INDEXES = [[index for index in range(GameCard.OBSERVATION_SHAPE_ROWS) if bitmask & (1 << index)]
+                       for bitmask in range(1 << GameCard.OBSERVATION_SHAPE_ROWS)]
+_CLOSED_ROW_COUNT = [len(indexes) for indexes in _CLOSED_ROW_INDEXES]
 
 
 class Board:
     TOSSING_PLAYER_OBS_INDEX = 8
     PART_OF_ROUND_OBS_INDEX = 9
 
-    def __init__(self, player_ids: [str]):
-        self.game_cards: dict[AgentID, GameCard] = {player: GameCard(player) for player in player_ids}
+    def __init__(self, player_ids: [str], game_card_class: type = GameCard, dice_stream: Optional[DiceStream] = None):
+        """
+        :param player_ids: ids of all players at the table
+        :param game_card_class: GameCard or an alternative implementation with the same interface like BitboardGameCard
+        :param dice_stream: seeded source for the dice values, every dice rolls on its own if not set
+        """
+        self.dice_stream = dice_stream
+        self.closed_rows_bitmask = 0
+        self.max_pass_count = 0
+        self.game_cards: dict[AgentID, GameCard] = {
+            player: game_card_class(player, on_row_closed=self._register_closed_row,
+                                    on_pass_crossed=self._register_pass_count, seat=seat)
+            for seat, player in enumerate(player_ids)}
+        # every player sees its own card first and the other cards in playing order after it
+        self._observation_orders: dict[AgentID, list[GameCard]] = {
+            player: [self.game_cards[player_ids[(index + offset) % len(player_ids)]]
+                     for offset in range(len(player_ids))]
+            for index, player in enumerate(player_ids)}
+        self._observation_buffers: dict[AgentID, np.ndarray] = {
+            player: np.zeros(shape=(len(player_ids) + 1,) + GameCard.OBSERVATION_SHAPE, dtype=int8)
+            for player in player_ids}
         self.dices = [Dice(color) for color in
                       [Color.RED, Color.YELLOW, Color.GREEN, Color.BLUE, Color.WHITE, Color.WHITE]]
+        self.dice_hash = zobrist.hash_dices(dice.current_value for dice in self.dices)
 
     def roll_dices(self):
-        for dice in self.dices:
-            dice.roll()
+        if self.dice_stream is None:
+            for dice in self.dices:
+                dice.roll()
+            self.dice_hash = zobrist.hash_dices(dice.current_value for dice in self.dices)
+            return
 
-    def is_game_finished(self):
+        self.set_dice_values(self.dice_stream.next_roll())
+
+    def set_dice_values(self, values: list[int]):
+        """
+        Sets the values of all dices in the order of self.dices and keeps their zobrist hash up to date
+        """
+        for dice, value in zip(self.dices, values):
+            dice.current_value = value
+        self.dice_hash = zobrist.hash_dices(values)
+
+    def get_zobrist_hash(self) -> int:
+        """
+        Hash of all cards and dices. Code which replaces the dices directly has to use set_dice_values().
+        """
+        board_hash = self.dice_hash
         for card in self.game_cards.values():
-            if card.get_pass_count() == 4:
-                return True
+            board_hash ^= card.zobrist_hash
+        return board_hash
 
-        closed_rows_without_duplicates = self.get_closed_row_indexes()
-        if len(closed_rows_without_duplicates) >= 2:
-            return True
+    def _register_closed_row(self, row_index: int):
+        self.closed_rows_bitmask |= 1 << row_index
 
-        return False
+    def _register_pass_count(self, pass_count: int):
+        self.max_pass_count = max(self.max_pass_count, pass_count)
 
-    def get_closed_row_indexes(self) -> list[int]:
-        closed_rows: list[int] = []
+    def restore_tracking(self):
+        """
+        Recomputes the closed rows and the highest pass count from the cards, after their state was set directly
+        """
+        self.closed_rows_bitmask = 0
+        self.max_pass_count = 0
         for card in self.game_cards.values():
-            closed_rows.extend(card.get_closed_row_indexes())
-        closed_rows_without_duplicates = list(dict.fromkeys(closed_rows))
-        return closed_rows_without_duplicates
+            for row_index in card.get_closed_row_indexes():
+                self._register_closed_row(row_index)
+            self._register_pass_count(card.get_pass_count())
+
+    def is_game_finished(self):
+        return self.max_pass_count >= 4 or _CLOSED_ROW_COUNT[self.closed_rows_bitmask] >= 2
+
+    def get_closed_row_indexes(self) -> list[int]:
+        return list(_CLOSED_ROW_INDEXES[self.closed_rows_bitmask])
 
     def get_allowed_actions_mask(self, player_id: str, is_tossing_player: bool,
                                  is_second_part_of_round: int) -> np.ndarray:
         action_mask_from_card = self.game_cards[player_id].get_allowed_actions_mask(self.dices, is_tossing_player,
                                                                                     is_second_part_of_round)
-        for closed_row_index in self.get_closed_row_indexes():
+        for closed_row_index in _CLOSED_ROW_INDEXES[self.closed_rows_bitmask]:
             action_mask_from_card[closed_row_index] = 0
 
         return action_mask_from_card
 
     def get_observation(self, player_id: str, is_tossing_player: bool,
-                        is_second_part_of_round: bool) -> np.ndarray:
+                        is_second_part_of_round: bool, copy: bool = True) -> np.ndarray:
         """
         This returns the board observation for an agent. Board observation includes the game-cards of the other players
         as well as the dice values and round part. The shape is (player_count + 1, 5,12). 5,12 is one game-card state,
         whereas the first axis represent the other players cards (plus one for dice values and state-information). The last channel represents the dice values.
-        Important is that each player sees its own card on index 0 and the other ones after that.
+        Important is that each player sees its own card on index 0 and the other ones after that, in playing order
+        starting with the next player.
+
+        The observation is written in place into a buffer, which the board keeps for every player.
         :param is_second_part_of_round: is it second part where coloured dices come into action?
         :param is_tossing_player: is this player tossing and allowed to use coloured dices?
         :param player_id: player-id
+        :param copy: if False a read-only view of the buffer is returned, which is overwritten by the next call
+            for the same player. Only use it if the observation is copied or consumed before that.
         """
+        observation = self._observation_buffers[player_id]
+        for slot, card in enumerate(self._observation_orders[player_id]):
+            card.write_state(observation[slot])
 
-        observation = [self.game_cards[player_id].get_state()]
-
-        other_player_cards = [item[1].get_state() for item in self.game_cards.items() if item[0] not in player_id]
-        observation.append(*other_player_cards)
-
-        additional_information = np.zeros(shape=GameCard.OBSERVATION_SHAPE, dtype=int8)
-
+        additional_information = observation[-1][0]
         for idx, dice in enumerate(self.dices):
-            additional_information[0][idx] = dice.current_value
+            additional_information[idx] = dice.current_value
 
-        additional_information[0][self.TOSSING_PLAYER_OBS_INDEX] = 1 if is_tossing_player else 0
-        additional_information[0][self.PART_OF_ROUND_OBS_INDEX] = 2 if is_second_part_of_round else 1
+        additional_information[self.TOSSING_PLAYER_OBS_INDEX] = 1 if is_tossing_player else 0
+        additional_information[self.PART_OF_ROUND_OBS_INDEX] = 2 if is_second_part_of_round else 1
 
-        observation.append(additional_information)
+        if copy:
+            return observation.copy()
 
-        return np.array(observation)
+        read_only_observation = observation.view()
+        read_only_observation.flags.writeable = False
+        return read_only_observation
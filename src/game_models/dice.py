@@ -1,12 +1,13 @@
 import random
+from typing import Optional
 
 from src.game_models.color import Color
 
 
 class Dice:
-    def __init__(self, color: Color, current_value: int = random.randint(1, 6)):
+    def __init__(self, color: Color, current_value: Optional[int] = None):
         self.color: Color = color
-        self.current_value: int = current_value
+        self.current_value: int = random.randint(1, 6) if current_value is None else current_value
 
     def roll(self):
         self.current_value = random.randint(1, 6)
@@ -0,0 +1,75 @@
+"""
+Probabilities of the usable dice sums, enumerated once over all 6^6 outcomes of the six dices.
+
+A player can use the sum of the white dices for every row. The tossing player can additionally use one of the two
+sums of a white dice and the row's coloured dice. Both are turned into the probability that a column of a row can be
+crossed with one roll, and into the probability that a column after the row's progress becomes reachable at least
+once within the remaining rolls of a game.
+"""
+import functools
+import itertools
+
+import numpy as np
+
+from game_models import action_mask_tables
+
+DICE_COUNT = 6
+COLORED_ROW_COUNT = action_mask_tables.COLORED_ROW_COUNT
+MASK_COLUMNS = action_mask_tables.MASK_COLUMNS
+DICE_SUM_VALUES = action_mask_tables.DICE_SUM_VALUES
+
+# all outcomes in the order of Board.dices: red, yellow, green, blue, white, white
+OUTCOMES = np.array(list(itertools.product(range(1, 7), repeat=DICE_COUNT)), dtype=np.intp)
+OUTCOMES.flags.writeable = False
+
+# column of every row for every dice sum, -1 for sums which don't exist
+COLUMN_FOR_SUM = action_mask_tables.COLUMN_FOR_SUM
+
+
+def _build_probabilities():
+    white_sums = OUTCOMES[:, 4] + OUTCOMES[:, 5]
+    white_sum_probabilities = np.bincount(white_sums, minlength=DICE_SUM_VALUES) / len(OUTCOMES)
+
+    columns = np.arange(MASK_COLUMNS)
+    white_columns = COLUMN_FOR_SUM[:, white_sums]
+    # (row, outcome, column)
+    white_usable = white_columns[:, :, None] == columns
+    color_usable = np.zeros_like(white_usable)
+    for row in range(COLORED_ROW_COUNT):
+        for white_dice in (4, 5):
+            color_columns = COLUMN_FOR_SUM[row, OUTCOMES[:, row] + OUTCOMES[:, white_dice]]
+            color_usable[row] |= color_columns[:, None] == columns
+
+    return (white_sum_probabilities, white_usable.mean(axis=1),
+            (white_usable | color_usable).mean(axis=1))
+
+
+# WHITE_SUM_PROBABILITIES: probability of every white dice sum, indexed by the sum
+# WHITE_COLUMN_PROBABILITIES: (4,11) probability that a column can be crossed with the white dices of one roll
+# TOSSING_COLUMN_PROBABILITIES: (4,11) the same for the tossing player, who can use the white or the coloured sums
+WHITE_SUM_PROBABILITIES, WHITE_COLUMN_PROBABILITIES, TOSSING_COLUMN_PROBABILITIES = _build_probabilities()
+for _table in (WHITE_SUM_PROBABILITIES, WHITE_COLUMN_PROBABILITIES, TOSSING_COLUMN_PROBABILITIES):
+    _table.flags.writeable = False
+
+
+@functools.lru_cache(maxsize=None)
+def get_column_probabilities(num_players: int) -> np.ndarray:
+    """
+    :return: (4,11) probability that a column can be crossed with one roll, averaged over the rolls in which the
+        player tosses (every num_players-th roll) and the ones in which it doesn't
+    """
+    probabilities = ((num_players - 1) * WHITE_COLUMN_PROBABILITIES + TOSSING_COLUMN_PROBABILITIES) / num_players
+    probabilities.flags.writeable = False
+    return probabilities
+
+
+def get_reach_probabilities(progress: np.ndarray, remaining_rolls: float, num_players: int) -> np.ndarray:
+    """
+    :param progress: (..., 4) progress of the coloured rows, see action_mask_tables.get_row_progress()
+    :param remaining_rolls: expected number of rolls until the game ends
+    :return: (..., 4, 11) probability that every column after the progress can be crossed at least once within the
+        remaining rolls, 0 for columns which can't be crossed anymore
+    """
+    reach = 1 - (1 - get_column_probabilities(num_players)) ** remaining_rolls
+    is_ahead = np.arange(MASK_COLUMNS) >= np.asarray(progress)[..., None]
+    return np.where(is_ahead, reach, 0.0)
@@ -0,0 +1,30 @@
+import numpy as np
+
+
+class DiceStream:
+    """
+    Serves the values of all six dices for one roll at a time from a buffer, which is filled with many rolls in one
+    vectorized call of the given numpy Generator. Seeding the generator makes the dice sequence reproducible.
+    """
+
+    DICE_COUNT = 6
+
+    def __init__(self, generator: np.random.Generator, buffered_rolls: int = 256):
+        self._generator = generator
+        self._buffered_rolls = buffered_rolls
+        self._rolls: list[list[int]] = []
+        self._next_roll_index = 0
+
+    def _refill(self):
+        self._rolls = self._generator.integers(1, 7, size=(self._buffered_rolls, self.DICE_COUNT)).tolist()
+        self._next_roll_index = 0
+
+    def next_roll(self) -> list[int]:
+        """
+        :return: six dice values in the same order as Board.dices
+        """
+        if self._next_roll_index >= len(self._rolls):
+            self._refill()
+        roll = self._rolls[self._next_roll_index]
+        self._next_roll_index += 1
+        return roll
@@ -1,10 +1,16 @@
+from typing import Callable, Optional
+
 import numpy as np
 import numpy.typing as npt
 from numpy import int8
 
+from game_models import action_mask_tables, zobrist
 from game_models.color import Color
 from game_models.dice import Dice
 
+# weight of every column when a row is packed into an integer, bit n represents column n
+_ROW_BIT_WEIGHTS = 1 << np.arange(12)
+
 
 class GameCard:
     ACTION_MASK_SHAPE = (5, 11)
@@ -12,10 +18,23 @@ class GameCard:
     OBSERVATION_SHAPE_ROWS = 5
     OBSERVATION_SHAPE_COLUMNS = 12
 
-    def __init__(self, player_id: str):
+    def __init__(self, player_id: str, on_row_closed: Optional[Callable[[int], None]] = None,
+                 on_pass_crossed: Optional[Callable[[int], None]] = None, seat: int = 0):
+        """
+        :param player_id: id of the player owning this card
+        :param on_row_closed: called with the row index whenever this card closes a row
+        :param on_pass_crossed: called with the new pass count whenever a pass is crossed
+        :param seat: index of the player at the table, which selects the zobrist keys of the card
+        """
         self._rows: npt.NDArray = np.zeros(shape=self.OBSERVATION_SHAPE, dtype=int8)
         self.crossed_something_in_current_round = False
         self._player_id: str = player_id
+        self._on_row_closed = on_row_closed
+        self._on_pass_crossed = on_pass_crossed
+        self.seat = seat
+        self._cell_keys = zobrist.CELL_KEYS[seat]
+        # XOR of the zobrist keys of all crossed cells
+        self.zobrist_hash = 0
 
     def get_points(self):
         total_points = 0
@@ -53,45 +72,31 @@ class GameCard:
         First 44 values are for values on the board, the 44th - 48th are for pass fields and 49th - 55th are used
         for doing nothing. Doing nothing is not allowed when player hasn't taken any action but has tossed in this round
 
+        Every row of the mask is looked up in the precomputed action_mask_tables.ROW_MASKS
+
         :return: np.array with shape (4,11) and 1 everywhere an action is allowed and 0 where its not allowed
         """
-        mask_based_on_crossed_numbers = self._get_mask_based_on_crossed_numbers()
-        mask_based_on_dices = self._get_mask_based_on_dices(dices, is_tossing_player, is_second_part_of_round)
+        row_keys = self._get_row_keys_based_on_dices(dices, is_tossing_player, is_second_part_of_round)
 
-        combined_mask = mask_based_on_crossed_numbers & mask_based_on_dices
+        allowed_to_skip_without_passing = not is_tossing_player or not is_second_part_of_round or self.crossed_something_in_current_round
+        pass_row_key = action_mask_tables.get_pass_row_key(action_mask_tables.get_pass_bits(self._rows[4]),
+                                                           int(allowed_to_skip_without_passing))
 
-        final_mask = self._add_pass_numbers_and_none_actions(combined_mask, is_second_part_of_round, is_tossing_player)
+        return action_mask_tables.ROW_MASKS[np.append(row_keys, pass_row_key)]
 
-        return final_mask
+    def _get_row_keys_based_on_dices(self, dices, is_tossing_player, is_second_part_of_round):
+        if is_second_part_of_round and not is_tossing_player:
+            return [action_mask_tables.EMPTY_ROW_KEY] * 4
 
-    def _add_pass_numbers_and_none_actions(self, combined_mask, is_second_part_of_round, is_tossing_player):
-        row_index = 4
-        row = self._rows[row_index]
-        for pass_field in range(0, 4):
-            if row[pass_field] == 0:
-                combined_mask[row_index][pass_field] = 1
+        progress = action_mask_tables.get_row_progress(self._rows[:4])
+        white_dice_value1, white_dice_value2, colored_dice_values = GameCard._get_dice_values(dices)
 
-        allowed_to_skip_without_passing = not is_tossing_player or not is_second_part_of_round or self.crossed_something_in_current_round
+        if is_second_part_of_round:
+            return action_mask_tables.get_color_dice_row_keys(progress,
+                                                              colored_dice_values + white_dice_value1,
+                                                              colored_dice_values + white_dice_value2)
 
-        if allowed_to_skip_without_passing:
-            combined_mask[row_index][3:] = 1
-            # We don't want to give the option that the player crosses the pass as not learning players can't learn this
-            combined_mask[row_index][0:4] = 0
-
-        return combined_mask
-
-    def _get_mask_based_on_crossed_numbers(self):
-        mask_based_on_crossed_numbers = np.zeros(shape=GameCard.ACTION_MASK_SHAPE, dtype=int8)
-        for mask_index, mask_row in enumerate(mask_based_on_crossed_numbers):
-            if mask_index <= 3:
-                row = self._rows[mask_index]
-                nonzero_indexes = np.nonzero(row)
-                if len(nonzero_indexes[0]):
-                    last_crossed_index = nonzero_indexes[0][-1]
-                    mask_based_on_crossed_numbers[mask_index][last_crossed_index + 1:] = 1
-                else:
-                    mask_based_on_crossed_numbers[mask_index] = 1
-        return mask_based_on_crossed_numbers
+        return action_mask_tables.get_white_dice_row_keys(progress, white_dice_value1 + white_dice_value2)
 
     @staticmethod
     def _get_mask_based_on_dices(dices, is_tossing_player, is_second_part_of_round):
@@ -119,11 +124,10 @@ class GameCard:
         return mask
 
     def _cross_value_in_line(self, line_color: Color, value: int):
-        row: npt.NDArray = self._rows[line_color.value]
         if GameCard.is_reversed_line(line_color):
-            row[12 - value] = 1
+            self._cross_cell(line_color.value, 12 - value)
         else:
-            row[value - 2] = 1
+            self._cross_cell(line_color.value, value - 2)
 
         self.crossed_something_in_current_round = True
 
@@ -145,27 +149,53 @@ class GameCard:
 
         if action <= 47:
             row_index, column_index = np.array(np.unravel_index(action, shape=self.ACTION_MASK_SHAPE), dtype=np.intp)
-            self._rows[row_index, column_index] = 1
+            self._cross_cell(row_index, column_index)
             self._close_row_if_possible(row_index, column_index)
 
+            if action >= 44 and self._on_pass_crossed is not None:
+                self._on_pass_crossed(self.get_pass_count())
+
+    def _cross_cell(self, row_index, column_index):
+        if not self._rows[row_index, column_index]:
+            self._rows[row_index, column_index] = 1
+            self.zobrist_hash ^= self._cell_keys[row_index][column_index]
+
     def _close_row_if_possible(self, row_index, column_index):
         last_crossable_index_in_row = 10
         if column_index == last_crossable_index_in_row and np.count_nonzero(self._rows[row_index]) >= 5:
-            self._rows[row_index, column_index + 1] = 1
+            self._cross_cell(row_index, column_index + 1)
+            if self._on_row_closed is not None:
+                self._on_row_closed(row_index)
 
     def _is_row_closed(self, row_index) -> bool:
         return self._rows[row_index][-1] == 1
 
     def get_closed_row_indexes(self):
-        closed_row_indexes: list[int] = []
-        for index, row in enumerate(self._rows):
-            if self._is_row_closed(index):
-                closed_row_indexes.append(index)
-        return closed_row_indexes
+        return np.flatnonzero(self._rows[:, -1]).tolist()
 
     def get_state(self):
         return self._rows
 
+    def write_state(self, out: np.ndarray):
+        """
+        Writes the (5,12) card state into an existing array, e.g. the card's slot of an observation
+        """
+        out[...] = self._rows
+
+    def write_row_bits(self, out: np.ndarray):
+        """
+        Writes every row packed into an integer, where bit n is column n of the row, e.g. into a state snapshot
+        """
+        out[...] = self._rows @ _ROW_BIT_WEIGHTS
+
+    def set_row_bits(self, row_bits: np.ndarray):
+        """
+        Sets the state of all rows from the packed form of write_row_bits(). No callbacks are called, so the board
+        has to recompute what it tracks about the cards afterwards.
+        """
+        self._rows[...] = (row_bits[:, None] >> np.arange(self.OBSERVATION_SHAPE_COLUMNS)) & 1
+        self.zobrist_hash = zobrist.hash_row_bits(self.seat, row_bits)
+
     @staticmethod
     def is_reversed_line(color: Color) -> bool:
         return color == Color.GREEN or color == Color.BLUE
@@ -174,6 +204,20 @@ class GameCard:
     def get_white_dices_sum(dices):
         return np.sum([dice.current_value for dice in dices if dice.color == Color.WHITE])
 
+    @staticmethod
+    def _get_dice_values(dices) -> tuple[int, int, np.ndarray]:
+        """
+        :return: both white dice values and the coloured dice values ordered by their row index
+        """
+        white_dice_values = []
+        colored_dice_values = np.zeros(shape=4, dtype=np.intp)
+        for dice in dices:
+            if dice.color.value == Color.WHITE.value:
+                white_dice_values.append(dice.current_value)
+            else:
+                colored_dice_values[dice.color.value] = dice.current_value
+        return white_dice_values[0], white_dice_values[1], colored_dice_values
+
     @staticmethod
     def get_sums_for_color(dices, color: Color) -> tuple[int, int]:
         white_dice_values = [dice.current_value for dice in dices if dice.color == Color.WHITE]
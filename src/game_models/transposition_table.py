@@ -0,0 +1,79 @@
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class TranspositionTable:
+    """
+    Bounded cache of values per game state hash, e.g. QwoxEnv.get_zobrist_hash(). Once the table is full, an entry
+    is replaced by one of these strategies:
+
+    - "lru": the least recently used entry is dropped
+    - "depth": every hash has exactly one slot (hash modulo max_entries). A new entry only replaces the entry in its
+      slot, of the same or a different state, if it was searched at least as deep, so expensive results survive
+      cheap ones.
+    """
+
+    REPLACEMENT_STRATEGIES = ("lru", "depth")
+
+    def __init__(self, max_entries: int = 1 << 16, replacement: str = "lru"):
+        if replacement not in self.REPLACEMENT_STRATEGIES:
+            raise Exception("Unknown replacement strategy", replacement, self.REPLACEMENT_STRATEGIES)
+        self.max_entries = max_entries
+        self.replacement = replacement
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[int, Any] = OrderedDict()
+        self._slot_keys: list[Optional[int]] = [None] * max_entries if replacement == "depth" else []
+        self._slot_values: list[Any] = [None] * max_entries if replacement == "depth" else []
+        self._slot_depths: list[int] = [-1] * max_entries if replacement == "depth" else []
+
+    def get(self, key: int, default: Any = None) -> Any:
+        if self.replacement == "lru":
+            value = self._entries.get(key, self)
+            if value is self:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+        else:
+            slot = key % self.max_entries
+            if self._slot_keys[slot] != key:
+                self.misses += 1
+                return default
+            value = self._slot_values[slot]
+        self.hits += 1
+        return value
+
+    def store(self, key: int, value: Any, depth: int = 0):
+        """
+        :param depth: how deep the value was searched, only used by the "depth" strategy
+        """
+        if self.replacement == "lru":
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return
+
+        slot = key % self.max_entries
+        if depth >= self._slot_depths[slot]:
+            self._slot_keys[slot] = key
+            self._slot_values[slot] = value
+            self._slot_depths[slot] = depth
+
+    def __contains__(self, key: int) -> bool:
+        if self.replacement == "lru":
+            return key in self._entries
+        return self._slot_keys[key % self.max_entries] == key
+
+    def __len__(self) -> int:
+        if self.replacement == "lru":
+            return len(self._entries)
+        return sum(key is not None for key in self._slot_keys)
+
+    def clear(self):
+        self._entries.clear()
+        self._slot_keys = [None] * len(self._slot_keys)
+        self._slot_values = [None] * len(self._slot_values)
+        self._slot_depths = [-1] * len(self._slot_depths)
+        self.hits = 0
+        self.misses = 0
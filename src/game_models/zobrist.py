@@ -0,0 +1,55 @@
+"""
+Zobrist keys for hashing Qwox game states.
+
+Every part of a state (a crossed cell of a seat's card, a dice value, the part of the round, the tossing seat, the
+seat to move and whether a seat crossed something in the current round) has a random 64-bit key. The hash of a state
+is the XOR of the keys of all its parts, so it can be updated with one XOR whenever one part changes. The keys are
+drawn from a fixed seed, so hashes are the same in every process.
+"""
+import numpy as np
+
+MAX_SEATS = 5
+ROWS = 5
+COLUMNS = 12
+DICE_COUNT = 6
+DICE_VALUES = 7
+
+_random = np.random.default_rng(0x9E3779B97F4A7C15)
+
+
+def _draw_keys(*shape: int) -> list:
+    return _random.integers(1, 1 << 63, size=shape, dtype=np.int64).tolist()
+
+
+# [seat][row][column], column 11 of a coloured row is the "row closed" field
+CELL_KEYS: list[list[list[int]]] = _draw_keys(MAX_SEATS, ROWS, COLUMNS)
+# [dice index in the order of Board.dices][value]
+DICE_KEYS: list[list[int]] = _draw_keys(DICE_COUNT, DICE_VALUES)
+# [0 for the first part of the round, 1 for the second part]
+PHASE_KEYS: list[int] = _draw_keys(2)
+TOSSING_SEAT_KEYS: list[int] = _draw_keys(MAX_SEATS)
+SEAT_TO_MOVE_KEYS: list[int] = _draw_keys(MAX_SEATS)
+CROSSED_IN_CURRENT_ROUND_KEYS: list[int] = _draw_keys(MAX_SEATS)
+
+
+def hash_row_bits(seat: int, row_bits) -> int:
+    """
+    :param row_bits: every row of a card packed into an integer, where bit n is column n of the row
+    :return: hash of all crossed cells of the card
+    """
+    cell_keys = CELL_KEYS[seat]
+    card_hash = 0
+    for row, bits in enumerate(row_bits):
+        bits = int(bits)
+        while bits:
+            lowest_bit = bits & -bits
+            card_hash ^= cell_keys[row][lowest_bit.bit_length() - 1]
+            bits ^= lowest_bit
+    return card_hash
+
+
+def hash_dices(dice_values) -> int:
+    dice_hash = 0
+    for index, value in enumerate(dice_values):
+        dice_hash ^= DICE_KEYS[index][value]
+    return dice_hash
@@ -1,13 +1,13 @@
 import numpy as np
 
 from env.wrapped_quox_env import wrapped_quox_env
-from manual_testing.utils import get_trained_agent, create_batch_from_observation
+from manual_testing.utils import get_playing_agent, create_batch_from_observation
 
 if __name__ == "__main__":
     env = wrapped_quox_env()
     env.reset()
 
-    trained_agent = get_trained_agent(env, 103)
+    trained_agent = get_playing_agent(env, 103)
 
     for agent in env.agent_iter():
         observation, reward, _, info = env.last()
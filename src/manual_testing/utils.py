@@ -1,4 +1,8 @@
+import glob
 import os
+import re
+from collections import OrderedDict
+from typing import Iterable, Optional
 
 import numpy as np
 import torch
@@ -6,31 +10,127 @@ from tianshou.data import Batch
 from tianshou.policy import DQNPolicy
 from tianshou.utils.net.common import Net
 
+from agents.exported_dqn_agent import ExportedDQNAgent
 
-def get_trained_agent(env, policy_number: int):
-    net = Net(
-        state_shape=env.observation_spaces[env.agents[0]]["observation"].shape,
-        action_shape=env.observation_spaces[env.agents[0]]["action_mask"].shape,
-        hidden_sizes=[128, 128, 128, 128, 128, 128],
-        device="cuda" if torch.cuda.is_available() else "cpu",
-    ).to("cuda" if torch.cuda.is_available() else "cpu")
 
-    optim = torch.optim.Adam(net.parameters(), lr=1e-5)
+TRAINED_AGENTS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trained_agents")
+
+
+def get_trained_agent_path(policy_number: int) -> str:
+    return os.path.join(TRAINED_AGENTS_DIRECTORY, f"policy-{policy_number}.pth")
+
+
+def get_exported_agent_path(policy_number: int) -> str:
+    """:return: where agents/export_dqn.py writes the TorchScript model of the policy by default"""
+    return os.path.join(TRAINED_AGENTS_DIRECTORY, f"policy-{policy_number}.pt")
+
 
+def load_trained_agent(policy_number: int, observation_shape: tuple = (3, 5, 12), action_count: int = 55,
+                       path: Optional[str] = None) -> DQNPolicy:
+    """
+    Loads a checkpoint from trained_agents for inference only: it runs on the cpu, in eval mode and without
+    optimizer. The hidden layer sizes are read from the checkpoint, so also agents with wider layers can be loaded.
+    Use trained_agents.get() to load every agent only once.
+
+    :param path: checkpoint to load instead of the one of policy_number in trained_agents
+    """
+    state_dict = torch.load(path or get_trained_agent_path(policy_number), map_location="cpu")
+    hidden_weights = [value for key, value in state_dict.items()
+                      if key.startswith("model.") and key.endswith("weight")][:-1]
+    net = Net(
+        state_shape=observation_shape,
+        action_shape=action_count,
+        hidden_sizes=[weight.shape[0] for weight in hidden_weights],
+        device="cpu",
+    )
     agent = DQNPolicy(
         model=net,
-        optim=optim,
+        optim=None,
         discount_factor=0.99,
         estimation_step=1,
         target_update_freq=500
     )
+    agent.load_state_dict(state_dict)
+    agent.eval()
+    return agent
+
+
+class TrainedAgentRegistry:
+    """
+    Finds the checkpoints policy-<number>.pth in a directory and loads them on first use with load_trained_agent().
+    The most recently used agents stay loaded. They are shared by all callers, so don't train them or change their
+    epsilon without a copy.
+    """
+
+    def __init__(self, directory: str = TRAINED_AGENTS_DIRECTORY, max_loaded_agents: int = 16):
+        self.directory = directory
+        self.max_loaded_agents = max_loaded_agents
+        self._paths: dict[int, str] = {}
+        self._agents: OrderedDict[tuple[int, tuple], DQNPolicy] = OrderedDict()
+        self.discover()
+
+    def discover(self) -> list[int]:
+        """
+        Scans the directory again, e.g. after a training run saved a new checkpoint.
+
+        :return: the numbers of all available agents
+        """
+        self._paths = {}
+        for path in glob.glob(os.path.join(self.directory, "policy-*.pth")):
+            match = re.fullmatch(r"policy-(\d+)\.pth", os.path.basename(path))
+            if match:
+                self._paths[int(match.group(1))] = path
+        return self.get_policy_numbers()
+
+    def get_policy_numbers(self) -> list[int]:
+        return sorted(self._paths)
+
+    def get(self, policy_number: int, observation_shape: tuple = (3, 5, 12)) -> DQNPolicy:
+        key = (policy_number, tuple(observation_shape))
+        agent = self._agents.get(key)
+        if agent is not None:
+            self._agents.move_to_end(key)
+            return agent
+
+        if policy_number not in self._paths:
+            raise Exception("No trained agent with this number in", policy_number, self.directory)
+        agent = load_trained_agent(policy_number, observation_shape, path=self._paths[policy_number])
+        for parameter in agent.parameters():
+            parameter.requires_grad_(False)
+        self._agents[key] = agent
+        if len(self._agents) > self.max_loaded_agents:
+            self._agents.popitem(last=False)
+        return agent
+
+    def share_memory(self, policy_numbers: Iterable[int], observation_shape: tuple = (3, 5, 12)):
+        """
+        Loads the agents and moves their weights into shared memory. Worker processes started afterwards use the
+        same weights instead of loading their own copy.
+        """
+        for policy_number in policy_numbers:
+            self.get(policy_number, observation_shape).share_memory()
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+
+trained_agents = TrainedAgentRegistry()
+
+
+def get_trained_agent(env, policy_number: int) -> DQNPolicy:
+    """:return: the agent for the observations of env, loaded only once, see TrainedAgentRegistry"""
+    return trained_agents.get(policy_number, env.observation_space(env.agents[0])["observation"].shape)
 
-    path = os.path.join(os.path.abspath(os.getcwd()), f"src/manual_testing/trained_agents/policy-{policy_number}.pth")
-    print(path)
-    trained_agent = agent
-    trained_agent.load_state_dict(torch.load(path))
 
-    return trained_agent
+def get_playing_agent(env, policy_number: int):
+    """
+    :return: the exported model of the policy if agents/export_dqn.py wrote one, as it decides faster, otherwise the
+        trained agent. Both take the batches of create_batch_from_observation().
+    """
+    path = get_exported_agent_path(policy_number)
+    if os.path.exists(path):
+        return ExportedDQNAgent(path)
+    return get_trained_agent(env, policy_number)
 
 
 def create_batch_from_observation(observation, info):
@@ -0,0 +1,66 @@
+import unittest
+
+import numpy as np
+from tianshou.data import Batch
+
+from agents.tianshou.expectimax_policy import ExpectimaxPolicy
+from env.qwox_env import QwoxEnv
+from env.results_sink import NullResultsSink
+from utils import get_dices_with_value
+
+
+class ExpectimaxPolicyTest(unittest.TestCase):
+
+    def test_takes_field_without_skipping_others(self):
+        env = QwoxEnv(results_sink=NullResultsSink(), render_mode=None)
+        env.reset()
+        env.board.dices = get_dices_with_value(1)
+        env.invalidate_observation_cache()
+        observation = env.observe("player_2")
+
+        for depth in [1, 2]:
+            with self.subTest(depth=depth):
+                action = ExpectimaxPolicy(depth=depth).choose_action(observation["observation"],
+                                                                     observation["action_mask"])
+
+                # white sum 2 is the first field of red and yellow, but the last one of green and blue
+                self.assertIn(action, [0, 11])
+
+    def test_does_nothing_instead_of_skipping_most_fields(self):
+        env = QwoxEnv(results_sink=NullResultsSink(), render_mode=None)
+        env.reset()
+        for action in [23, 34]:
+            env.board.game_cards["player_2"].cross_value_with_flattened_action(action)
+        # white sum 12 can only be used for the last field of red and yellow
+        env.board.dices = get_dices_with_value(6)
+        env.invalidate_observation_cache()
+        observation = env.observe("player_2")
+
+        for depth in [1, 2]:
+            with self.subTest(depth=depth):
+                action = ExpectimaxPolicy(depth=depth).choose_action(observation["observation"],
+                                                                     observation["action_mask"])
+
+                self.assertGreaterEqual(action, 48)
+
+    def test_forward_chooses_allowed_actions(self):
+        env = QwoxEnv(results_sink=NullResultsSink(), render_mode=None)
+        env.reset(seed=3)
+        observations = [env.observe(agent) for agent in env.agents]
+        batch = Batch(obs=Batch(obs=np.array([observation["observation"] for observation in observations]),
+                                mask=np.array([observation["action_mask"] == 1 for observation in observations])))
+
+        for depth in [1, 2]:
+            with self.subTest(depth=depth):
+                actions = ExpectimaxPolicy(depth=depth).forward(batch)["act"]
+
+                for observation, action in zip(observations, actions):
+                    self.assertEqual(1, observation["action_mask"][action])
+
+    def test_needs_positive_depth(self):
+        with self.assertRaises(Exception):
+            ExpectimaxPolicy(depth=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
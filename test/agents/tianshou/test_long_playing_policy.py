@@ -1,5 +1,7 @@
 import unittest
 
+import numpy as np
+from numpy.testing import assert_array_equal
 from tianshou.data import Batch
 
 from agents.tianshou.long_playing_policy import LongPlayingPolicy
@@ -15,6 +17,25 @@ class LongPlayingPolicyTest(unittest.TestCase):
         self.assertEqual(47, action_array[1]["act"])
         self.assertEqual(6, action_array[2]["act"])
 
+    def test_batch_matches_choice_per_row(self):
+        rng = np.random.default_rng(0)
+        masks = rng.random((500, 55)) < rng.random((500, 1))
+        masks[:50, :44] = False
+        masks[50:60] = False
+
+        actions = LongPlayingPolicy().forward(Batch(obs=Batch(mask=masks))).act
+
+        assert_array_equal([self.choose_action_for_row(mask) for mask in masks], actions)
+
+    @staticmethod
+    def choose_action_for_row(mask):
+        allowed_actions = np.flatnonzero(mask)
+        if len(allowed_actions) == 0:
+            return 0
+        if 44 <= allowed_actions[0] <= 47:
+            return allowed_actions[-1]
+        return allowed_actions[0]
+
     def get_example_batch(self):
         batch = Batch()
         batch["obs"] = Batch()
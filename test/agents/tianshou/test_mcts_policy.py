@@ -0,0 +1,76 @@
+import random
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_equal
+from tianshou.data import Batch
+
+from agents.tianshou.mcts_policy import MCTSPolicy, _search_in_worker, snapshot_from_observation
+from env.qwox_env import QwoxEnv
+from env.results_sink import NullResultsSink
+
+
+class MCTSPolicyTest(unittest.TestCase):
+
+    def test_snapshot_from_observation_restores_observed_state(self):
+        random.seed(1)
+        env = QwoxEnv(results_sink=NullResultsSink(), render_mode=None)
+        env.reset(seed=1)
+        other_env = QwoxEnv(results_sink=NullResultsSink(), render_mode=None)
+        other_env.reset()
+
+        for _ in range(30):
+            agent = env.agent_selection
+            observation = env.observe(agent)
+            other_env.restore_state_snapshot(snapshot_from_observation(observation["observation"],
+                                                                       observation["action_mask"],
+                                                                       env.agent_name_mapping[agent]))
+
+            self.assertEqual(agent, other_env.agent_selection)
+            assert_array_equal(observation["observation"], other_env.observe(agent)["observation"])
+            assert_array_equal(observation["action_mask"], other_env.observe(agent)["action_mask"])
+            env.step(random.choice(np.flatnonzero(observation["action_mask"])))
+
+    def test_forward_chooses_allowed_actions(self):
+        env = QwoxEnv(results_sink=NullResultsSink(), render_mode=None)
+        env.reset(seed=2)
+        policy = MCTSPolicy(num_simulations=20, seed=2)
+        observations = [env.observe(agent) for agent in env.agents]
+        batch = Batch(obs=Batch(obs=np.array([observation["observation"] for observation in observations]),
+                                mask=np.array([observation["action_mask"] == 1 for observation in observations]),
+                                agent_id=np.array(env.agents)))
+
+        actions = policy.forward(batch)["act"]
+
+        for observation, action in zip(observations, actions):
+            self.assertEqual(1, observation["action_mask"][action])
+
+    def test_reused_worker_search_is_reproducible(self):
+        env = QwoxEnv(results_sink=NullResultsSink(), render_mode=None)
+        env.reset(seed=3)
+        observation = env.observe(env.agent_selection)
+        snapshot = snapshot_from_observation(observation["observation"], observation["action_mask"], 0)
+        env.step(int(np.flatnonzero(observation["action_mask"])[0]))
+        other_observation = env.observe(env.agent_selection)
+        other_snapshot = snapshot_from_observation(other_observation["observation"], other_observation["action_mask"],
+                                                   env.agent_name_mapping[env.agent_selection])
+
+        visit_counts = _search_in_worker(snapshot, 50, None, 1.0, 20.0, 0.1, seed=4)
+        _search_in_worker(other_snapshot, 50, None, 1.0, 20.0, 0.1, seed=5)
+
+        self.assertEqual(visit_counts, _search_in_worker(snapshot, 50, None, 1.0, 20.0, 0.1, seed=4))
+
+    def test_forward_needs_player_agent_ids(self):
+        env = QwoxEnv(results_sink=NullResultsSink(), render_mode=None)
+        env.reset(seed=2)
+        observation = env.observe(env.agent_selection)
+        policy = MCTSPolicy(num_simulations=20, seed=2)
+
+        for obs in [Batch(obs=[observation["observation"]], mask=[observation["action_mask"] == 1]),
+                    Batch(obs=[observation["observation"]], mask=[observation["action_mask"] == 1], agent_id=[0])]:
+            with self.assertRaises(Exception):
+                policy.forward(Batch(obs=obs))
+
+
+if __name__ == '__main__':
+    unittest.main()
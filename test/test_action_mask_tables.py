@@ -0,0 +1,82 @@
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from game_models import action_mask_tables
+from game_models.color import Color
+from game_models.game_card import GameCard
+from utils import get_dices_with_value
+
+
+class ActionMaskTablesTest(unittest.TestCase):
+
+    def test_row_progress(self):
+        card = GameCard("some_player_id")
+        card._cross_value_in_line(Color.RED, 4)
+        card._cross_value_in_line(Color.BLUE, 2)
+
+        progress = action_mask_tables.get_row_progress(card.get_state()[:4])
+
+        assert_array_equal(progress, [3, 0, 0, 11])
+
+    def test_white_dice_row_masks(self):
+        row_keys = action_mask_tables.get_white_dice_row_keys(np.array([0, 0, 3, 3]), 7)
+        mask = action_mask_tables.ROW_MASKS[row_keys]
+
+        assert_array_equal(np.flatnonzero(mask[Color.RED.value]), [5])
+        assert_array_equal(np.flatnonzero(mask[Color.YELLOW.value]), [5])
+        assert_array_equal(np.flatnonzero(mask[Color.GREEN.value]), [5])
+        assert_array_equal(np.flatnonzero(mask[Color.BLUE.value]), [5])
+
+    def test_crossed_fields_are_not_allowed_anymore(self):
+        row_keys = action_mask_tables.get_white_dice_row_keys(np.array([6, 5, 12, 0]), 7)
+        mask = action_mask_tables.ROW_MASKS[row_keys]
+
+        assert_array_equal(mask.sum(axis=1), [0, 1, 0, 1])
+
+    def test_color_dice_row_masks(self):
+        sums1 = np.array([5, 6, 7, 8])
+        sums2 = np.array([9, 9, 9, 9])
+        row_keys = action_mask_tables.get_color_dice_row_keys(np.zeros(shape=4, dtype=int), sums1, sums2)
+        mask = action_mask_tables.ROW_MASKS[row_keys]
+
+        assert_array_equal(np.flatnonzero(mask[Color.RED.value]), [3, 7])
+        assert_array_equal(np.flatnonzero(mask[Color.BLUE.value]), [3, 4])
+
+    def test_pass_row_masks(self):
+        forced_to_pass = action_mask_tables.ROW_MASKS[action_mask_tables.get_pass_row_key(0b0101, 0)]
+        allowed_to_skip = action_mask_tables.ROW_MASKS[action_mask_tables.get_pass_row_key(0b0101, 1)]
+
+        assert_array_equal(forced_to_pass, [0, 1, 0, 1, 0, 0, 0, 0, 0, 0, 0])
+        assert_array_equal(allowed_to_skip, [0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1])
+
+    def test_batched_lookup_matches_game_card(self):
+        cards = [GameCard("player1"), GameCard("player2")]
+        cards[0].cross_value_with_flattened_action(3)
+        cards[1].cross_value_with_flattened_action(30)
+        dices = get_dices_with_value(3)
+
+        progress = action_mask_tables.get_row_progress(np.array([card.get_state()[:4] for card in cards]))
+        row_keys = action_mask_tables.get_white_dice_row_keys(progress, np.array([6, 6]))
+        masks = action_mask_tables.ROW_MASKS[row_keys]
+
+        for card, mask in zip(cards, masks):
+            expected = card.get_allowed_actions_mask(dices, is_tossing_player=False, is_second_part_of_round=False)
+            assert_array_equal(mask, expected[:4])
+
+    def test_candidate_actions_keep_one_none_action(self):
+        action_mask = np.zeros(55, dtype=np.int8)
+        action_mask[[3, 20, 44, 45, 50, 51]] = 1
+
+        self.assertEqual([3, 20, 50], action_mask_tables.get_candidate_actions(action_mask))
+
+    def test_candidate_actions_keep_one_pass_if_doing_nothing_is_not_allowed(self):
+        action_mask = np.zeros(55, dtype=np.int8)
+        action_mask[[7, 45, 46]] = 1
+
+        self.assertEqual([7, 45], action_mask_tables.get_candidate_actions(action_mask))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+import unittest
+
+from benchmarks.run_benchmarks import compare_with_baseline, get_environment_differences, get_environment_info, \
+    main, run_benchmarks
+
+
+class BenchmarksTest(unittest.TestCase):
+
+    def test_run_benchmarks_reports_steps_per_second(self):
+        results = run_benchmarks(["raw_env", "observe"], repeats=1, scale=0.01)
+
+        self.assertEqual(["raw_env", "observe"], list(results))
+        self.assertEqual(50, results["raw_env"]["steps"])
+        self.assertGreater(results["raw_env"]["steps_per_second"], 0)
+        self.assertEqual(200, results["observe"]["steps"])
+
+    def test_compare_with_baseline_flags_slowdowns_beyond_tolerance(self):
+        baseline = {"raw_env": {"steps_per_second": 100.0}, "observe": {"steps_per_second": 100.0},
+                    "wrapped_env": {"error": "AttributeError()"}}
+        results = {"raw_env": {"steps_per_second": 85.0}, "observe": {"steps_per_second": 75.0},
+                   "wrapped_env": {"steps_per_second": 10.0}, "headless_env": {"error": "Exception()"}}
+
+        comparison = compare_with_baseline(results, baseline, tolerance=0.2)
+
+        self.assertEqual({"raw_env", "observe"}, set(comparison))
+        self.assertFalse(comparison["raw_env"]["regression"])
+        self.assertAlmostEqual(0.75, comparison["observe"]["ratio"])
+        self.assertTrue(comparison["observe"]["regression"])
+
+    def test_failed_benchmark_with_baseline_is_a_regression(self):
+        comparison = compare_with_baseline({"raw_env": {"error": "Exception()"}},
+                                           {"raw_env": {"steps_per_second": 100.0}}, tolerance=0.2)
+
+        self.assertTrue(comparison["raw_env"]["regression"])
+
+    def test_environment_differences(self):
+        environment = dict(get_environment_info(), python="3.9.0", cpu_count=None)
+
+        self.assertEqual([], get_environment_differences(get_environment_info()))
+        self.assertEqual(["cpu_count", "python"], get_environment_differences(environment))
+
+    def test_first_run_records_baseline_and_other_environments_are_not_compared(self):
+        with tempfile.TemporaryDirectory() as directory:
+            baseline_path = os.path.join(directory, "baseline.json")
+            output_path = os.path.join(directory, "results.json")
+            arguments = ["raw_env", "--repeats", "1", "--scale", "0.01", "--baseline", baseline_path,
+                         "--output", output_path]
+
+            self.assertEqual(0, main(arguments))
+            with open(baseline_path) as file:
+                baseline = json.load(file)
+            self.assertIn("raw_env", baseline["benchmarks"])
+
+            baseline["environment"]["python"] = "2.7"
+            baseline["benchmarks"]["raw_env"]["steps_per_second"] = 1e12
+            with open(baseline_path, "w") as file:
+                json.dump(baseline, file)
+            self.assertEqual(0, main(arguments))
+            with open(output_path) as file:
+                self.assertNotIn("comparison", json.load(file))
+
+
+if __name__ == '__main__':
+    unittest.main()
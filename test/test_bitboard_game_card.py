@@ -0,0 +1,116 @@
+import random
+import unittest
+
+import numpy as np
+from numpy import int8
+from numpy.testing import assert_array_equal
+
+from game_models.bitboard_game_card import BitboardGameCard
+from game_models.color import Color
+from game_models.game_card import GameCard
+from utils import get_dices_with_value
+
+
+class BitboardGameCardTest(unittest.TestCase):
+
+    def test_crossing_numbers(self):
+        card = BitboardGameCard("some_player_id")
+        card._cross_value_in_line(Color.RED, 4)
+        card._cross_value_in_line(Color.BLUE, 2)
+        expected_state = np.zeros(shape=GameCard.OBSERVATION_SHAPE, dtype=int8)
+        expected_state[Color.RED.value][2] = 1
+        expected_state[Color.BLUE.value][10] = 1
+        assert_array_equal(card.get_state(), expected_state)
+
+    def test_cross_value_with_flat_index_action_in_later_row(self):
+        card = BitboardGameCard("some_player_id")
+        card.cross_value_with_flattened_action(33)
+        card.cross_value_with_flattened_action(36)
+
+        expected_state = np.zeros(shape=GameCard.OBSERVATION_SHAPE, dtype=int8)
+        expected_state[Color.BLUE.value][0] = 1
+        expected_state[Color.BLUE.value][3] = 1
+        assert_array_equal(card.get_state(), expected_state)
+
+    def test_row_closing(self):
+        card = BitboardGameCard("some_player_id")
+        for action in [0, 1, 2, 3, 4, 10]:
+            card.cross_value_with_flattened_action(action)
+
+        expected_state = np.zeros(shape=GameCard.OBSERVATION_SHAPE, dtype=int8)
+        expected_state[Color.RED.value][0:5] = 1
+        expected_state[Color.RED.value][10:] = 1
+        assert_array_equal(card.get_state(), expected_state)
+        self.assertEqual([0], card.get_closed_row_indexes())
+        self.assertEqual(28, card.get_points())
+
+    def test_row_closing_without_enough_fields_crossed(self):
+        card = BitboardGameCard("some_player_id")
+        for action in [0, 1, 2, 10]:
+            card.cross_value_with_flattened_action(action)
+
+        self.assertEqual([], card.get_closed_row_indexes())
+        self.assertEqual(0, card.get_state()[Color.RED.value][11])
+
+    def test_valid_actions_after_some_steps(self):
+        card = BitboardGameCard("some_player_id")
+        card._cross_value_in_line(Color.RED, 2)
+        card._cross_value_in_line(Color.YELLOW, 12)
+        card._cross_value_in_line(Color.GREEN, 7)
+
+        expected_action_map = np.zeros(shape=GameCard.ACTION_MASK_SHAPE, dtype=int8)
+        expected_action_map[Color.RED.value][6 - 2] = 1
+        expected_action_map[Color.GREEN.value][12 - 6] = 1
+        expected_action_map[Color.BLUE.value][12 - 6] = 1
+        expected_action_map[4][4:] = 1
+
+        computed_action_mask = card.get_allowed_actions_mask(dices=get_dices_with_value(3),
+                                                             is_tossing_player=False, is_second_part_of_round=False)
+
+        assert_array_equal(computed_action_mask, expected_action_map)
+
+    def test_mask_for_passes(self):
+        card = BitboardGameCard("some_player_id")
+        card.cross_value_with_flattened_action(44)
+        card.cross_value_with_flattened_action(47)
+        computed_action_mask = card.get_allowed_actions_mask(dices=get_dices_with_value(value=4),
+                                                             is_tossing_player=True, is_second_part_of_round=True)
+
+        self.assertEqual(2, card.get_pass_count())
+        self.assertEqual(-10, card.get_points())
+        assert_array_equal(computed_action_mask[4], [0, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0])
+
+    def test_behaves_like_game_card_in_random_games(self):
+        random.seed(7)
+        for _ in range(50):
+            card = GameCard("some_player_id")
+            bitboard_card = BitboardGameCard("some_player_id")
+            for step in range(40):
+                dices = get_dices_with_value(1)
+                for dice in dices:
+                    dice.current_value = random.randint(1, 6)
+                is_tossing_player = random.random() < 0.5
+                is_second_part_of_round = step % 2 == 1
+
+                expected_mask = card.get_allowed_actions_mask(dices, is_tossing_player, is_second_part_of_round)
+                computed_mask = bitboard_card.get_allowed_actions_mask(dices, is_tossing_player,
+                                                                       is_second_part_of_round)
+                assert_array_equal(computed_mask, expected_mask)
+
+                if card.get_pass_count() == 4:
+                    break
+                action = random.choice(np.flatnonzero(expected_mask))
+                card.cross_value_with_flattened_action(action)
+                bitboard_card.cross_value_with_flattened_action(action)
+                if is_second_part_of_round:
+                    card.crossed_something_in_current_round = False
+                    bitboard_card.crossed_something_in_current_round = False
+
+                assert_array_equal(bitboard_card.get_state(), card.get_state())
+                self.assertEqual(card.get_points(), bitboard_card.get_points())
+                self.assertEqual(card.get_pass_count(), bitboard_card.get_pass_count())
+                self.assertEqual(card.get_closed_row_indexes(), bitboard_card.get_closed_row_indexes())
+
+
+if __name__ == '__main__':
+    unittest.main()
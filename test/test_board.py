@@ -6,6 +6,7 @@ from numpy.testing import assert_array_equal
 
 from game_models.board import Board
 from game_models.color import Color
+from game_models.dice_stream import DiceStream
 from game_models.game_card import GameCard
 from utils import get_dices_with_value
 
@@ -19,6 +20,15 @@ class BoardTest(unittest.TestCase):
         self.assertEqual(len(board.game_cards), 2)
         self.assertEqual(len(board.dices), 6)
 
+    def test_roll_dices_from_stream(self):
+        players = ["player1", "player2"]
+        expected_rolls = DiceStream(np.random.default_rng(4), buffered_rolls=2)
+        board = Board(player_ids=players, dice_stream=DiceStream(np.random.default_rng(4), buffered_rolls=2))
+
+        for _ in range(5):
+            board.roll_dices()
+            self.assertEqual(expected_rolls.next_roll(), [dice.current_value for dice in board.dices])
+
     def test_game_finished_with_rows_closed(self):
         players = ["player1", "player2"]
         board = Board(player_ids=players)
@@ -62,6 +72,20 @@ class BoardTest(unittest.TestCase):
 
         self.assertEqual(board.is_game_finished(), True)
 
+    def test_closed_rows_and_passes_are_tracked_incrementally(self):
+        players = ["player1", "player2"]
+        board = Board(player_ids=players)
+
+        player1_card: GameCard = board.game_cards[players[0]]
+        player1_card._rows[2][0:6] = 1
+        player1_card.cross_value_with_flattened_action(32)
+        board.game_cards[players[1]].cross_value_with_flattened_action(45)
+
+        self.assertEqual(0b100, board.closed_rows_bitmask)
+        self.assertEqual([2], board.get_closed_row_indexes())
+        self.assertEqual(1, board.max_pass_count)
+        self.assertFalse(board.is_game_finished())
+
     def test_row_closing_for_others(self):
         players = ["player1", "player2"]
         board = Board(player_ids=players)
@@ -123,5 +147,42 @@ class BoardTest(unittest.TestCase):
         assert_array_equal(expected_observation_from_player1_perspective[1], observation_player1_perspective[1])
         assert_array_equal(expected_observation_from_player1_perspective[2], observation_player1_perspective[2])
 
+    def test_get_observation_returns_copy_by_default(self):
+        players = ["player1", "player2"]
+        board = Board(player_ids=players)
+
+        first_observation = board.get_observation(players[0], is_tossing_player=True, is_second_part_of_round=False)
+        board.game_cards[players[0]].cross_value_with_flattened_action(0)
+        second_observation = board.get_observation(players[0], is_tossing_player=True, is_second_part_of_round=False)
+
+        self.assertEqual(0, first_observation[0][0][0])
+        self.assertEqual(1, second_observation[0][0][0])
+
+    def test_get_observation_without_copy_returns_read_only_buffer(self):
+        players = ["player1", "player2"]
+        board = Board(player_ids=players)
+
+        observation = board.get_observation(players[1], is_tossing_player=False, is_second_part_of_round=False,
+                                            copy=False)
+        board.game_cards[players[0]].cross_value_with_flattened_action(0)
+        board.get_observation(players[1], is_tossing_player=False, is_second_part_of_round=True, copy=False)
+
+        self.assertFalse(observation.flags.writeable)
+        self.assertEqual(1, observation[1][0][0])
+        self.assertEqual(2, observation[2][0][Board.PART_OF_ROUND_OBS_INDEX])
+
+    def test_get_observation_orders_other_players_relative_to_viewer(self):
+        players = ["player1", "player2", "player3"]
+        board = Board(player_ids=players)
+        for index, player in enumerate(players):
+            board.game_cards[player].cross_value_with_flattened_action(index)
+
+        observation = board.get_observation(players[1], is_tossing_player=False, is_second_part_of_round=False)
+
+        self.assertEqual((4, 5, 12), observation.shape)
+        self.assertEqual(1, observation[0][0][1])
+        self.assertEqual(1, observation[1][0][2])
+        self.assertEqual(1, observation[2][0][0])
+
     if __name__ == '__main__':
         unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from game_models import dice_probabilities
+
+
+class DiceProbabilitiesTest(unittest.TestCase):
+
+    def test_white_sum_probabilities(self):
+        self.assertAlmostEqual(1, dice_probabilities.WHITE_SUM_PROBABILITIES.sum())
+        self.assertAlmostEqual(6 / 36, dice_probabilities.WHITE_SUM_PROBABILITIES[7])
+        self.assertAlmostEqual(1 / 36, dice_probabilities.WHITE_SUM_PROBABILITIES[12])
+
+    def test_reversed_rows_mirror_white_probabilities(self):
+        # red counts upwards from 2, green downwards from 12
+        assert_allclose(dice_probabilities.WHITE_COLUMN_PROBABILITIES[0][0], 1 / 36)
+        assert_allclose(dice_probabilities.WHITE_COLUMN_PROBABILITIES[2][0], 1 / 36)
+
+    def test_tossing_player_reaches_more_columns(self):
+        self.assertTrue(np.all(dice_probabilities.TOSSING_COLUMN_PROBABILITIES
+                               > dice_probabilities.WHITE_COLUMN_PROBABILITIES))
+        # 1 - (35/36)^2 for the two sums of a white and the red dice, plus the white sum
+        self.assertAlmostEqual(0.0741, dice_probabilities.TOSSING_COLUMN_PROBABILITIES[0][0], places=4)
+
+    def test_reach_probabilities_only_after_progress(self):
+        reach = dice_probabilities.get_reach_probabilities(np.array([0, 5, 12, 0]), remaining_rolls=10,
+                                                           num_players=2)
+
+        self.assertEqual((4, 11), reach.shape)
+        self.assertTrue(np.all(reach[1][:5] == 0))
+        self.assertTrue(np.all(reach[1][5:] > 0))
+        self.assertTrue(np.all(reach[2] == 0))
+        self.assertGreater(reach[0][5], reach[0][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
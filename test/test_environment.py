@@ -1,4 +1,6 @@
+import contextlib
 import copy
+import io
 import random
 import unittest
 
@@ -6,7 +8,11 @@ import numpy as np
 from numpy.testing import assert_array_equal
 from pettingzoo.test import api_test
 
-from env.qwox_env import QwoxEnv
+from env.qwox_env import QwoxEnv, get_snapshot_dtype
+from env.results_sink import NullResultsSink
+from game_models.bitboard_game_card import BitboardGameCard
+from game_models.board import Board
+from game_models.game_card import GameCard
 from env.wrapped_quox_env import wrapped_quox_env
 from utils import get_dices_with_value
 
@@ -56,6 +62,11 @@ class EnvironmentTest(unittest.TestCase):
         after_3_actions_in_second_round = QwoxEnv.is_second_part_of_round(total_started_step_count=8, num_agents=2)
         self.assertEqual(True, after_3_actions_in_second_round)
 
+        tossing_action_with_three_players = QwoxEnv.is_second_part_of_round(total_started_step_count=4, num_agents=3)
+        self.assertEqual(True, tossing_action_with_three_players)
+        self.assertEqual(1, QwoxEnv.get_round(total_started_step_count=6, agent_count=3))
+        self.assertEqual(2, QwoxEnv.get_round(total_started_step_count=7, agent_count=3))
+
     def test_environment_manually(self):
         env = wrapped_quox_env()
         env.reset()
@@ -169,6 +180,127 @@ class EnvironmentTest(unittest.TestCase):
         # Round 3
         self.assertEqual(3, env_uw.current_round)
 
+    def test_observe_is_cached_until_state_changes(self):
+        env = QwoxEnv()
+        env.reset()
+
+        first_observation = env.observe("player_1")
+        self.assertIs(first_observation, env.observe("player_1"))
+
+        env.step(random.choice(np.flatnonzero(first_observation["action_mask"])))
+
+        self.assertIsNot(first_observation, env.observe("player_1"))
+
+    def test_invalidate_observation_cache_after_changing_board(self):
+        env = QwoxEnv()
+        env.reset()
+        env.observe("player_1")
+
+        env.board.dices = get_dices_with_value(value=1)
+        env.invalidate_observation_cache()
+
+        assert_array_equal(env.observe("player_1")["observation"][2][0][:6], [1, 1, 1, 1, 1, 1])
+
+    def test_reset_with_seed_gives_same_dices(self):
+        first_env = QwoxEnv()
+        second_env = QwoxEnv()
+        first_env.reset(seed=12)
+        second_env.reset(seed=12)
+
+        for _ in range(3):
+            assert_array_equal(first_env.board.dices, second_env.board.dices)
+            first_env.board.roll_dices()
+            second_env.board.roll_dices()
+
+    def test_seed_during_game_changes_next_roll(self):
+        reseeded_env = QwoxEnv()
+        fresh_env = QwoxEnv()
+        reseeded_env.reset(seed=1)
+        reseeded_env.board.roll_dices()
+        fresh_env.reset(seed=5)
+
+        reseeded_env.seed(5)
+        reseeded_env.board.roll_dices()
+
+        assert_array_equal(fresh_env.board.dices, reseeded_env.board.dices)
+
+    def test_headless_env_does_not_print(self):
+        random.seed(2)
+        env = QwoxEnv(results_sink=NullResultsSink(), render_mode=None)
+        env.reset(seed=2)
+
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            for _ in range(1000):
+                if all(env.dones.values()):
+                    break
+                action = random.choice(np.flatnonzero(env.observe(env.agent_selection)["action_mask"]))
+                env.step(action)
+            env.render()
+
+        self.assertTrue(all(env.dones.values()))
+        self.assertEqual("", stdout.getvalue())
+
+    def test_random_game_with_three_players(self):
+        random.seed(7)
+        env = QwoxEnv(results_sink=NullResultsSink(), render_mode=None, num_players=3)
+        env.reset(seed=7)
+
+        self.assertEqual(["player_1", "player_2", "player_3"], env.agents)
+        self.assertEqual((4, 5, 12), env.observe("player_3")["observation"].shape)
+        for _ in range(1000):
+            if all(env.dones.values()):
+                return
+            observation = env.observe(env.agent_selection)
+            tossing_agent = env.agents[env.get_tossing_agent_index(env.current_round)]
+            self.assertEqual(1 if env.agent_selection == tossing_agent else 0,
+                             observation["observation"][-1][0][Board.TOSSING_PLAYER_OBS_INDEX])
+            env.step(random.choice(np.flatnonzero(observation["action_mask"])))
+
+        self.fail("Game did not finish")
+
+    def test_rejects_unsupported_player_count(self):
+        with self.assertRaises(Exception):
+            QwoxEnv(num_players=6)
+
+    def test_restore_state_snapshot(self):
+        for game_card_class in [GameCard, BitboardGameCard]:
+            with self.subTest(game_card_class=game_card_class.__name__):
+                random.seed(3)
+                env = QwoxEnv(game_card_class=game_card_class, results_sink=NullResultsSink(), render_mode=None)
+                env.reset(seed=3)
+                for _ in range(20):
+                    env.step(random.choice(np.flatnonzero(env.observe(env.agent_selection)["action_mask"])))
+                snapshot = env.get_state_snapshot()
+                expected_observations = {agent: env.observe(agent) for agent in env.agents}
+                expected_agent = env.agent_selection
+                expected_finished = env.board.is_game_finished()
+                while not all(env.dones.values()):
+                    env.step(random.choice(np.flatnonzero(env.observe(env.agent_selection)["action_mask"])))
+
+                other_env = QwoxEnv(game_card_class=game_card_class, results_sink=NullResultsSink(), render_mode=None)
+                other_env.reset()
+                for restored_env in [env, other_env]:
+                    restored_env.restore_state_snapshot(snapshot)
+
+                    self.assertEqual(expected_agent, restored_env.agent_selection)
+                    self.assertEqual(expected_finished, restored_env.board.is_game_finished())
+                    self.assertFalse(any(restored_env.dones.values()))
+                    for agent in restored_env.agents:
+                        assert_array_equal(expected_observations[agent]["observation"],
+                                           restored_env.observe(agent)["observation"])
+                        assert_array_equal(expected_observations[agent]["action_mask"],
+                                           restored_env.observe(agent)["action_mask"])
+
+    def test_state_snapshot_into_preallocated_array(self):
+        env = QwoxEnv(results_sink=NullResultsSink(), render_mode=None)
+        env.reset(seed=1)
+        snapshots = np.zeros(2, dtype=get_snapshot_dtype(env.num_agents))
+
+        env.get_state_snapshot(out=snapshots[1])
+
+        self.assertEqual(env.get_state_snapshot(), snapshots[1])
+        self.assertEqual(0, snapshots[0]["total_started_step_count"])
+
     def assert_contains_passing_fields(self, action_mask):
         self.assertEqual(1, action_mask[44])
         self.assertEqual(1, action_mask[45])
@@ -0,0 +1,103 @@
+import importlib.util
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import torch
+from tianshou.data import Batch
+
+from agents.export_dqn import export_dqn
+from agents.exported_dqn_agent import ExportedDQNAgent
+from env.qwox_env import QwoxEnv
+from env.results_sink import NullResultsSink
+from env.vector_qwox_env import VectorQwoxEnv
+from manual_testing.utils import get_playing_agent, trained_agents
+
+HAS_ONNX = all(importlib.util.find_spec(name) for name in ["onnx", "onnxscript", "onnxruntime"])
+
+
+def play_random_steps(steps: int, num_envs: int = 16) -> tuple[np.ndarray, np.ndarray]:
+    """:return: the observations and masks seen while playing random allowed actions"""
+    rng = np.random.default_rng(0)
+    env = VectorQwoxEnv(num_envs=num_envs, seed=0)
+    observation = env.reset()
+    observations, masks = [], []
+    for _ in range(steps):
+        observations.append(observation["obs"])
+        masks.append(observation["mask"])
+        actions = [rng.choice(np.flatnonzero(mask)) for mask in observation["mask"]]
+        observation, _, _, _ = env.step(np.array(actions))
+    return np.concatenate(observations), np.concatenate(masks)
+
+
+class ExportDQNTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.agent = ExportedDQNAgent(export_dqn(103, path=os.path.join(cls.directory, "policy-103.pt")))
+        cls.observations, cls.masks = play_random_steps(50)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def test_chooses_the_same_actions_as_the_trained_agent(self):
+        batch = Batch(obs=Batch(obs=self.observations, mask=self.masks), info={})
+        with torch.no_grad():
+            expected_actions = trained_agents.get(103)(batch).act
+
+        np.testing.assert_array_equal(expected_actions, self.agent.choose_actions(self.observations, self.masks))
+        np.testing.assert_array_equal(expected_actions, self.agent(batch).act)
+
+    def test_never_chooses_a_masked_action(self):
+        masks = self.masks.copy()
+        masks[:, 44:] = False
+        masks[~masks.any(axis=1), 44] = True
+
+        actions = self.agent.choose_actions(self.observations, masks)
+
+        self.assertTrue(masks[np.arange(len(actions)), actions].all())
+
+    def test_choose_action(self):
+        action = self.agent.choose_action(self.observations[0], self.masks[0])
+
+        self.assertIsInstance(action, int)
+        self.assertTrue(self.masks[0][action])
+
+    @unittest.skipUnless(HAS_ONNX, "needs onnx, onnxscript and onnxruntime")
+    def test_onnx_model_chooses_the_same_actions(self):
+        agent = ExportedDQNAgent(export_dqn(103, "onnx", os.path.join(self.directory, "policy-103.onnx")))
+
+        np.testing.assert_array_equal(self.agent.choose_actions(self.observations, self.masks),
+                                      agent.choose_actions(self.observations, self.masks))
+
+    def test_keeps_thread_count_of_the_process(self):
+        previous_num_threads = torch.get_num_threads()
+        torch.set_num_threads(2)
+        try:
+            agent = ExportedDQNAgent(self.agent.path, num_threads=1)
+            agent.choose_actions(self.observations, self.masks)
+
+            self.assertEqual(2, torch.get_num_threads())
+        finally:
+            torch.set_num_threads(previous_num_threads)
+
+    def test_manual_playing_prefers_exported_model(self):
+        env = QwoxEnv(results_sink=NullResultsSink(), render_mode=None)
+        with mock.patch("manual_testing.utils.get_exported_agent_path", return_value=self.agent.path):
+            self.assertIsInstance(get_playing_agent(env, 103), ExportedDQNAgent)
+        with mock.patch("manual_testing.utils.get_exported_agent_path",
+                        return_value=os.path.join(self.directory, "missing.pt")):
+            self.assertIs(trained_agents.get(103), get_playing_agent(env, 103))
+
+    def test_unknown_format(self):
+        with self.assertRaises(Exception):
+            export_dqn(103, "pickle", os.path.join(self.directory, "policy-103.pickle"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from agents.tianshou.long_playing_policy import LongPlayingPolicy
+from agents.tianshou.lowest_value_taker_policy import LowestValueTakerPolicy
+from evaluation.lock_step_evaluation import get_deciding_rows, get_seat_policies, play_lock_step
+from game_models.board import Board
+
+
+class RecordingPolicy(LongPlayingPolicy):
+
+    def __init__(self):
+        super().__init__()
+        self.batch_sizes = []
+        self.additional_information = []
+
+    def forward(self, batch, state=None, **kwargs):
+        self.batch_sizes.append(len(batch.obs.mask))
+        self.additional_information.extend(np.asarray(batch.obs.obs)[:, -1, 0])
+        return super().forward(batch, state, **kwargs)
+
+
+class LockStepEvaluationTest(unittest.TestCase):
+
+    def test_seatings_rotate_over_envs(self):
+        assert_array_equal([[0, 1, 2], [1, 2, 0], [2, 0, 1], [0, 1, 2]], get_seat_policies(4, 3))
+
+    def test_only_tossing_agent_decides_in_second_part_of_round(self):
+        observations = np.zeros((3, 3, 5, 12), dtype=np.int8)
+        observations[:, -1, 0, Board.PART_OF_ROUND_OBS_INDEX] = [1, 2, 2]
+        observations[2, -1, 0, Board.TOSSING_PLAYER_OBS_INDEX] = 1
+
+        assert_array_equal([True, False, True], get_deciding_rows(observations))
+
+    def test_plays_the_requested_games(self):
+        results = play_lock_step([LongPlayingPolicy(), LowestValueTakerPolicy()], num_games=10, num_envs=4, seed=1)
+
+        self.assertEqual(10, len(results))
+        self.assertEqual(5, sum(result["seats"] == [0, 1] for result in results))
+        self.assertTrue(all(len(result["points"]) == 2 for result in results))
+
+    def test_decisions_are_batched_and_waiting_agents_are_skipped(self):
+        policy = RecordingPolicy()
+
+        play_lock_step([policy, LowestValueTakerPolicy()], num_games=16, num_envs=8, seed=2)
+
+        # the policy sits on the first seat of every second env, which is the one to decide in the first step
+        self.assertEqual(4, policy.batch_sizes[0])
+        self.assertLessEqual(max(policy.batch_sizes), 8)
+        self.assertLess(len(policy.batch_sizes), sum(policy.batch_sizes))
+        for additional_information in policy.additional_information:
+            self.assertTrue(additional_information[Board.PART_OF_ROUND_OBS_INDEX] == 1
+                            or additional_information[Board.TOSSING_PLAYER_OBS_INDEX] == 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import random
+import unittest
+
+import numpy as np
+
+from env.parallel_qwox_env import ParallelQwoxEnv
+from utils import get_dices_with_value
+
+
+class ParallelQwoxEnvTest(unittest.TestCase):
+
+    def test_white_dice_actions_are_resolved_together(self):
+        env = ParallelQwoxEnv()
+        env.reset()
+        env.board.dices = get_dices_with_value(1)
+
+        observations, rewards, dones, _ = env.step({"player_1": 0, "player_2": 11})
+
+        self.assertEqual({"player_1": 1, "player_2": 1}, rewards)
+        self.assertTrue(env.is_second_part_of_round)
+        self.assertFalse(any(dones.values()))
+        # only the tossing player gets actions on the board in the second part
+        self.assertEqual(0, np.count_nonzero(observations["player_2"]["action_mask"][:48]))
+
+    def test_only_tossing_agent_acts_in_second_part(self):
+        env = ParallelQwoxEnv()
+        env.reset()
+        env.board.dices = get_dices_with_value(1)
+        env.step({"player_1": 48, "player_2": 48})
+
+        _, rewards, _, _ = env.step({"player_1": 44, "player_2": 48})
+
+        self.assertEqual({"player_1": -5, "player_2": 0}, rewards)
+        self.assertEqual(2, env.current_round)
+        self.assertFalse(env.is_second_part_of_round)
+        self.assertEqual("player_2", env.get_tossing_agent())
+
+    def test_random_game_finishes(self):
+        for num_players in [2, 4]:
+            with self.subTest(num_players=num_players):
+                self.assert_random_game_finishes(ParallelQwoxEnv(num_players=num_players))
+
+    def assert_random_game_finishes(self, env):
+        random.seed(3)
+        observations = env.reset()
+        for _ in range(200):
+            actions = {agent: random.choice(np.flatnonzero(observations[agent]["action_mask"]))
+                       for agent in env.agents}
+            observations, rewards, dones, _ = env.step(actions)
+            if all(dones.values()):
+                self.assertEqual([], env.agents)
+                return
+
+        self.fail("Game did not finish")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import torch
+from torch import nn
+
+from agents.export_dqn import MaskedArgmaxNet, create_masked_argmax_net, export_dqn
+from agents.exported_dqn_agent import ExportedDQNAgent
+from agents.quantize_dqn import check_quantized_net, get_agreement_rate, quantize_dqn, quantize_dynamic, \
+    quantize_static, record_observations
+
+
+def create_preferring_net(action: int) -> MaskedArgmaxNet:
+    """:return: network which prefers the action and otherwise the smallest allowed action"""
+    layer = nn.Linear(180, 55)
+    with torch.no_grad():
+        layer.weight.zero_()
+        layer.bias.copy_(-torch.arange(55, dtype=torch.float32))
+        layer.bias[action] = 1
+    return MaskedArgmaxNet(layer)
+
+
+class QuantizeDQNTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.net = create_masked_argmax_net(103)
+        cls.observations, cls.masks = record_observations(cls.net, 2048, seed=0)
+        cls.directory = tempfile.mkdtemp()
+        cls.float_path = export_dqn(103, path=os.path.join(cls.directory, "policy-103.pt"))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def test_records_only_decisions(self):
+        self.assertEqual((2048, 3, 5, 12), self.observations.shape)
+        self.assertTrue(self.masks[:, :48].any(axis=1).all())
+
+    def test_quantized_networks_mostly_agree_with_the_float_network(self):
+        for quantized_net in [quantize_dynamic(self.net), quantize_static(self.net, self.observations[:1024])]:
+            agreement_rate = get_agreement_rate(self.net, quantized_net, self.observations[1024:],
+                                                self.masks[1024:])
+
+            self.assertGreater(agreement_rate, 0.9)
+
+    def test_do_nothing_actions_count_as_agreement(self):
+        masks = np.zeros((2, 55), dtype=bool)
+        masks[0, 48:] = True
+        masks[1, [3, 49]] = True
+
+        agreement_rate = get_agreement_rate(create_preferring_net(49), create_preferring_net(52),
+                                            self.observations[:2], masks)
+
+        self.assertEqual(0.5, agreement_rate)
+
+    def test_check_fails_for_a_network_which_plays_differently(self):
+        with self.assertRaises(Exception):
+            check_quantized_net(self.net, create_masked_argmax_net(106), self.observations, self.masks,
+                                num_games=10)
+
+    def test_saves_smaller_model_for_exported_dqn_agent(self):
+        for mode in ["dynamic", "static"]:
+            with self.subTest(mode=mode):
+                path = os.path.join(self.directory, f"policy-103-int8-{mode}.pt")
+
+                report = quantize_dqn(103, mode, path, calibration_observations=512, test_observations=512,
+                                      num_games=64, max_win_rate_drop=0.2)
+                agent = ExportedDQNAgent(report["path"])
+
+                self.assertLess(os.path.getsize(path), os.path.getsize(self.float_path) / 3)
+                actions = agent.choose_actions(self.observations, self.masks)
+                self.assertTrue(self.masks[np.arange(len(actions)), actions].all())
+
+    def test_unknown_mode(self):
+        with self.assertRaises(Exception):
+            quantize_dqn(103, "float16", os.path.join(self.directory, "policy.pt"))
+
+
+if __name__ == '__main__':
+    unittest.main()
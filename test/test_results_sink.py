@@ -0,0 +1,159 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from env.qwox_env import QwoxEnv
+from env.results_sink import BufferedResultsSink, CsvResultsSink, JsonLinesResultsSink, ResultsSink, \
+    get_shared_results_sink
+
+
+class ListResultsSink(ResultsSink):
+    def __init__(self):
+        self.batches = []
+        self.closed = False
+
+    def write_batch(self, records: list[dict]):
+        self.batches.append(records)
+
+    def close(self):
+        self.closed = True
+
+
+def get_record(points: int = 10) -> dict:
+    return {"timestamp": "2022-12-01 10:00:00", "player_1_points": points, "player_2_points": 20,
+            "player_1_passes": 1, "player_2_passes": 0, "closed_rows": 2, "point_difference": 10,
+            "finish_reason": 1, "agent1_winning": 1}
+
+
+class ResultsSinkTest(unittest.TestCase):
+
+    def test_csv_sink_keeps_test_log_format(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test-log.csv")
+            CsvResultsSink(path).write(get_record())
+
+            with open(path) as f:
+                self.assertEqual("timestamp,player_1_points, player_2_points, player_1_passes, player_2_passes, "
+                                 "closed_rows, finish_reason\n"
+                                 "2022-12-01 10:00:00,10, 20, 1, 0, 2, 1", f.read())
+
+    def test_csv_sink_writes_every_player(self):
+        record = {"timestamp": "2022-12-01 10:00:00", "player_1_points": 10, "player_2_points": 20,
+                  "player_3_points": 30, "player_1_passes": 1, "player_2_passes": 0, "player_3_passes": 2,
+                  "closed_rows": 2, "point_difference": -10, "finish_reason": 1, "agent1_winning": 0}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test-log.csv")
+            CsvResultsSink(path).write(record)
+            CsvResultsSink(path).write(record)
+
+            with open(path) as f:
+                lines = f.read().split("\n")
+            self.assertEqual("timestamp,player_1_points, player_2_points, player_3_points, player_1_passes, "
+                             "player_2_passes, player_3_passes, closed_rows, finish_reason", lines[0])
+            self.assertEqual(["2022-12-01 10:00:00,10, 20, 30, 1, 0, 2, 2, 1"] * 2, lines[1:])
+
+    def test_json_lines_sink(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.jsonl")
+            JsonLinesResultsSink(path).write_batch([get_record(1), get_record(2)])
+
+            with open(path) as f:
+                self.assertEqual([1, 2], [json.loads(line)["player_1_points"] for line in f])
+
+    def test_buffered_sink_writes_full_batches(self):
+        inner_sink = ListResultsSink()
+        sink = BufferedResultsSink(inner_sink, max_batch_size=2, flush_interval=60)
+
+        for points in range(5):
+            sink.write(get_record(points))
+        sink.flush()
+
+        self.assertEqual([2, 2, 1], [len(batch) for batch in inner_sink.batches])
+
+    def test_buffered_sink_writes_rest_on_close(self):
+        inner_sink = ListResultsSink()
+        sink = BufferedResultsSink(inner_sink, max_batch_size=100, flush_interval=60)
+
+        sink.write(get_record())
+        sink.close()
+
+        self.assertEqual(1, len(inner_sink.batches))
+        self.assertTrue(inner_sink.closed)
+
+    def test_buffered_sink_refuses_records_after_close(self):
+        sink = BufferedResultsSink(ListResultsSink())
+        sink.close()
+
+        with self.assertRaises(Exception):
+            sink.write(get_record())
+
+    def test_sink_without_write_batch_cannot_be_created(self):
+        class IncompleteResultsSink(ResultsSink):
+            pass
+
+        with self.assertRaises(TypeError):
+            IncompleteResultsSink()
+
+    def test_buffered_sink_writes_after_flush_interval(self):
+        inner_sink = ListResultsSink()
+        sink = BufferedResultsSink(inner_sink, max_batch_size=100, flush_interval=0.01)
+
+        sink.write(get_record())
+        sink._thread.join(timeout=0.2)
+
+        self.assertEqual(1, len(inner_sink.batches))
+        sink.close()
+
+    def test_buffered_sink_is_no_longer_closed_at_exit_after_close(self):
+        sink = BufferedResultsSink(ListResultsSink())
+        with mock.patch("env.results_sink.atexit.unregister") as unregister:
+            sink.close()
+
+        unregister.assert_called_once_with(sink.close)
+
+    def test_flush_fails_if_writer_thread_is_not_running(self):
+        sink = BufferedResultsSink(ListResultsSink())
+        sink._queue.put(BufferedResultsSink._CLOSE)
+        sink._thread.join()
+
+        with self.assertRaises(Exception):
+            sink.flush()
+
+    def test_flush_gives_up_after_timeout(self):
+        release = threading.Event()
+
+        class HangingResultsSink(ListResultsSink):
+            def write_batch(self, records: list[dict]):
+                release.wait()
+
+        sink = BufferedResultsSink(HangingResultsSink())
+        sink.write(get_record())
+
+        with self.assertRaises(Exception):
+            sink.flush(timeout=0.05)
+        release.set()
+        sink.close()
+
+    def test_shared_sink_is_reused_until_closed(self):
+        sink = get_shared_results_sink("test_shared_sink_is_reused_until_closed", ListResultsSink)
+
+        self.assertIs(sink, get_shared_results_sink("test_shared_sink_is_reused_until_closed", ListResultsSink))
+        sink.close()
+        self.assertIsNot(sink, get_shared_results_sink("test_shared_sink_is_reused_until_closed", ListResultsSink))
+
+    def test_envs_share_default_sink_and_do_not_close_it(self):
+        env = QwoxEnv(render_mode=None)
+        other_env = QwoxEnv(render_mode=None)
+        sink = env.get_results_sink()
+
+        self.assertIs(sink, other_env.get_results_sink())
+        env.close()
+        self.assertFalse(sink._closed)
+        self.assertIs(sink, other_env.get_results_sink())
+
+
+if __name__ == '__main__':
+    unittest.main()
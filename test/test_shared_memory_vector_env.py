@@ -0,0 +1,129 @@
+import random
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_equal
+from tianshou.data import Collector
+from tianshou.policy import MultiAgentPolicyManager, RandomPolicy
+
+from env.qwox_env import QwoxEnv
+from env.results_sink import NullResultsSink, ResultsSink
+from env.shared_memory_vector_env import SharedMemoryVectorEnv
+from env.tianshou_qwox_env import TianshouQwoxEnv
+
+
+def create_env() -> TianshouQwoxEnv:
+    return TianshouQwoxEnv(QwoxEnv(results_sink=NullResultsSink(), render_mode=None))
+
+
+class ListResultsSink(ResultsSink):
+    def __init__(self):
+        self.records = []
+
+    def write_batch(self, records: list[dict]):
+        self.records.extend(records)
+
+
+def play_random_steps(vector_env: SharedMemoryVectorEnv, steps: int) -> int:
+    """:return: finished games"""
+    rng = np.random.default_rng(0)
+    observation = vector_env.reset()
+    finished_games = 0
+    for _ in range(steps):
+        actions = [rng.choice(np.flatnonzero(mask)) for mask in observation["mask"]]
+        observation, _, dones, _ = vector_env.step(actions)
+        for env_id in np.flatnonzero(dones):
+            finished_games += 1
+            reset_observation = vector_env.reset(env_id)
+            for key in observation:
+                observation[key][env_id] = reset_observation[key][0]
+    return finished_games
+
+
+class SharedMemoryVectorEnvTest(unittest.TestCase):
+
+    def setUp(self):
+        self.vector_env = SharedMemoryVectorEnv([create_env for _ in range(3)], num_workers=2)
+
+    def tearDown(self):
+        self.vector_env.close()
+
+    def test_plays_like_envs_in_main_process(self):
+        random.seed(7)
+        envs = [create_env() for _ in range(3)]
+        self.vector_env.seed(7)
+        for env_id, env in enumerate(envs):
+            env.seed(7 + env_id)
+        vector_observation = self.vector_env.reset()
+        observations = [env.reset() for env in envs]
+
+        for _ in range(100):
+            for env_id, observation in enumerate(observations):
+                self.assertEqual(observation["agent_id"], vector_observation["agent_id"][env_id])
+                assert_array_equal(observation["obs"], vector_observation["obs"][env_id])
+                assert_array_equal(observation["mask"], vector_observation["mask"][env_id])
+
+            actions = [random.choice(np.flatnonzero(observation["mask"])) for observation in observations]
+            vector_observation, rewards, dones, _ = self.vector_env.step(actions)
+            for env_id, (env, action) in enumerate(zip(envs, actions)):
+                observations[env_id], env_rewards, done, _ = env.step(action)
+                self.assertEqual(env_rewards, list(rewards[env_id]))
+                self.assertEqual(done, dones[env_id])
+                if done:
+                    observations[env_id] = env.reset()
+                    reset_observation = self.vector_env.reset(env_id)
+                    for key in vector_observation:
+                        vector_observation[key][env_id] = reset_observation[key][0]
+
+    def test_steps_only_selected_envs(self):
+        observation = self.vector_env.reset()
+        action = np.flatnonzero(observation["mask"][1])[0]
+
+        observation, rewards, dones, infos = self.vector_env.step([action], env_ids=[1])
+
+        self.assertEqual((1, 3, 5, 12), observation["obs"].shape)
+        self.assertEqual((1, 2), rewards.shape)
+        self.assertEqual(["player_2"], list(observation["agent_id"]))
+        self.assertEqual("player_1", self.vector_env.reset([0])["agent_id"][0])
+
+    def test_illegal_action_ends_game_with_legal_moves_in_info(self):
+        observation = self.vector_env.reset()
+        illegal_action = np.flatnonzero(~observation["mask"][2])[0]
+
+        _, rewards, dones, infos = self.vector_env.step([illegal_action], env_ids=[2])
+
+        self.assertEqual([-1, 0], list(rewards[0]))
+        self.assertTrue(dones[0])
+        self.assertIn("legal_moves", infos[0])
+
+    def test_collector_collects_episodes(self):
+        policy = MultiAgentPolicyManager([RandomPolicy(), RandomPolicy()], create_env())
+        collector = Collector(policy, self.vector_env)
+
+        result = collector.collect(n_episode=4)
+
+        self.assertEqual(4, result["n/ep"])
+
+    def test_results_are_written_in_main_process(self):
+        results_sink = ListResultsSink()
+        vector_env = SharedMemoryVectorEnv([create_env for _ in range(2)], num_workers=2, results_sink=results_sink)
+
+        finished_games = play_random_steps(vector_env, 300)
+        vector_env.close()
+
+        self.assertGreater(finished_games, 0)
+        self.assertEqual(finished_games, len(results_sink.records))
+        self.assertIn("player_1_points", results_sink.records[0])
+
+    def test_spawned_workers(self):
+        vector_env = SharedMemoryVectorEnv([create_env for _ in range(2)], num_workers=2, context="spawn")
+
+        vector_env.reset()
+        observation, _, _, _ = vector_env.step([48, 48])
+        vector_env.close()
+
+        self.assertEqual((2, 3, 5, 12), observation["obs"].shape)
+
+
+if __name__ == '__main__':
+    unittest.main()
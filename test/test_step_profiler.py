@@ -0,0 +1,55 @@
+import random
+import unittest
+
+import numpy as np
+
+from env.qwox_env import QwoxEnv
+from env.results_sink import NullResultsSink
+from env.step_profiler import StepProfiler
+
+
+class StepProfilerTest(unittest.TestCase):
+
+    def test_profiled_game_counts_every_phase(self):
+        random.seed(2)
+        env = QwoxEnv(results_sink=NullResultsSink(), render_mode=None, profile=True)
+        env.reset(seed=2)
+        steps = 0
+        while not env.board.is_game_finished():
+            env.step(random.choice(np.flatnonzero(env.observe(env.agent_selection)["action_mask"])))
+            steps += 1
+
+        stats = env.get_profile_stats()
+
+        self.assertEqual(set(StepProfiler.PHASES), set(stats))
+        self.assertEqual(steps, stats["step"]["calls"])
+        self.assertEqual(1, stats["logging"]["calls"])
+        self.assertEqual(stats["observe"]["calls"], stats["action_mask"]["calls"])
+        self.assertEqual(stats["action_validation"]["calls"], stats["cross_value"]["calls"])
+        self.assertEqual(stats["cross_value"]["calls"], stats["reward"]["calls"])
+        self.assertLess(stats["cross_value"]["calls"], steps)
+        self.assertGreater(stats["dice_roll"]["calls"], 0)
+        for phase in StepProfiler.PHASES:
+            self.assertGreater(stats[phase]["seconds"], 0, phase)
+        self.assertGreaterEqual(stats["step"]["seconds"], stats["cross_value"]["seconds"])
+
+    def test_reset_profile_stats(self):
+        env = QwoxEnv(results_sink=NullResultsSink(), render_mode=None, profile=True)
+        env.reset()
+        env.step(48)
+
+        env.reset_profile_stats()
+
+        self.assertTrue(all(entry["calls"] == 0 and entry["seconds"] == 0
+                            for entry in env.get_profile_stats().values()))
+
+    def test_no_stats_without_profiling(self):
+        env = QwoxEnv(results_sink=NullResultsSink(), render_mode=None)
+        env.reset()
+        env.step(48)
+
+        self.assertEqual({}, env.get_profile_stats())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import random
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_equal
+from tianshou.data import Collector, VectorReplayBuffer
+from tianshou.env import DummyVectorEnv
+from tianshou.policy import MultiAgentPolicyManager, RandomPolicy
+
+from env.qwox_env import QwoxEnv
+from env.results_sink import NullResultsSink
+from env.tianshou_qwox_env import TianshouQwoxEnv
+from env.wrapped_quox_env import headless_quox_env
+
+
+def create_headless_env() -> TianshouQwoxEnv:
+    env = headless_quox_env()
+    env.unwrapped.results_sink = NullResultsSink()
+    return env
+
+
+def collect_buffer(env_fn, seed: int) -> VectorReplayBuffer:
+    envs = DummyVectorEnv([env_fn for _ in range(2)])
+    envs.seed(seed)
+    buffer = VectorReplayBuffer(1000, len(envs))
+    policy = MultiAgentPolicyManager([RandomPolicy(), RandomPolicy()], env_fn())
+    np.random.seed(seed)
+    Collector(policy, envs, buffer).collect(n_step=300)
+    return buffer
+
+
+class TianshouQwoxEnvTest(unittest.TestCase):
+
+    def test_plays_like_qwox_env(self):
+        random.seed(4)
+        env = TianshouQwoxEnv(QwoxEnv(results_sink=NullResultsSink(), render_mode=None))
+        reference_env = QwoxEnv(results_sink=NullResultsSink(), render_mode=None)
+        observation = env.reset(seed=4)
+        reference_env.reset(seed=4)
+
+        for _ in range(500):
+            reference_observation = reference_env.observe(reference_env.agent_selection)
+            self.assertEqual(reference_env.agent_selection, observation["agent_id"])
+            assert_array_equal(reference_observation["observation"], observation["obs"])
+            assert_array_equal(reference_observation["action_mask"] == 1, observation["mask"])
+
+            action = random.choice(np.flatnonzero(observation["mask"]))
+            observation, rewards, done, _ = env.step(action)
+            reference_env.step(action)
+
+            self.assertEqual([reference_env.rewards[agent] for agent in env.agents], rewards)
+            self.assertEqual(reference_env.dones[reference_env.agent_selection], done)
+            if done:
+                return
+
+        self.fail("Game did not finish")
+
+    def test_illegal_action_terminates_game(self):
+        env = TianshouQwoxEnv(QwoxEnv(results_sink=NullResultsSink(), render_mode=None))
+        observation = env.reset()
+        illegal_action = np.flatnonzero(~observation["mask"])[0]
+
+        observation, rewards, done, info = env.step(illegal_action)
+
+        self.assertTrue(done)
+        self.assertEqual([-1, 0], rewards)
+        assert_array_equal(np.flatnonzero(observation["mask"]), info["legal_moves"])
+        with self.assertRaises(Exception):
+            env.step(48)
+
+    def test_step_before_reset_raises(self):
+        env = TianshouQwoxEnv(QwoxEnv(results_sink=NullResultsSink(), render_mode=None))
+
+        with self.assertRaises(Exception):
+            env.step(48)
+
+    def test_collector_stores_views_of_headless_env_like_copies(self):
+        self.assertFalse(create_headless_env().unwrapped.copy_observations)
+
+        buffer = collect_buffer(create_headless_env, seed=5)
+        reference_buffer = collect_buffer(
+            lambda: TianshouQwoxEnv(QwoxEnv(results_sink=NullResultsSink(), render_mode=None)), seed=5)
+
+        self.assertEqual(len(reference_buffer), len(buffer))
+        for key in ["obs", "obs_next"]:
+            assert_array_equal(getattr(reference_buffer, key).obs, getattr(buffer, key).obs)
+            assert_array_equal(getattr(reference_buffer, key).mask, getattr(buffer, key).mask)
+        # views which were stored without copying would all show the last observation
+        self.assertGreater(len(np.unique(buffer.obs.obs, axis=0)), len(buffer) // 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
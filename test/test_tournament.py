@@ -0,0 +1,65 @@
+import unittest
+
+import numpy as np
+
+from evaluation.tournament import compute_ratings, fit_elo_ratings, get_gauntlet_pairings, \
+    get_round_robin_pairings, get_score_matrix, run_tournament
+
+
+class TournamentTest(unittest.TestCase):
+
+    def test_pairings(self):
+        self.assertEqual([("a", "b"), ("a", "c"), ("b", "c")], get_round_robin_pairings(["a", "b", "c"]))
+        self.assertEqual([("new", "a"), ("new", "b")], get_gauntlet_pairings("new", ["a", "new", "b"]))
+
+    def test_every_seed_is_played_with_both_seatings(self):
+        for num_workers in [0, 1]:
+            with self.subTest(num_workers=num_workers):
+                results = run_tournament([("long_playing", "lowest_value_taker")], seed_pairs_per_match=3,
+                                         num_workers=num_workers, seeds_per_job=2)
+
+                self.assertEqual([0, 0, 1, 1, 2, 2], [result["seed"] for result in results])
+                self.assertEqual(["long_playing", "lowest_value_taker"], results[0]["agents"])
+                self.assertEqual(["lowest_value_taker", "long_playing"], results[1]["agents"])
+
+    def test_lock_step_plays_both_seatings(self):
+        results = run_tournament([("long_playing", "lowest_value_taker")], seed_pairs_per_match=3, lock_step=True)
+
+        self.assertEqual(6, len(results))
+        self.assertEqual(3, sum(result["agents"] == ["long_playing", "lowest_value_taker"] for result in results))
+
+    def test_score_matrix_counts_draws_half(self):
+        results = [{"agents": ["a", "b"], "points": [10, 5]}, {"agents": ["b", "a"], "points": [7, 7]}]
+
+        scores, games = get_score_matrix(results, ["a", "b"])
+
+        np.testing.assert_array_equal([[0, 1.5], [0.5, 0]], scores)
+        np.testing.assert_array_equal([[0, 2], [2, 0]], games)
+
+    def test_elo_difference_matches_winning_rate(self):
+        # 3 of 4 games won is an Elo difference of 400 * log10(3) without the virtual draw
+        scores = np.array([[0, 300.0], [100.0, 0]])
+        games = np.array([[0, 400.0], [400.0, 0]])
+
+        ratings = fit_elo_ratings(scores, games)
+
+        self.assertAlmostEqual(1500, ratings.mean())
+        self.assertAlmostEqual(400 * np.log10(3), ratings[0] - ratings[1], delta=1)
+
+    def test_ratings_are_sorted_with_intervals(self):
+        results = ([{"agents": ["strong", "weak"], "points": [20, 10]}] * 30
+                   + [{"agents": ["weak", "strong"], "points": [20, 10]}] * 10
+                   + [{"agents": ["strong", "random"], "points": [20, 0]}] * 40)
+
+        ratings = compute_ratings(results, bootstrap_samples=50)
+
+        self.assertEqual(["strong", "weak", "random"], list(ratings))
+        for rating in ratings.values():
+            self.assertLessEqual(rating["lower"], rating["rating"])
+            self.assertGreaterEqual(rating["upper"], rating["rating"])
+        self.assertEqual(80, ratings["strong"]["games"])
+        self.assertAlmostEqual(70 / 80, ratings["strong"]["score"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from env.qwox_env import QwoxEnv
+from env.results_sink import NullResultsSink
+from manual_testing.utils import TrainedAgentRegistry, get_trained_agent, get_trained_agent_path, trained_agents
+
+
+class TrainedAgentRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for policy_number in [103, 107]:
+            shutil.copy(get_trained_agent_path(policy_number), self.directory)
+        open(os.path.join(self.directory, "policy-nice.pth"), "w").close()
+        self.registry = TrainedAgentRegistry(self.directory, max_loaded_agents=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_discovers_numbered_checkpoints_without_loading_them(self):
+        self.assertEqual([103, 107], self.registry.get_policy_numbers())
+        self.assertEqual(0, len(self.registry))
+
+    def test_loads_agent_once_for_inference(self):
+        agent = self.registry.get(103)
+
+        self.assertIs(agent, self.registry.get(103))
+        self.assertFalse(agent.training)
+        self.assertIsNone(agent.optim)
+        self.assertFalse(any(parameter.requires_grad for parameter in agent.parameters()))
+
+    def test_least_recently_used_agent_is_dropped(self):
+        agent = self.registry.get(103)
+        self.registry.get(107)
+
+        self.assertEqual(1, len(self.registry))
+        self.assertIsNot(agent, self.registry.get(103))
+
+    def test_unknown_agent(self):
+        with self.assertRaises(Exception):
+            self.registry.get(1)
+
+    def test_share_memory(self):
+        self.registry.share_memory([107])
+
+        self.assertTrue(all(parameter.is_shared() for parameter in self.registry.get(107).parameters()))
+
+    def test_get_trained_agent_uses_the_shared_registry(self):
+        env = QwoxEnv(results_sink=NullResultsSink(), render_mode=None)
+
+        self.assertIs(trained_agents.get(103), get_trained_agent(env, 103))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from game_models.transposition_table import TranspositionTable
+
+
+class TranspositionTableTest(unittest.TestCase):
+
+    def test_lru_drops_least_recently_used_entry(self):
+        table = TranspositionTable(max_entries=2, replacement="lru")
+        table.store(1, "a")
+        table.store(2, "b")
+        table.get(1)
+        table.store(3, "c")
+
+        self.assertEqual("a", table.get(1))
+        self.assertIsNone(table.get(2))
+        self.assertEqual("c", table.get(3))
+        self.assertEqual(2, len(table))
+        self.assertEqual((3, 1), (table.hits, table.misses))
+
+    def test_depth_preferred_keeps_deeper_entry(self):
+        table = TranspositionTable(max_entries=4, replacement="depth")
+        table.store(1, "deep", depth=3)
+        # 5 shares the slot with 1
+        table.store(5, "shallow", depth=1)
+
+        self.assertEqual("deep", table.get(1))
+        self.assertNotIn(5, table)
+
+        table.store(5, "deeper", depth=4)
+        self.assertEqual("deeper", table.get(5))
+        self.assertNotIn(1, table)
+
+    def test_depth_preferred_updates_same_state_only_as_deep(self):
+        table = TranspositionTable(max_entries=4, replacement="depth")
+        table.store(2, "deep", depth=3)
+        table.store(2, "shallow", depth=0)
+
+        self.assertEqual("deep", table.get(2))
+        table.store(2, "updated", depth=3)
+        self.assertEqual("updated", table.get(2))
+
+    def test_unknown_replacement_raises(self):
+        with self.assertRaises(Exception):
+            TranspositionTable(replacement="random")
+
+
+if __name__ == '__main__':
+    unittest.main()
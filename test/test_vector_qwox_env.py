@@ -0,0 +1,72 @@
+import random
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from env.qwox_env import QwoxEnv
+from env.vector_qwox_env import VectorQwoxEnv
+
+
+class VectorQwoxEnvTest(unittest.TestCase):
+
+    def test_reset_shapes(self):
+        env = VectorQwoxEnv(num_envs=8, seed=1)
+        observation = env.reset()
+
+        self.assertEqual((8, 3, 5, 12), observation["obs"].shape)
+        self.assertEqual((8, 55), observation["mask"].shape)
+        self.assertTrue(np.all(observation["agent_id"] == "player_1"))
+        self.assertTrue(np.all((env.dices >= 1) & (env.dices <= 6)))
+
+    def test_same_seed_gives_same_dices(self):
+        first_env = VectorQwoxEnv(num_envs=4, seed=3)
+        second_env = VectorQwoxEnv(num_envs=4, seed=3)
+        first_env.reset()
+        second_env.reset()
+
+        assert_array_equal(first_env.dices, second_env.dices)
+
+    def test_plays_like_qwox_env(self):
+        random.seed(5)
+        vector_env = VectorQwoxEnv(num_envs=1, seed=5)
+        vector_observation = vector_env.reset()
+        env = QwoxEnv()
+        env.reset()
+
+        for _ in range(500):
+            for dice, value in zip(env.board.dices, vector_env.dices[0]):
+                dice.current_value = int(value)
+            observation = env.observe(env.agent_selection)
+
+            self.assertEqual(env.agent_selection, vector_observation["agent_id"][0])
+            assert_array_equal(observation["observation"], vector_observation["obs"][0])
+            assert_array_equal(observation["action_mask"], vector_observation["mask"][0])
+
+            action = random.choice(np.flatnonzero(observation["action_mask"]))
+            vector_observation, rewards, dones, infos = vector_env.step([action])
+            if dones[0]:
+                return
+
+            env.step(action)
+            self.assertEqual([env.rewards[agent] for agent in env.agents], list(rewards[0]))
+
+        self.fail("Game did not finish")
+
+    def test_finished_games_are_reset(self):
+        env = VectorQwoxEnv(num_envs=2, seed=0)
+        env.reset()
+        env.cards[0, 0, 4, :3] = 1
+        # second part of the first round, where the tossing player_1 has to pass
+        env.total_started_step_count[0] = 3
+
+        _, rewards, dones, infos = env.step([47, 48], env_ids=[0, 1])
+
+        self.assertEqual([True, False], list(dones))
+        self.assertEqual(-20, infos[0]["points"][0])
+        self.assertEqual(0, np.count_nonzero(env.cards[0]))
+        self.assertEqual(1, env.total_started_step_count[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import random
+import unittest
+
+import numpy as np
+
+from env.qwox_env import QwoxEnv
+from env.results_sink import NullResultsSink
+from game_models import zobrist
+from game_models.bitboard_game_card import BitboardGameCard
+from game_models.board import Board
+from game_models.game_card import GameCard
+
+
+class ZobristTest(unittest.TestCase):
+
+    def test_incremental_hash_matches_recomputed_hash(self):
+        for game_card_class in [GameCard, BitboardGameCard]:
+            with self.subTest(game_card_class=game_card_class.__name__):
+                random.seed(5)
+                env = QwoxEnv(game_card_class=game_card_class, results_sink=NullResultsSink(), render_mode=None)
+                env.reset(seed=5)
+                row_bits = np.zeros(5, dtype=np.uint16)
+                while not all(env.dones.values()):
+                    env.step(random.choice(np.flatnonzero(env.observe(env.agent_selection)["action_mask"])))
+                    for card in env.board.game_cards.values():
+                        card.write_row_bits(row_bits)
+                        self.assertEqual(zobrist.hash_row_bits(card.seat, row_bits), card.zobrist_hash)
+
+    def test_move_order_does_not_change_hash(self):
+        first_board = Board(["player_1", "player_2"])
+        second_board = Board(["player_1", "player_2"])
+        for action in [0, 13, 44]:
+            first_board.game_cards["player_1"].cross_value_with_flattened_action(action)
+        for action in [44, 13, 0]:
+            second_board.game_cards["player_1"].cross_value_with_flattened_action(action)
+        first_board.set_dice_values([1, 2, 3, 4, 5, 6])
+        second_board.set_dice_values([1, 2, 3, 4, 5, 6])
+
+        self.assertEqual(first_board.get_zobrist_hash(), second_board.get_zobrist_hash())
+
+    def test_hash_depends_on_seat_and_dices(self):
+        board = Board(["player_1", "player_2"])
+        board.set_dice_values([1, 1, 1, 1, 1, 1])
+        empty_hash = board.get_zobrist_hash()
+        board.game_cards["player_1"].cross_value_with_flattened_action(0)
+        first_seat_hash = board.get_zobrist_hash()
+        board.game_cards["player_1"].set_row_bits(np.zeros(5, dtype=np.uint16))
+        board.game_cards["player_2"].cross_value_with_flattened_action(0)
+        second_seat_hash = board.get_zobrist_hash()
+        board.set_dice_values([1, 1, 1, 1, 1, 2])
+
+        self.assertEqual(3, len({empty_hash, first_seat_hash, second_seat_hash}))
+        self.assertNotEqual(second_seat_hash, board.get_zobrist_hash())
+
+    def test_restored_snapshot_has_same_env_hash(self):
+        random.seed(2)
+        env = QwoxEnv(results_sink=NullResultsSink(), render_mode=None)
+        env.reset(seed=2)
+        for _ in range(15):
+            env.step(random.choice(np.flatnonzero(env.observe(env.agent_selection)["action_mask"])))
+        other_env = QwoxEnv(results_sink=NullResultsSink(), render_mode=None)
+        other_env.reset()
+
+        other_env.restore_state_snapshot(env.get_state_snapshot())
+
+        self.assertEqual(env.get_zobrist_hash(), other_env.get_zobrist_hash())
+        env.step(random.choice(np.flatnonzero(env.observe(env.agent_selection)["action_mask"])))
+        self.assertNotEqual(env.get_zobrist_hash(), other_env.get_zobrist_hash())
+
+
+if __name__ == '__main__':
+    unittest.main()